@@ -1,4 +1,5 @@
 from app.geoms.point import Point3
+from app.geoms.pointcloud import PointCloud
 
 
 def geom_count(geoms, canvas=None):
@@ -33,6 +34,12 @@ def points_centroid(geoms, canvas=None):
             centroid_x += g.x()
             centroid_y += g.y()
             centroid_z += g.z()
+        elif isinstance(g, PointCloud):
+            points_num += len(g)
+            x_sum, y_sum, z_sum = g.coords.sum(axis=0, dtype=float)
+            centroid_x += x_sum
+            centroid_y += y_sum
+            centroid_z += z_sum
 
     centroid_x /= points_num  # equivalent to centroid_x = centroid_x / points_num
     centroid_y /= points_num
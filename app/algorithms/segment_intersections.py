@@ -0,0 +1,59 @@
+import numpy as np
+
+from app.geoms.linestring import LineString
+from app.geoms.pointcloud import PointCloud
+from app.geoms.utils.robust_predicates import predicate_counters
+from app.geoms.utils.sweep_intersections import sweep_intersections
+from app.utils.color import Color
+
+
+def segments_intersections(geoms, canvas=None):
+    """only consider the LineStrings (Lines and LinearRings included) in the canvas. Compute all the intersection
+    points among their segments with a sweep line, and add them to the canvas as a PointCloud.
+    The vertices shared by consecutive segments of the same line are not intersections."""
+
+    segments = list()
+    owners = list()  # for each segment, the index of its line
+    positions = list()  # for each segment, its position in its line
+    closing = set()  # the pairs (first, last) of segments of closed lines, which are consecutive too
+
+    lines = [g for g in geoms if isinstance(g, LineString) and len(g.vertices) > 1]
+    for line_index, g in enumerate(lines):
+        coords = np.array([v.tolist() for v in g.vertices], dtype=np.float64)
+        first = len(segments)
+        segments.extend(np.stack((coords[:-1], coords[1:]), axis=1))
+        owners.extend([line_index] * (len(coords) - 1))
+        positions.extend(range(len(coords) - 1))
+        if len(coords) > 3 and np.array_equal(coords[0], coords[-1]):
+            closing.add((first, len(segments) - 1))
+
+    if not segments:
+        return "No segments in the canvas"
+
+    segments = np.array(segments)
+    filtered_before, exact_before = predicate_counters.total()
+    points, segment_ids = sweep_intersections(segments)
+    filtered, exact = predicate_counters.total()
+    filtered, exact = filtered - filtered_before, exact - exact_before
+
+    def consecutive(s, t):
+        return owners[s] == owners[t] and (abs(positions[s] - positions[t]) == 1 or (min(s, t), max(s, t)) in closing)
+
+    keep = [any(not consecutive(s, t) for i, s in enumerate(ids) for t in ids[i + 1:]) for ids in segment_ids]
+    points = points[np.array(keep, dtype=bool)] if keep else points
+    segment_ids = [ids for ids, k in zip(segment_ids, keep) if k]
+
+    # the z of each point is taken from the first segment through it
+    coords = np.zeros((len(points), 3))
+    coords[:, :2] = points
+    for k, ids in enumerate(segment_ids):
+        a, b = segments[ids[0]]
+        length2 = np.dot(b[:2] - a[:2], b[:2] - a[:2])
+        t = np.dot(points[k] - a[:2], b[:2] - a[:2]) / length2 if length2 > 0 else 0
+        coords[k, 2] = a[2] + t * (b[2] - a[2])
+
+    if canvas is not None and len(coords):
+        canvas.add_geometry(PointCloud(coords, color=Color(1.0, 0.0, 0.0)))
+
+    return "Found " + str(len(coords)) + " intersection points among " + str(len(segments)) + " segments " + \
+           "(orientation tests: " + str(filtered) + " filtered, " + str(exact) + " exact)"
@@ -3,7 +3,7 @@ from PyQt4.QtGui import QApplication
 from PyQt4.QtCore import QPoint
 from PyQt4.QtCore import pyqtSlot
 
-from OpenGL import GL
+from app.geoms.utils.shader_program import GL, ShaderProgram
 
 
 from app.config.params import *
@@ -14,8 +14,14 @@ from app.geoms.polygon import Polygon
 from app.geoms.point import Point3
 from app.geoms.line import Line
 from app.geoms.linestring import LineString
+from app.geoms.pointcloud import PointCloud
 from app.geoms.utils.box import Box3D
 from app.geoms.utils.selectionbox import SelectionBox
+from app.geoms.utils.batch_renderer import BatchRenderer
+from app.geoms.utils.spatial_index import SpatialIndex, geometry_box
+from app.geoms.utils.selection_preview import SelectionPreview
+from app.geoms.utils.pick_index import PickIndex
+from app.geoms.utils.snapping import Snapper
 
 # import ctypes  # it seems to be already contained in some other imported file
 
@@ -36,15 +42,22 @@ class Canvas3d(QtOpenGL.QGLWidget):
         self.parent = parent
         QtOpenGL.QGLWidget.__init__(self, parent)
 
-        self.shader_program = None  # QtOpenGL.QGLShaderProgram()
+        self.shader_program = None  # a ShaderProgram, created in initializeGL
 
         self.camera = Camera()  # initialize a camera object (initially located at the origin and facing (0, 0, -1)
 
         self.xy_grid = MyGrid()
 
         self.renderables3d = set()  # this contains all the geometries on canvas
+        self.batch_renderer = BatchRenderer()  # draws the geometries on canvas grouped in a few shared GPU buffers
+        self.spatial_index = SpatialIndex()  # indexes the bounding boxes of the geometries on canvas
+        self.pick_index = PickIndex()  # indexes the vertices and segments of the geometries on canvas
+        self.snapper = Snapper(self.pick_index, grid_cell_size=config_rendering_grid_cell_size)
 
         self.selection_box = None  # this contains at most 1 selection box
+        self.selection_preview = None  # the geometries inside the selection box, updated while it is dragged
+        self.highlight_renderer = BatchRenderer()  # draws the geometries of the selection preview (or the hovered one)
+        self.hovered_geom = None  # the geometry under the cursor, in "selection" mode
 
         self.last_mouse_position = QPoint(0, 0)  # last position of the mouse in viewport-coordinates
 
@@ -153,6 +166,9 @@ class Canvas3d(QtOpenGL.QGLWidget):
                 event_x, event_y, z = self.camera.canvas2world(event.x(), event.y())
 
                 self.selection_box = SelectionBox(Point3(event_x, event_y, 0))
+                self.refresh_drawn_geometry()
+                self.selection_preview = SelectionPreview(self.selection_box, self.spatial_index)
+                self.highlight_renderer.invalidate()
 
         # update the rendered scene
         self.updateGL()
@@ -171,8 +187,15 @@ class Canvas3d(QtOpenGL.QGLWidget):
         elif self.mode == Canvas3d.MODE_SELECT:
             # selection events are only accepted in 2D View
             if self.camera.view_mode == Camera.VIEW_2D:
-                # select geometries inside the box before deleting it
-                self.selected_geoms = self.selection_box.select_geometries(self.renderables3d)
+                # a click (rather than a drag) selects the geometry under the cursor
+                if self.is_click(self.selection_box):
+                    picked = self.pick_geometry(event.x(), event.y())
+                    self.selected_geoms = [picked] if picked is not None else []
+
+                # else, select geometries inside the box before deleting it
+                else:
+                    self.selection_preview.update()
+                    self.selected_geoms = self.selection_preview.selected_geometries()
 
                 self.window().console_add_line("\nSELECTED SHAPES")
                 # self.parent.parent.console_add_line("\nSELECTED SHAPES")
@@ -180,18 +203,32 @@ class Canvas3d(QtOpenGL.QGLWidget):
                     self.window().console_add_line(str(g))
 
                 self.selection_box = None
+                self.selection_preview = None
+                self.highlight_renderer.invalidate()
 
         # if we are in "erase" mode
         elif self.mode == Canvas3d.MODE_ERASE:
             # erase events are only accepted in 2D View
             if self.camera.view_mode == Camera.VIEW_2D:
                 # select geometries inside the box before deleting it
-                selected_geoms = self.selection_box.select_geometries(self.renderables3d)
+                self.selection_preview.update()
+                selected_geoms = self.selection_preview.selected_geometries()
 
                 for g in selected_geoms:
                     self.remove_geometry(g)
 
+                # point clouds only partially inside the box lose the points falling inside it
+                bl, tr = self.selection_box.get_classical_bbox()
+                for g in self.query_geometries():
+                    if isinstance(g, PointCloud):
+                        g.remove_points(g.points_in_box(bl, tr))
+                        if not g.is_valid():
+                            self.remove_geometry(g)
+                        else:
+                            self.index_geometry(g)
+
                 self.selection_box = None
+                self.selection_preview = None
 
         # update the rendered scene
         self.updateGL()
@@ -206,6 +243,13 @@ class Canvas3d(QtOpenGL.QGLWidget):
             x, y, z = self.camera.canvas2world(event.x(), event.y())
             self.window().update_status_bar("(x, y): ({:.3f}, {:.3f})".format(x, y))
 
+            # in "selection" mode, highlight the geometry under the cursor
+            if self.mode == Canvas3d.MODE_SELECT and not event.buttons():
+                hovered_geom = self.pick_geometry(event.x(), event.y())
+                if hovered_geom is not self.hovered_geom:
+                    self.hovered_geom = hovered_geom
+                    self.highlight_renderer.invalidate()
+
         # if moving while pressing the left button
         if event.buttons() and event.buttons() == QtCore.Qt.LeftButton:
             # if in draw mode: continue drawing
@@ -223,6 +267,10 @@ class Canvas3d(QtOpenGL.QGLWidget):
                     delta_x, delta_y = event_x - x, event_y - y
                     self.selection_box.move_corner2(Point3(delta_x, delta_y, 0))
 
+                    # only the geometries near the edges swept by the box are checked again
+                    if self.selection_preview.update():
+                        self.highlight_renderer.invalidate()
+
 
             # if in exploration mode
             elif self.mode == Canvas3d.MODE_EXPLORE:
@@ -314,6 +362,7 @@ class Canvas3d(QtOpenGL.QGLWidget):
         # only if in draw mode
         if self.mode == Canvas3d.MODE_DRAW:
             x, y, z = self.camera.canvas2world(event.x(), event.y())
+            x, y = self.snap(x, y, moving_last_vertex=False)
             new_point = Point3(x, y, z)
             if self.draw_what == Canvas3d.DRAW_POINTS:
                 self.currently_drawn_geom = new_point
@@ -331,7 +380,11 @@ class Canvas3d(QtOpenGL.QGLWidget):
                 self.currently_drawn_geom.add_vertex(new_point)
 
             if isinstance(self.currently_drawn_geom, Geometry):
+                # the geometry being drawn changes at every mouse move
+                for renderable in self.currently_drawn_geom.get_renderables():
+                    renderable.set_buffer_usage(GL.GL_DYNAMIC_DRAW)
                 self.add_geometry(self.currently_drawn_geom)
+            self.update_snapping_vertices()
 
     def drawingEventRemoveLastVertex(self):
         """if possible, remove the last vertex from the drawn geometry (depends on the type of geometry)"""
@@ -343,6 +396,7 @@ class Canvas3d(QtOpenGL.QGLWidget):
                 # if the geometry has at least one vertex
                 if len(self.currently_drawn_geom) > 0:
                     self.currently_drawn_geom.remove_vertex()
+                    self.update_snapping_vertices()
 
                 # if the current geom has no vertices, cancel it
                 if len(self.currently_drawn_geom) == 0:
@@ -356,6 +410,7 @@ class Canvas3d(QtOpenGL.QGLWidget):
         if self.mode == Canvas3d.MODE_DRAW:
             if self.currently_drawn_geom is not None:
                 x, y, z = self.camera.canvas2world(event.x(), event.y())
+                x, y = self.snap(x, y, moving_last_vertex=True)
                 if self.draw_what == Canvas3d.DRAW_POINTS:
                     self.currently_drawn_geom.set_coords(x, y, z)
                 elif self.draw_what in (Canvas3d.DRAW_SEGMENTS, Canvas3d.DRAW_POLYGONS, Canvas3d.DRAW_POLYLINES):
@@ -381,6 +436,7 @@ class Canvas3d(QtOpenGL.QGLWidget):
         if self.mode == Canvas3d.MODE_DRAW and self.currently_drawn_geom is not None:
             self.remove_geometry(self.currently_drawn_geom)
             self.currently_drawn_geom = None
+            self.snapper.clear_own_vertices()
 
     def drawingEventEnd(self):
         """ends the drawing of the geometry and prepares the canvas for a new drawing"""
@@ -390,7 +446,11 @@ class Canvas3d(QtOpenGL.QGLWidget):
                 # if the drawn geometry is valid
                 if not self.currently_drawn_geom.is_valid():
                     self.remove_geometry(self.currently_drawn_geom)
+                else:
+                    # the geometry grew after being added to the canvas
+                    self.index_geometry(self.currently_drawn_geom)
                 self.currently_drawn_geom = None
+                self.snapper.clear_own_vertices()
 
     def prepare_shader_program(self, v_shader_path="", f_shader_path=""):
 
@@ -402,40 +462,11 @@ class Canvas3d(QtOpenGL.QGLWidget):
         fragment_shader_code = f_shader_file.read()
         f_shader_file.close()
 
-        if not self.shader_program:
-            # print("The shader is None, initialize it.")
-            self.shader_program = GL.glCreateProgram()
-            if not self.shader_program:
-                print("ERROR in shader PROGRAM creation")
-                return
-
-        # VERTEX SHADER
-        # create a vertex shader
-        vertex_shader = GL.glCreateShader(GL.GL_VERTEX_SHADER)
-        # set shader source_vertex
-        GL.glShaderSource(vertex_shader, vertex_shader_code)
-        # compile shader
-        GL.glCompileShader(vertex_shader)
-
-        # FRAGMENT SHADER
-        # create a fragment shader
-        fragment_shader = GL.glCreateShader(GL.GL_FRAGMENT_SHADER)
-        # set shader source_vertex
-        GL.glShaderSource(fragment_shader, fragment_shader_code)
-        # compile shader
-        GL.glCompileShader(fragment_shader)
-
-        # build and link the shader program given the vertex and the fragment shader
-        GL.glAttachShader(self.shader_program, vertex_shader)
-        GL.glAttachShader(self.shader_program, fragment_shader)
-        GL.glLinkProgram(self.shader_program)
-
-        # get rid of the shaders as 1. they have been compiled in the program, 2. we do not need them any longer
-        GL.glDetachShader(self.shader_program, vertex_shader)
-        GL.glDetachShader(self.shader_program, fragment_shader)
+        # compile and link the shader program (the locations of its attributes and uniforms are cached by it)
+        self.shader_program = ShaderProgram(vertex_shader_code, fragment_shader_code)
 
         # make the shader program we just compiled the default program to be run
-        GL.glUseProgram(self.shader_program)
+        self.shader_program.use()
 
     def initializeGL(self):
         # set the background color (to white)
@@ -474,27 +505,50 @@ class Canvas3d(QtOpenGL.QGLWidget):
 
     def paintGL(self):
         # print("paintGL")
+        self.shader_program.begin_frame()
+
         GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
 
         # bind (i.e., pass) the up-to-date view matrix to the vertex shader
-        loc = GL.glGetUniformLocation(self.shader_program, "u_view")
-        GL.glUniformMatrix4fv(loc, 1, GL.GL_FALSE, self.camera.get_view_matrix().data())
+        GL.glUniformMatrix4fv(self.shader_program.u_view, 1, GL.GL_FALSE, self.camera.get_view_matrix().data())
 
         # bind (i.e., pass) the up-to-date projection matrix to the vertex shader
-        loc = GL.glGetUniformLocation(self.shader_program, "u_projection")
-        GL.glUniformMatrix4fv(loc, 1, GL.GL_FALSE, self.camera.get_projection_matrix().data())
+        GL.glUniformMatrix4fv(self.shader_program.u_projection, 1, GL.GL_FALSE,
+                              self.camera.get_projection_matrix().data())
 
         # if visible not hidden, render the xy grid (only visible in 3D mode)
         self.xy_grid.render(self.shader_program)
 
-        # render all the geometries in the canvas
-        for renderable in self.renderables3d:
-            # print("Going to paint the renderable: " + str(cube.renderable_vertex_array['position']))
-            renderable.render(self.shader_program)
+        # render all the geometries in the canvas.
+        # The geometry being drawn changes at every mouse move, so it is rendered on its own instead of forcing
+        # the repacking of a whole batch
+        self.batch_renderer.render(self.shader_program, self.renderables3d, excluded=(self.currently_drawn_geom,))
+
+        # the geometries in the selection preview (or the hovered one) are drawn again over themselves, tinted and
+        # thicker
+        if self.selection_preview is not None:
+            highlighted_geoms = self.selection_preview.selected_geometries()
+        elif self.hovered_geom is not None and self.mode == Canvas3d.MODE_SELECT:
+            highlighted_geoms = [self.hovered_geom]
+        else:
+            highlighted_geoms = []
+
+        if highlighted_geoms:
+            GL.glDepthFunc(GL.GL_LEQUAL)
+            GL.glPointSize(config_rendering_selection_point_size)
+            GL.glLineWidth(config_rendering_selection_line_width)
+            self.highlight_renderer.render(self.shader_program, highlighted_geoms, tint=config_rendering_selection_tint)
+            GL.glPointSize(config_rendering_point_size)
+            GL.glLineWidth(config_rendering_line_width)
+            GL.glDepthFunc(GL.GL_LESS)
 
         if self.selection_box is not None:
             self.selection_box.render(self.shader_program)
 
+        gl_calls = self.shader_program.end_frame()
+        if config_rendering_report_gl_calls:
+            print("GL calls in the last frame: " + str(gl_calls))
+
     def add_geometry(self, *geoms):
         """
         add a geometry to the canvas (namely to the list renderables)
@@ -503,6 +557,9 @@ class Canvas3d(QtOpenGL.QGLWidget):
         """
         for geom in geoms:
             self.renderables3d.add(geom)
+            self.spatial_index.insert(geom, geometry_box(geom))
+            self.pick_index.insert(geom)
+        self.batch_renderer.invalidate()
         self.updateGL()
 
     def remove_geometry(self, geom):
@@ -512,4 +569,104 @@ class Canvas3d(QtOpenGL.QGLWidget):
         :return: None
         """
         self.renderables3d.remove(geom)
-        self.updateGL()
\ No newline at end of file
+        self.spatial_index.remove(geom)
+        self.pick_index.remove(geom)
+
+        # free the GPU buffers of the geometry (in the GL context of the canvas)
+        self.makeCurrent()
+        for renderable in geom.get_renderables():
+            renderable.delete_GPU_buffers()
+
+        if geom is self.hovered_geom:
+            self.hovered_geom = None
+            self.highlight_renderer.invalidate()
+        self.batch_renderer.invalidate()
+        self.updateGL()
+
+    def index_geometry(self, geom):
+        """update the indices of the canvas after the given geometry changed its shape"""
+        self.spatial_index.update(geom, geometry_box(geom))
+        self.pick_index.update(geom)
+
+    def refresh_drawn_geometry(self):
+        """a geometry being drawn changes at every mouse move, so it is indexed again only when needed"""
+        if self.currently_drawn_geom is not None and self.currently_drawn_geom in self.spatial_index:
+            self.index_geometry(self.currently_drawn_geom)
+
+    def pick_geometry(self, canvas_x, canvas_y):
+        """
+        :return: the geometry with the vertex (or segment) nearest to the given canvas position, within
+        config_picking_tolerance pixels, or None
+        """
+        self.refresh_drawn_geometry()
+
+        x, y, z = self.camera.canvas2world(canvas_x, canvas_y)
+        return self.pick_index.nearest_geometry(x, y, config_picking_tolerance / self.camera.pixels_per_unit)
+
+    def snap(self, x, y, moving_last_vertex=False):
+        """
+        snap a position to the nearest vertex, segment, or grid node (see Snapper), unless snapping is disabled or the
+        SHIFT key is held down
+        :param x, y: the world coordinates of the position
+        :param moving_last_vertex: True if the last vertex of the geometry being drawn is being moved (so it must not
+        snap to itself)
+        :return: the x, y world coordinates of the snapped position
+        """
+        if not config_snapping_enabled or QtGui.QApplication.keyboardModifiers() == QtCore.Qt.ShiftModifier:
+            return x, y
+
+        # the geometry being drawn is not up-to-date in the index: its vertices already placed are in the snapper (see
+        # update_snapping_vertices), but the last one, which is fixed too when a new vertex is being placed
+        drawn_geom = self.currently_drawn_geom
+        last_vertex = []
+        vertices, first = self.snapping_vertices()
+        if not moving_last_vertex and len(vertices) > first:
+            last_vertex = [(vertices[-1].x(), vertices[-1].y())]
+
+        x, y, snapped_to = self.snapper.snap(x, y, config_snapping_tolerance / self.camera.pixels_per_unit,
+                                             exclude=drawn_geom, own_vertices=last_vertex)
+        if snapped_to != Snapper.NONE:
+            self.window().update_status_bar("(x, y): ({:.3f}, {:.3f}) snapped".format(x, y))
+        return x, y
+
+    def snapping_vertices(self):
+        """
+        :return: the vertices of the geometry being drawn, and the index of the first one that can be snapped to (not
+        the first vertex of a polygon: the boundary is closed on it anyway, and a vertex snapped onto it would repeat
+        it)
+        """
+        drawn_geom = self.currently_drawn_geom
+        if isinstance(drawn_geom, LineString):
+            return drawn_geom, 0
+        elif isinstance(drawn_geom, Polygon):
+            return drawn_geom.boundary, 1
+        return [], 0
+
+    def update_snapping_vertices(self):
+        """
+        keep the fixed vertices of the geometry being drawn (all but the last one, which follows the mouse) in the
+        snapper: each vertex placed or removed adds or removes one vertex, so the snaps do not visit all of them
+        """
+        vertices, first = self.snapping_vertices()
+        fixed_num = max(0, len(vertices) - 1 - first)
+        while self.snapper.own_vertex_num > fixed_num:
+            self.snapper.remove_own_vertex()
+        while self.snapper.own_vertex_num < fixed_num:
+            vertex = vertices[first + self.snapper.own_vertex_num]
+            self.snapper.add_own_vertex(vertex.x(), vertex.y())
+
+    def is_click(self, selection_box):
+        """:return: True if the given selection box is so small (on screen) that it was made by a click"""
+        delta = selection_box.corner2 - selection_box.corner1
+        return max(abs(delta.x()), abs(delta.y())) * self.camera.pixels_per_unit <= config_picking_tolerance
+
+    def query_geometries(self, contained=False):
+        """
+        find the geometries in the canvas whose bounding box intersects the selection box (or lies inside it)
+        :param contained: if True, only the geometries whose bounding box lies inside the selection box are returned
+        :return: a list of geometries
+        """
+        self.refresh_drawn_geometry()
+
+        bl, tr = self.selection_box.get_classical_bbox()
+        return self.spatial_index.query(bl, tr, contained=contained)
\ No newline at end of file
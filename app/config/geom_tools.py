@@ -1,5 +1,6 @@
 from app.algorithms.print_geoms import *
 from app.algorithms.geom_count import *
+from app.algorithms.segment_intersections import *
 
 
 # a utility class to collect all necessary info about a tool
@@ -102,6 +103,12 @@ tools_2d["tool2d_operation_select"] = \
                  obj_type="select_item",
                  operation_func=print_geoms
              ),
+             "Segment Intersections": Tool(
+                 obj_type="select_item",
+                 status_text="Computing the intersections of the segments",
+                 info_text="Adds to the canvas all the intersection points among the segments of the lines",
+                 operation_func=segments_intersections
+             ),
          }
          )
 
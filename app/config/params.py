@@ -4,6 +4,19 @@ from app.utils.color import *
 #       RENDERING
 config_rendering_point_size = 4
 config_rendering_line_width = 1.0
+config_rendering_report_gl_calls = False  # if True, print the number of GL calls done to draw each frame
+
+#   selection preview config (the geometries inside the selection box are drawn again over themselves)
+config_rendering_selection_tint = (1.0, 0.45, 0.0, 1.0)  # multiplies the colors of the selected geometries
+config_rendering_selection_point_size = 8
+config_rendering_selection_line_width = 3.0
+
+#       PICKING
+config_picking_tolerance = 6  # the max distance (in pixels) of a picked vertex or segment from the cursor
+
+#       SNAPPING (while drawing; hold SHIFT down to place a vertex without snapping)
+config_snapping_enabled = True
+config_snapping_tolerance = 8  # the max distance (in pixels) of the cursor from a vertex, segment, or grid node
 
 #   grid config
 config_rendering_grid_col_num = 100
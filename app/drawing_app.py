@@ -140,9 +140,9 @@ class DrawingApp(QtGui.QMainWindow, main_window.Ui_MainWindow):
 
             bbox = Box3D(Point3(bbox_min_x, bbox_min_y, bbox_min_z), Point3(bbox_max_x, bbox_max_y, bbox_max_z))
 
-            random_points = Point3.random(bbox, points_num)
+            random_points = PointCloud.random(bbox, points_num)
 
-            self.canvas.add_geometry(*random_points)
+            self.canvas.add_geometry(random_points)
 
     @pyqtSlot()
     def perform_operation(self):
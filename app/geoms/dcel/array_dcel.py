@@ -0,0 +1,402 @@
+"""
+An index-based variant of the DCEL defined in app.geoms.dcel.dcel.
+
+The DCEL class builds one Python object for every Vertex, Edge and Face and links them through attribute references.
+The ArrayDCEL stores exactly the same information, but in a struct-of-arrays layout made of few NumPy arrays:
+    - coords: a (V, 3) float32 array with the location of each vertex
+    - vertex_outgoing: for each vertex, the index of an (arbitrary) outgoing half-edge
+    - isolated_vertices: the indices of the vertices not connected to any edge (used to represent points)
+    - he_target, he_twin, he_next, he_prev, he_face: int32 columns storing, for each half-edge, its target vertex,
+      its twin half-edge, the next and the previous half-edges on its face, and the face it is adjacent to
+    - face_edge: for each face, the index of an arbitrary half-edge of the (single) edge chain bounding it
+
+Missing references (e.g., the next edge of the last edge of an open chain) are denoted by -1.
+As in the DCEL, the exterior face is the face with index 0, open chains denote linear geometries, and closed chains
+denote (triangular) faces.
+
+The ArrayDCEL exposes the same make_from_points / make_from_line / make_from_polygon / make_from_solid /
+get_renderable_arrays API of the DCEL, so a Renderable3d can use either of them (see its dcel_class parameter).
+Since everything is built with vectorized NumPy operations, the ArrayDCEL is the one to use for large meshes.
+"""
+
+import numpy as np
+
+from app.geoms.utils.constants import EPSILON
+from app.geoms.utils.triangulation import triangulate
+
+
+def _points_to_coords(points):
+    """
+    :param points: a sequence of Point3 (or of any array-like of 3 coordinates)
+    :return: a (len(points), 3) float32 array with the coordinates of the points
+    """
+    return np.array(points, dtype=np.float32).reshape(-1, 3)
+
+
+def match_half_edge_twins(sources, targets, vertex_num):
+    """
+    pair each directed half-edge sources[i] -> targets[i] with the half-edge going in the opposite direction.
+    The half-edges are turned into integer keys that are sorted once, so that all twins are found with a single
+    binary search (O(n log n) overall).
+    :param sources: array of the indices of the source vertices of the half-edges
+    :param targets: array of the indices of the target vertices of the half-edges
+    :param vertex_num: the number of vertices the indices refer to
+    :return: twins: an int32 array with the index of the twin of each half-edge (-1 for boundary half-edges),
+             non_manifold: a boolean array marking the half-edges that occur more than once (i.e., the directed
+             edges shared by more than one face, which cannot be represented by a DCEL)
+    """
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    edge_num = len(sources)
+
+    twins = np.full(edge_num, -1, dtype=np.int32)
+    non_manifold = np.zeros(edge_num, dtype=bool)
+    if edge_num == 0:
+        return twins, non_manifold
+
+    keys = sources * vertex_num + targets
+    order = np.argsort(keys, kind='mergesort')
+    sorted_keys = keys[order]
+
+    # equal consecutive keys denote the same directed edge used more than once
+    repeated = sorted_keys[1:] == sorted_keys[:-1]
+    non_manifold[order[1:][repeated]] = True
+    non_manifold[order[:-1][repeated]] = True
+
+    # the twin of (s, t) is the half-edge with key (t, s)
+    twin_keys = targets * vertex_num + sources
+    positions = np.minimum(np.searchsorted(sorted_keys, twin_keys), edge_num - 1)
+    found = sorted_keys[positions] == twin_keys
+    twins[found] = order[positions[found]]
+
+    return twins, non_manifold
+
+
+def triangle_half_edges(triangles, vertex_num, double_sided=False):
+    """
+    build the half-edges of a set of triangular faces, and pair them with their twins (see match_half_edge_twins).
+    The half-edge 3f+k goes from triangles[f, k] to triangles[f, (k+1) % 3].
+    Both ArrayDCEL and DCEL are built from these arrays.
+    :param triangles: an array of vertex indices, whose triplets define the triangles (in CCW order)
+    :param vertex_num: the number of vertices the indices refer to
+    :param double_sided: if True, a back face (with reversed orientation) is added for each triangle, and the
+    boundary edges of the front faces become twins of those of the back faces (as needed to represent polygons)
+    :return: triangles: the (F, 3) int32 array of the faces (the back faces following the front ones),
+             sources, targets: int32 arrays with the source and the target vertex of each half-edge,
+             twins: an int32 array with the index of the twin of each half-edge (-1 for boundary half-edges),
+             non_manifold: a boolean array marking the half-edges of the front faces shared by more than one face
+    """
+    triangles = np.asarray(triangles, dtype=np.int32).reshape(-1, 3)
+
+    sources = triangles.ravel()
+    targets = np.roll(triangles, -1, axis=1).ravel()
+    twins, non_manifold = match_half_edge_twins(sources, targets, vertex_num)
+
+    if double_sided:
+        # the back face of triangle (a, b, c) is (c, b, a), so the half-edge 3f+k of a front face runs
+        # opposite to the half-edge 3(F+f)+mirror_k[k] of the corresponding back face
+        front_face_num = len(triangles)
+        front_half_edges = np.arange(3 * front_face_num, dtype=np.int32)
+        mirror_k = np.array([1, 0, 2], dtype=np.int32)
+        mirrors = 3 * (front_face_num + front_half_edges // 3) + mirror_k[front_half_edges % 3]
+
+        # back faces are linked to each other as the front faces are,
+        # while the boundary of the front faces is linked to the boundary of the back faces
+        back_twins = np.empty(3 * front_face_num, dtype=np.int32)
+        inner = twins >= 0
+        back_twins[mirrors[inner] - 3 * front_face_num] = mirrors[twins[inner]]
+        back_twins[mirrors[~inner] - 3 * front_face_num] = front_half_edges[~inner]
+        twins[~inner] = mirrors[~inner]
+
+        triangles = np.concatenate((triangles, triangles[:, ::-1]))
+        sources = triangles.ravel()
+        targets = np.roll(triangles, -1, axis=1).ravel()
+        twins = np.concatenate((twins, back_twins))
+
+    return triangles, sources, targets, twins, non_manifold
+
+
+class ArrayDCEL(object):
+    def __init__(self):
+        self.coords = None
+        self.vertex_outgoing = None
+        self.isolated_vertices = None
+
+        self.he_target = None
+        self.he_twin = None
+        self.he_next = None
+        self.he_prev = None
+        self.he_face = None
+
+        self.face_edge = None
+
+        self.reset()
+
+    def reset(self):
+        self.coords = np.zeros((0, 3), dtype=np.float32)
+        self.vertex_outgoing = np.zeros(0, dtype=np.int32)
+        self.isolated_vertices = np.zeros(0, dtype=np.int32)
+
+        self.he_target = np.zeros(0, dtype=np.int32)
+        self.he_twin = np.zeros(0, dtype=np.int32)
+        self.he_next = np.zeros(0, dtype=np.int32)
+        self.he_prev = np.zeros(0, dtype=np.int32)
+        self.he_face = np.zeros(0, dtype=np.int32)
+
+        self.face_edge = np.zeros(0, dtype=np.int32)
+
+    @property
+    def vertex_num(self):
+        return len(self.coords)
+
+    @property
+    def half_edge_num(self):
+        return len(self.he_target)
+
+    @property
+    def face_num(self):
+        return len(self.face_edge)
+
+    def he_source(self, half_edges=None):
+        """
+        :param half_edges: an index (or an array of indices) of half-edges. If None, all half-edges are considered
+        :return: the index (or the array of indices) of the source vertices of the given half-edges
+        """
+        if half_edges is None:
+            return self.he_target[self.he_twin]
+        return self.he_target[self.he_twin[half_edges]]
+
+    def make_from_points(self, *points):
+        # each point is an isolated vertex of the exterior face
+
+        self.reset()  # first reset the DCEL
+
+        self.coords = _points_to_coords(points)
+        self.vertex_outgoing = np.full(len(self.coords), -1, dtype=np.int32)
+        self.isolated_vertices = np.arange(len(self.coords), dtype=np.int32)
+
+    def make_from_line(self, line):
+        # line is a linear entity consisting of a list of vertices
+
+        self.reset()  # first reset the DCEL
+
+        if len(line.vertices) < 2:
+            self.make_from_points(*line.vertices)
+            return
+
+        # as in the DCEL, there is a vertex for each vertex of the line
+        self.coords = _points_to_coords(line.vertices)
+
+        segment_num = len(self.coords) - 1
+        segments = np.arange(segment_num, dtype=np.int32)
+        forward, backward = 2 * segments, 2 * segments + 1
+
+        # the half-edge 2i goes from vertex i to vertex i+1, its twin 2i+1 goes back from vertex i+1 to vertex i.
+        # Both chains are open and lie on the exterior face
+        self.he_target = np.empty(2 * segment_num, dtype=np.int32)
+        self.he_target[forward] = segments + 1
+        self.he_target[backward] = segments
+
+        self.he_twin = np.empty(2 * segment_num, dtype=np.int32)
+        self.he_twin[forward] = backward
+        self.he_twin[backward] = forward
+
+        self.he_next = np.empty(2 * segment_num, dtype=np.int32)
+        self.he_next[forward] = forward + 2
+        self.he_next[forward[-1]] = -1
+        self.he_next[backward] = backward - 2
+        self.he_next[backward[0]] = -1
+
+        self.he_prev = np.empty(2 * segment_num, dtype=np.int32)
+        self.he_prev[forward] = forward - 2
+        self.he_prev[forward[0]] = -1
+        self.he_prev[backward] = backward + 2
+        self.he_prev[backward[-1]] = -1
+
+        self.he_face = np.zeros(2 * segment_num, dtype=np.int32)
+        self.face_edge = np.zeros(1, dtype=np.int32)
+
+        self.vertex_outgoing = np.empty(segment_num + 1, dtype=np.int32)
+        self.vertex_outgoing[:-1] = forward
+        self.vertex_outgoing[-1] = backward[-1]
+
+    def make_from_polygon(self, polygon):
+
+        # REMEMBER (see DCEL.make_from_polygon):
+        #  1. polygons are represented by a set of triangular faces
+        #  2. polygons have faces for both sides of the polygon (front and back)
+        #  3. the boundary and the holes of the polygon are triangulated with app.geoms.utils.triangulation
+
+        self.reset()  # first reset the DCEL
+
+        if len(polygon) > 2:
+            rings = [_points_to_coords(r.vertices[:len(r)]) for r in polygon.rings if len(r) > 2]
+            coords = np.concatenate(rings)
+
+            front_faces = triangulate(rings)
+
+            if len(front_faces):  # no triangles, if the vertices are not (at least) 3 distinct ones
+                self._make_from_triangles(coords, front_faces, double_sided=True)
+
+    def make_from_solid(self, solid):
+        """
+        a solid Must have a vertex array and an element array.
+        The DCEL is generated straightforwardly from those.
+        REMEMBER: by design the element array defines triplets of vertices (triangles)
+        :param solid: a Solid object
+        :return: fills the DCEL
+        """
+
+        self.reset()  # first reset the DCEL
+
+        coords = solid.renderable_vertex_array['coords']
+        coords = np.column_stack((coords['x'], coords['y'], coords['z'])).astype(np.float32)
+
+        self._make_from_triangles(coords, solid.renderable_element_array)
+
+    def _make_from_triangles(self, coords, triangles, double_sided=False):
+        """
+        fill the DCEL with a set of triangular faces.
+        The first triangle is the exterior face. Half-edges with no twin (i.e., on the boundary of the mesh) are
+        paired with a new half-edge that is not adjacent to any face.
+        :param coords: a (V, 3) array with the coordinates of the vertices
+        :param triangles: an array of vertex indices, whose triplets define the triangles (in CCW order)
+        :param double_sided: if True, a back face (with reversed orientation) is added for each triangle, and the
+        boundary edges of the front faces become twins of those of the back faces (as needed to represent polygons)
+        """
+
+        self.coords = coords
+
+        triangles, sources, targets, twins, non_manifold = triangle_half_edges(triangles, len(coords), double_sided)
+
+        if non_manifold.any():
+            raise Exception("Error while building the ArrayDCEL. " +
+                            "\nMalformed DCEL: " + str(np.count_nonzero(non_manifold)) +
+                            " half-edges are shared by more than one face (non-manifold mesh)!")
+
+        face_num = len(triangles)
+
+        half_edges = np.arange(3 * face_num, dtype=np.int32)
+        first_of_face = half_edges - half_edges % 3
+        next_edges = first_of_face + (half_edges + 1) % 3
+        prev_edges = first_of_face + (half_edges + 2) % 3
+
+        # pair the boundary half-edges with new twins
+        boundary = np.flatnonzero(twins < 0).astype(np.int32)
+        boundary_twins = np.arange(3 * face_num, 3 * face_num + len(boundary), dtype=np.int32)
+        twins[boundary] = boundary_twins
+        no_reference = np.full(len(boundary), -1, dtype=np.int32)
+
+        self.he_target = np.concatenate((targets, sources[boundary]))
+        self.he_twin = np.concatenate((twins, boundary))
+        self.he_next = np.concatenate((next_edges, no_reference))
+        self.he_prev = np.concatenate((prev_edges, no_reference))
+        self.he_face = np.concatenate((half_edges // 3, no_reference))
+
+        self.face_edge = 3 * np.arange(face_num, dtype=np.int32)
+
+        self.vertex_outgoing = np.full(len(coords), -1, dtype=np.int32)
+        self.vertex_outgoing[sources] = half_edges
+
+    def get_outgoing_edges(self, vertex):
+        """
+        :param vertex: the index of a vertex
+        :return: the list of the indices of the half-edges going out of the vertex, ordered counterclockwise
+        """
+        out_edges = []
+        visited_edges = set()
+        current_out_edge = self.vertex_outgoing[vertex]
+        while current_out_edge >= 0 and current_out_edge not in visited_edges:
+            out_edges.append(current_out_edge)
+            visited_edges.add(current_out_edge)
+            current_out_edge = self.he_next[self.he_twin[current_out_edge]]
+        return out_edges
+
+    def get_adjacent_faces(self, face):
+        """
+        :param face: the index of a face
+        :return: the list of the indices of the faces sharing an edge with the given one
+        """
+        adjacent_faces = set()
+        visited_edges = set()
+        current_edge = self.face_edge[face]
+        while current_edge >= 0 and current_edge not in visited_edges:
+            visited_edges.add(current_edge)
+            adjacent_face = self.he_face[self.he_twin[current_edge]]
+            if adjacent_face >= 0 and adjacent_face != face:
+                adjacent_faces.add(int(adjacent_face))
+            current_edge = self.he_next[current_edge]
+        return list(adjacent_faces)
+
+    def __str__(self):
+        return "ArrayDCEL (obj_id " + str(id(self)) + ")<" + \
+               str(self.vertex_num) + " vertices, " + \
+               str(len(self.isolated_vertices)) + " isolated vertices, " + \
+               str(self.half_edge_num) + " half-edges, " + \
+               str(self.face_num) + " faces>"
+
+    def get_renderable_arrays(self):
+        """
+        same as DCEL.get_renderable_arrays, but computed with vectorized operations over the arrays of the DCEL
+        :return: vertices: a (V, 3) array with the coordinates of the vertices,
+        elements: an array of indices [idx_1, idx_2, idx_3, ...] from the array vertices.
+         if the DCEL represents a set of point, each index refers a point to be rendered
+         if the DCEL represents a linear entity, each pair of indices forms a segment to be rendered
+         if the DCEL represents a polygon or a polyhedron, each triplet of indices form a face to be rendered
+        outline_elements: an array of indices, each pair of which forms a segment of the outline
+        """
+
+        vertices = self.coords
+        no_elements = np.zeros(0, dtype=np.uint32)
+
+        if len(self.isolated_vertices):
+            # if there are isolated vertices it means this DCEL represents a set of points (and nothing more)
+            return vertices, self.isolated_vertices.astype(np.uint32), no_elements
+
+        if self.face_num == 0:
+            return vertices, no_elements, no_elements
+
+        half_edges = np.arange(self.half_edge_num, dtype=np.int32)
+        sources = self.he_source()
+
+        # a face is bounded by an open chain (i.e., it is a linear geometry) if its edge has no prev_edge
+        closed_faces = self.he_prev[self.face_edge] >= 0
+        closed_by_half_edge = np.zeros(self.half_edge_num, dtype=bool)
+        on_face = self.he_face >= 0
+        closed_by_half_edge[on_face] = closed_faces[self.he_face[on_face]]
+
+        # open chains: each segment must be given once, as the pair (source, target) of one of its two half-edges
+        segments = half_edges[on_face & ~closed_by_half_edge & (half_edges < self.he_twin)]
+        segment_elements = np.column_stack((sources[segments], self.he_target[segments]))
+
+        # closed chains: each (triangular) face is given by the source and the target of its edge,
+        # and by the target of the next edge
+        face_edges = self.face_edge[closed_faces]
+        face_elements = np.column_stack((sources[face_edges],
+                                         self.he_target[face_edges],
+                                         self.he_target[self.he_next[face_edges]]))
+
+        elements = np.concatenate((segment_elements.ravel(), face_elements.ravel())).astype(np.uint32)
+
+        # the outline consists of the edges of the faces (each taken once) that either lie on the boundary
+        # or separate two non-coplanar faces
+        twins = self.he_twin
+        twin_on_face = self.he_face[twins] >= 0
+        candidates = half_edges[closed_by_half_edge & (~twin_on_face | (half_edges < twins))]
+
+        is_outline = self.he_face[twins[candidates]] < 0
+        inner = candidates[~is_outline]
+        if len(inner):
+            from app.geoms.tetrahedron import Tetrahedron
+            # four points are coplanar if the volume of the tetrahedron they form is 0
+            signed_volumes = Tetrahedron.signed_volumes(vertices[sources[inner]],
+                                                        vertices[self.he_target[inner]],
+                                                        vertices[self.he_target[self.he_next[inner]]],
+                                                        vertices[self.he_target[self.he_next[twins[inner]]]])
+            is_outline[~is_outline] = np.abs(signed_volumes) > EPSILON
+
+        outline_edges = candidates[is_outline]
+        outline_elements = np.column_stack((sources[outline_edges],
+                                            self.he_target[outline_edges])).ravel().astype(np.uint32)
+
+        return vertices, elements, outline_elements
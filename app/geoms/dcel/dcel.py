@@ -43,6 +43,27 @@ In this case, the face represent the empty space, so it must not be rendered.
 
 #from app.geoms.utils.basepoint import *
 
+import numpy as np
+
+from app.geoms.utils.constants import EPSILON
+from app.geoms.utils.growing_array import GrowingArray
+from app.geoms.utils.triangulation import triangulate
+
+
+def _are_coplanar(a, b, c, d):
+    """
+    same as Point3.are_coplanar for exactly four points, but without creating any intermediate Point3 object
+    :return: True if the four points are coplanar, False otherwise
+    """
+    (ax, ay, az), (bx, by, bz), (cx, cy, cz), (dx, dy, dz) = a.tolist(), b.tolist(), c.tolist(), d.tolist()
+    ax, ay, az = ax - dx, ay - dy, az - dz
+    bx, by, bz = bx - dx, by - dy, bz - dz
+    cx, cy, cz = cx - dx, cy - dy, cz - dz
+
+    # four points are coplanar if the volume of the tetrahedron they form is 0
+    signed_volume = ax * (by * cz - bz * cy) + ay * (bz * cx - bx * cz) + az * (bx * cy - by * cx)
+    return -EPSILON <= signed_volume <= EPSILON
+
 
 def _is_chain_open(edge_chain):
     return edge_chain[0].prev_edge is None
@@ -95,9 +116,9 @@ class Vertex(object):
             out_edges.append(current_out_edge)
             visited_edges.add(current_out_edge)
 
-            current_in_edge = current_out_edge.getTwin()
+            current_in_edge = current_out_edge.twin_edge
             if current_in_edge:
-                current_out_edge = current_in_edge.getNext()
+                current_out_edge = current_in_edge.next_edge
             else:  # inconsistency
                 raise Exception("Error while computing outgoing edges for vertex " + str(self) + ". " +
                                 "\nMalformed DCEL: edge " + str(current_out_edge) + " has no twin!")
@@ -108,7 +129,7 @@ class Vertex(object):
         to build and return a list of of ingoing edges, ordered counterclockwise."""
 
         current_out_edge = self.outgoing_edge
-        current_in_edge = current_out_edge.getTwin()
+        current_in_edge = current_out_edge.twin_edge
         if not current_in_edge:  # inconsistency
             raise Exception("Error while computing outgoing edges for vertex " + str(self) + ". " +
                             "\nMalformed DCEL: edge " + str(current_out_edge) + " has no twin!")
@@ -118,8 +139,8 @@ class Vertex(object):
             in_edges.append(current_in_edge)
             visited_edges.add(current_in_edge)
 
-            current_out_edge = current_in_edge.getNext()
-            current_in_edge = current_out_edge.getTwin()
+            current_out_edge = current_in_edge.next_edge
+            current_in_edge = current_out_edge.twin_edge
             if not current_in_edge:  # inconsistency
                 raise Exception("Error while computing outgoing edges for vertex " + str(self) + ". " +
                                 "\nMalformed DCEL: edge " + str(current_in_edge) + " has no twin!")
@@ -190,7 +211,8 @@ class Edge(object):
                 current_edge = current_edge.prev_edge
 
             if len(prev_chain) > 0:
-                chain = prev_chain.reverse() + chain
+                prev_chain.reverse()
+                chain = prev_chain + chain
 
         return chain
 
@@ -277,14 +299,18 @@ class DCEL(object):
     def __init__(self):
         self.exterior_face = Face()  # initially only one face representing the whole plane
 
-        # TODO: edges and renderable_vertex_array are not needed?
         self.edges = list()  # list of edges of this DCEL
-        self.vertices = list()  # list of renderable_vertex_array of this DCEL
+        self.vertices = list()  # list of vertices of this DCEL
+        # when the DCEL represents a line (see make_from_line) these lists allow for editing it in O(1):
+        # the vertices are the vertices of the line, in order, and the i-th edge goes from the i-th to the (i+1)-th
 
     def reset(self):
         del self.exterior_face
         self.exterior_face = Face()
 
+        self.edges = list()
+        self.vertices = list()
+
     def make_from_points(self, *points):
         # for each point, simply add a Vertex (corresponding to point) to the exterior_face
 
@@ -305,6 +331,7 @@ class DCEL(object):
             last_e = None
             last_t_e = None
             source_vertex = Vertex(line.vertices[0])
+            self.vertices.append(source_vertex)
 
             for i in range(1, len(line.vertices)):
 
@@ -329,113 +356,101 @@ class DCEL(object):
                 if i == 1:
                     self.exterior_face.adjacent_edges.append(e)
 
+                self.vertices.append(target_vertex)
+                self.edges.append(e)
+
                 source_vertex = target_vertex
                 last_e, last_t_e = e, t_e
 
-    def make_from_polygon(self, polygon):
-
-        # REMEMBER:
-        #  1. polygons are represented by a set of triangular faces
-        #  2. polygons have faces for both sides of the polygon (front and back)
-        #  3. we treat only convex polygons without holes,
-        #     so can be trivially triangulated connecting the first vertex to all others
-
-        self.reset()  # first reset the DCEL
-
-        if len(polygon) > 2:
-            v0, v1 = Vertex(polygon.boundary[0]), Vertex(polygon.boundary[1])
-            last_e2 = None
-            last_t_e2 = None
-
-            first, last = 2, len(polygon)
-            for i in range(first, last):
-
-                v2 = Vertex(polygon.boundary[i])
-                # print("CONSIDERING VERTICES: v0: " + str(v0) + " v1: " + str(v1) + " v2: " + str(v2))
-
-                # -------------------------------
-                # first do the front face
+    def append_line_vertex(self, point):
+        """
+        append a vertex at the end of the line represented by this DCEL (see make_from_line) in O(1)
+        :param point: the Point3 of the new vertex
+        """
+        last_e = self.edges[-1]
+        last_t_e = last_e.twin_edge
 
-                # decide if the front face is the exterior face or a new one
-                front_face = self.exterior_face if i == first else Face()
+        target_vertex = Vertex(point)
 
-                # create the edges
-                e0 = Edge(v1, front_face)
-                e1 = Edge(v2, front_face)
-                e2 = Edge(v0, front_face)
+        e = Edge(target_vertex, self.exterior_face, prev_edge=last_e)  # edge
+        t_e = Edge(last_e.target_vertex, self.exterior_face, next_edge=last_t_e)  # twin edge
+        e.twin_edge, t_e.twin_edge = t_e, e
 
-                # append one of these edges to the face
-                front_face.adjacent_edges.append(e0)
+        last_e.next_edge = e
+        last_t_e.prev_edge = t_e
 
-                # set prev and next edges for each edge
-                e0.prev_edge = e2
-                e0.next_edge = e1
+        self.vertices.append(target_vertex)
+        self.edges.append(e)
 
-                e1.prev_edge = e0
-                e1.next_edge = e2
+    def split_line_edge(self, i, point):
+        """
+        split the i-th edge of the line represented by this DCEL (see make_from_line) by inserting a new vertex
+        between the i-th and the (i+1)-th vertex. The DCEL is updated in O(1) (plus the shift of the lists vertices
+        and edges)
+        :param i: the index of the edge to be split
+        :param point: the Point3 of the new vertex
+        """
+        e = self.edges[i]  # goes from the i-th to the (i+1)-th vertex
+        t_e = e.twin_edge
+        middle_vertex = Vertex(point)
 
-                e2.prev_edge = e1
-                e2.next_edge = e0
+        # e now reaches the middle vertex, and a new edge e2 goes from the middle vertex to the old target of e
+        e2 = Edge(e.target_vertex, self.exterior_face, prev_edge=e, next_edge=e.next_edge)
+        if e.next_edge:
+            e.next_edge.prev_edge = e2
+        e.next_edge = e2
+        e.target_vertex = middle_vertex
 
-                # -------------------------------
-                # do the back face
+        # t_e now starts from the middle vertex, and a new twin edge t_e2 goes from the old source of t_e to it
+        t_e2 = Edge(middle_vertex, self.exterior_face, prev_edge=t_e.prev_edge, next_edge=t_e)
+        if t_e.prev_edge:
+            t_e.prev_edge.next_edge = t_e2
+        t_e.prev_edge = t_e2
 
-                # the back face is always a new face
-                back_face = Face()
+        e2.twin_edge, t_e2.twin_edge = t_e2, e2
 
-                # create the twin edges
-                t_e0 = Edge(v0, back_face)
-                t_e1 = Edge(v1, back_face)
-                t_e2 = Edge(v2, back_face)
+        self.vertices.insert(i + 1, middle_vertex)
+        self.edges.insert(i + 1, e2)
 
-                # append one of these edges to the face
-                back_face.adjacent_edges.append(t_e0)
+    def move_vertex(self, i, point):
+        """
+        move the i-th vertex of the line represented by this DCEL (see make_from_line) in O(1)
+        :param i: the index of the vertex
+        :param point: the new Point3 of the vertex
+        """
+        self.vertices[i].point = point
 
-                # set the prev and next edges for each twin_edge
-                t_e0.prev_edge = t_e1
-                t_e0.next_edge = t_e2
+    def remove_line_tail(self):
+        """
+        remove the last vertex (and the last edge) of the line represented by this DCEL (see make_from_line) in O(1).
+        The line must keep at least one edge
+        """
+        if len(self.edges) < 2:
+            raise Exception("DCEL.remove_line_tail requires the line to have at least two edges")
 
-                t_e1.prev_edge = t_e2
-                t_e1.next_edge = t_e0
+        last_e = self.edges.pop()
+        self.vertices.pop()
 
-                t_e2.prev_edge = t_e0
-                t_e2.next_edge = t_e1
+        last_e.prev_edge.next_edge = None
+        last_e.twin_edge.next_edge.prev_edge = None
 
-                # -------------------------------
-                # now set the twin references
+    def make_from_polygon(self, polygon):
 
-                if i == first:
-                    # if this is the first triangle e0 is an external edge, so its twin is t_e0
-                    e0.twin_edge = t_e0
-                    t_e0.twin_edge = e0
-                else:
-                    # otherwise the twin of e0 is the last_e2 (which, by now, must be set)
-                    e0.twin_edge = last_e2
-                    last_e2.twin_edge = e0
-                    # and the twin of t_e0 is the last_t_e2 (which, by now, must be set)
-                    t_e0.twin_edge = last_t_e2
-                    last_t_e2.twin_edge = t_e0
+        # REMEMBER:
+        #  1. polygons are represented by a set of triangular faces
+        #  2. polygons have faces for both sides of the polygon (front and back)
+        #  3. the boundary and the holes of the polygon are triangulated with app.geoms.utils.triangulation
 
-                # for each triangle, e1 is always an external edge, so its twin is t_e1
-                e1.twin_edge = t_e1
-                t_e1.twin_edge = e1
+        self.reset()  # first reset the DCEL
 
-                if i == last-1:
-                    # if this is the last triangle e2 is an external edge, so its twin is t_e2
-                    e2.twin_edge = t_e2
-                    t_e2.twin_edge = e2
-                else:
-                    # otherwise, the twin of e2 does not exists yet (will be e0 in the next triangle)
-                    # it will be set when processing the next triangle
-                    pass
+        if len(polygon) > 2:
+            rings = [r.vertices[:len(r)] for r in polygon.rings if len(r) > 2]
+            points = [p for r in rings for p in r]
 
-                # -------------------------------
-                # finally, advance the references
-                v1 = v2
-                last_e2 = e2
-                last_t_e2 = t_e2
+            triangles = triangulate([np.array(r, dtype=np.float64) for r in rings])
 
-        #TODO: settare l'outgoing_edge per i vertici + evitare di creare lo stesso vertice piu volte
+            if len(triangles):  # no triangles, if the vertices are not (at least) 3 distinct ones
+                self._make_from_triangles(points, triangles, double_sided=True)
 
     def make_from_solid(self, solid):
         """
@@ -450,114 +465,69 @@ class DCEL(object):
 
         self.reset()  # first reset the DCEL
 
-        vertices = solid.renderable_vertex_array['coords'].tolist()
-        elements = solid.renderable_element_array.tolist()
-
-        # prepare a new list of triplets with each triplet denoting a triangular face
-        faces_elements = [tuple(elements[i:i+3]) for i in range(0, len(elements), 3)]
-
-        # In the following structure we keep a reference to incomplete hedges.
-        # Namely, these hedges will only have a reference to the twin hedge and to the target vertex
-        # An edge will be removed from here when all its references are set.
-        # Namely, also the references next_edge, prev_edge, and adjacent_face
-        incomplete_edges_by_source_and_target = dict()  # key, value = (source element id, target element id), edge
-
-        # In here we store the Vertex objects we created,
-        # in order not to create several Vertex objects for the same point
-        created_vertices_by_element = dict()  # key, value = element, Vertex
-
-        first_face = True
-        # until there are element faces to be analyzed
-        while faces_elements:
-            # pop an element_face to be analyzed
-            face_elements = faces_elements.pop(0)
-            # print("\n\n------------------\n\nanalyzing face: " + str(face_elements))
-
-            # we are analyzing a new face, so create a new Face object, unless this is the first face
-            # being analyzed, in which case, take the exterior face of the DCEL
-            face = self.exterior_face if first_face else Face()
-            first_face = False
-            # print("Face id: " + str(id(face)))
-
-            # we assumed that we only deal with triangular faces, so each face will have exactly 3 edges
-            # we put them in a list
-            edges = list()
-
-            # construct three edges (e0, e1, e2) for this face such that e0 = (v0, v1), e1 = (v1, v2), e2 = (v2, v0)
-            # or retrieve the corresponding partially constructed edges (if they exist)
-            for i, element in enumerate(face_elements):
-                source_element, target_element = element, face_elements[(i+1) % len(face_elements)]
-                # print("\n\nanalyzing edge: " + str((source_element, target_element)))
-                # print("list of incomplete Edge: " + str(incomplete_edges_by_source_and_target))
-                # print("list of generated Vertex: " + str(created_vertices_by_element))
-
-                # if this edge was previously generated as the twin of an edge of another face, get it from
-                # the list of incomplete edges
-                edge = incomplete_edges_by_source_and_target.pop((source_element, target_element), None)
-
-                # create the Vertex objects (source and target) of this edge or retrieve them if they already exist
-                target_vertex = created_vertices_by_element.get(target_element,
-                                                                Vertex(Point3(*vertices[target_element])))
-
-                source_vertex = created_vertices_by_element.get(source_element,
-                                                                Vertex(Point3(*vertices[source_element])))
-
-                # if the edge we looked for exists, get its
-                # - target Vertex
-                # - source Vertex and
-                # - twin_edge Edge
-                if isinstance(edge, Edge):
-                    # get the twin of this edge
-                    twin_edge = edge.twin_edge
-                else:
-                    # prepare two new Edge objects for the edge and its twin
-                    edge, twin_edge = Edge(), Edge()
-
-                # complete the vertex by setting (or overwriting) the outgoing_edge
-                target_vertex.outgoing_edge = twin_edge
-                source_vertex.outgoing_edge = edge
-
-                # put the vertices in the created_vertices dictionary
-                # (or overwrite them if they were already in)
-                created_vertices_by_element[target_element] = target_vertex
-                created_vertices_by_element[source_element] = source_vertex
-
-                # set the face of this edge
-                edge.adjacent_face = face
-
-                # set the target vertices
-                edge.target_vertex = target_vertex
-                twin_edge.target_vertex = source_vertex
-
-                # link the twins
-                edge.twin_edge = twin_edge
-                twin_edge.twin_edge = edge
-
-                # if the twin is not yet completed (which would be the case if it was generated as an edge of
-                # a face analyzed previously) it will not be completed during the analysis of this face,
-                # so place it in the incomplete_edges list
-                if not twin_edge.is_complete():
-                    incomplete_edges_by_source_and_target[(target_element, source_element)] = twin_edge
-
-                # complete the edge
-                if i > 0:
-                    edge.prev_edge = edges[i-1]
-                    edges[i-1].next_edge = edge
-
-                # put the edge in the edges list of this face
-                edges.append(edge)
-
-            # the last and first edges are not yet linked to each other, link them
-            edges[0].prev_edge = edges[-1]
-            edges[-1].next_edge = edges[0]
-
-            # finally, assign one of the edges of this face to the Face object
-            face.adjacent_edges.append(edges[0])
-
+        points = [Point3(*v) for v in solid.renderable_vertex_array['coords'].tolist()]
+        self._make_from_triangles(points, solid.renderable_element_array)
 
         # print("make_dcel_from_solid FINISHED. The generated dcel is \n" )
         # print(str(self))
 
+    def _make_from_triangles(self, points, triangles, double_sided=False):
+        """
+        fill the DCEL with a set of triangular faces (the first one being the exterior face).
+        The triangles are turned into directed half-edge keys, which are sorted once (with NumPy) to pair all the
+        twins at once (see triangle_half_edges). Then each Vertex, Edge and Face object is created exactly once,
+        and each Vertex gets an outgoing_edge.
+        Half-edges with no twin (i.e., on the boundary of an open mesh) are paired with a new half-edge adjacent to
+        an empty face (representing the outside of the mesh).
+        :param points: the Point3 objects of the vertices
+        :param triangles: an array of indices in points, whose triplets define the triangles (in CCW order)
+        :param double_sided: if True, a back face (with reversed orientation) is added for each triangle, and the
+        boundary edges of the front faces become twins of those of the back faces (as needed to represent polygons)
+        """
+
+        from app.geoms.dcel.array_dcel import triangle_half_edges
+
+        # the half-edges (and their twins) are found as for the ArrayDCEL
+        triangles, sources, targets, twins, non_manifold = triangle_half_edges(triangles, len(points), double_sided)
+
+        if non_manifold.any():
+            raise Exception("Error while building the DCEL. " +
+                            "\nMalformed DCEL: " + str(np.count_nonzero(non_manifold)) +
+                            " half-edges are shared by more than one face (non-manifold mesh)!")
+
+        # create each Vertex (only once)
+        self.vertices = [Vertex(p) for p in points]
+
+        # the first face is the exterior face of the DCEL
+        faces = [self.exterior_face] + [Face() for _ in range(len(triangles) - 1)]
+
+        edges = [Edge(self.vertices[t], faces[i // 3]) for i, t in enumerate(targets.tolist())]
+
+        # link the three edges of each face
+        for f, face in enumerate(faces):
+            e0, e1, e2 = edges[3 * f:3 * f + 3]
+
+            e0.prev_edge, e0.next_edge = e2, e1
+            e1.prev_edge, e1.next_edge = e0, e2
+            e2.prev_edge, e2.next_edge = e1, e0
+
+            face.adjacent_edges.append(e0)
+
+        # link the twins, pairing the boundary edges with new edges adjacent to the outside face
+        outside_face = None
+        for i, (source, twin) in enumerate(zip(sources.tolist(), twins.tolist())):
+            edge = edges[i]
+            if twin >= 0:
+                edge.twin_edge = edges[twin]
+            else:
+                if outside_face is None:
+                    outside_face = Face()
+                edge.twin_edge = Edge(edge.prev_edge.target_vertex, outside_face, twin_edge=edge)
+
+            # set (or overwrite) the outgoing_edge of the source vertex
+            self.vertices[source].outgoing_edge = edge
+
+        self.edges = edges
 
     def __str__(self):
         ret_str = "\n------------------------------------\n"
@@ -585,24 +555,35 @@ class DCEL(object):
 
     def get_renderable_arrays(self):
         """
-        traverse the DCEL structure and return a list of vertices and a list of elements for the rendering of the DCEL
-        :return: vertices: a list of verices [a, b, c, ...],
-        elements: a list of indices [idx_1, idx_2, idx_3, ...] from the list vertices.
+        traverse the DCEL structure and return a list of vertices and a list of elements for the rendering of the DCEL.
+        Each Vertex is given an index the first time it is met, through a table keyed by the identity of the Vertex,
+        and the arrays are written directly into (growing) NumPy buffers, so the traversal is linear in the size of
+        the DCEL.
+        :return: vertices: a (V, 3) array with the coordinates of the vertices [a, b, c, ...],
+        elements: an array of indices [idx_1, idx_2, idx_3, ...] from the array vertices.
          if the DCEL represents a set of point, each index refers a point to be rendered
          if the DCEL represents a linear entity, each pair of indices forms a segment to be rendered
          if the DCEL represents a polygon or a polyhedron, each triplet of indices form a face to be rendered
+        outline_elements: an array of indices, each pair of which forms a segment of the outline
         """
 
-        from app.geoms.point import Point3
-        vertices = list()
-        elements = list()
-        outline_elements = list()
+        vertices = GrowingArray(np.float32, width=3)
+        elements = GrowingArray(np.uint32)
+        outline_elements = GrowingArray(np.uint32)
+
+        vertex_index = dict()  # key, value = id(Vertex), index of the Vertex in vertices
+
+        def index_of(vertex):
+            idx = vertex_index.get(id(vertex))
+            if idx is None:
+                idx = vertex_index[id(vertex)] = len(vertices)
+                vertices.append(vertex.point)
+            return idx
 
         if self.exterior_face.isolated_vertices:
             # if there are isolated vertices it means this DCEL represents a set of points (and nothing more)
             for v in self.exterior_face.isolated_vertices:
-                elements.append(len(vertices))
-                vertices.append(v)
+                elements.append(index_of(v))
         else:
             # otherwise we are treating either a linear geometry, a polygon, or a polyhedron
             visited_faces = set()
@@ -633,24 +614,16 @@ class DCEL(object):
 
                             if i == first_edge:
                                 v1 = edge.source_vertex()
-                                if v1 in vertices:
-                                    v1_idx = vertices.index(v1)
-                                else:
-                                    v1_idx = len(vertices)
-                                    vertices.append(v1)
+                                v1_idx = index_of(v1)
 
                             v2 = edge.target_vertex
-                            if v2 in vertices:
-                                v2_idx = vertices.index(v2)
-                            else:
-                                v2_idx = len(vertices)
-                                vertices.append(v2)
+                            v2_idx = index_of(v2)
 
                             if open_chain:
                                 # if we are treating an open chain it means we are treating a linear entity
                                 # so the elements must be given pair-wise. Each pair denotes the start and the
                                 # end of the i-th segment making the linear entity
-                                elements.extend([v1_idx, v2_idx])
+                                elements.extend((v1_idx, v2_idx))
                             else:
                                 # otherwise we are treating a face. Faces can be only triangles (we assumed this before)
                                 if i == first_edge:
@@ -671,7 +644,10 @@ class DCEL(object):
 
                                 # we proceed only if the neighbor face has been visited already
                                 # in this way we avoid to add more than once the same part of the outline
-                                if neighbor_face in visited_faces:
+                                if edge.twin_edge.next_edge is None:
+                                    # the edge is on the boundary of an open mesh, so it is always part of the outline
+                                    outline_elements.extend((v1_idx, v2_idx))
+                                elif neighbor_face in visited_faces:
                                     # get the vertex opposite to this edge in the
                                     # face adjacent to this face through the current edge
                                     other_face_vertex = edge.twin_edge.next_edge.target_vertex
@@ -679,15 +655,14 @@ class DCEL(object):
                                     # get the three vertices defining the face the current edge belongs to
                                     v3 = edge_chain[(i+1) % len(edge_chain)].target_vertex
 
-                                    if not Point3.are_coplanar(v1.point, v2.point,
-                                                                   v3.point, other_face_vertex.point):
-                                        outline_elements.extend([v1_idx, v2_idx])
+                                    if not _are_coplanar(v1.point, v2.point, v3.point, other_face_vertex.point):
+                                        outline_elements.extend((v1_idx, v2_idx))
 
                             v1, v1_idx = v2, v2_idx  # advance the first vertex
 
                     visited_faces.add(face)
 
-        return vertices, elements, outline_elements
+        return vertices.as_array(), elements.as_array(), outline_elements.as_array()
 
 # ps = [Point3(2, 1), Point3(7, 1), Point3(9, 5), Point3(7, 9), Point3(2, 9), Point3(0, 5)]
 #
@@ -15,7 +15,31 @@ class Geometry(object, metaclass=ABCMeta):
     def __init__(self, *args, **kwargs):
         # print("Geometry.__init__")
 
-        self.bounding_box = kwargs.pop('bounding_box', Box3D())
+        self._bounding_box = kwargs.pop('bounding_box', None)
+
+        # the bounding box is not computed eagerly: mutations only mark it as stale (see invalidate_bounding_box),
+        # and it is recomputed (once) the next time it is accessed
+        self._bounding_box_stale = self._bounding_box is None
+
+    @property
+    def bounding_box(self):
+        if self._bounding_box is None:
+            self._bounding_box = Box3D()
+
+        if self._bounding_box_stale:
+            self._bounding_box_stale = False
+            self.update_bounding_box()
+
+        return self._bounding_box
+
+    @bounding_box.setter
+    def bounding_box(self, value):
+        self._bounding_box = value
+        self._bounding_box_stale = False
+
+    def invalidate_bounding_box(self):
+        """mark the bounding box as out-of-date: it will be recomputed the next time it is accessed"""
+        self._bounding_box_stale = True
 
     @abstractmethod
     def update_bounding_box(self):
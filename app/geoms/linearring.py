@@ -16,24 +16,38 @@ class LinearRing(LineString):
         return len(self.vertices) if self.is_open() else len(self.vertices) - 1
 
 
+    def _index(self, i):
+        """:return: the index in self.vertices of the i-th vertex of the (open) ring"""
+        if not -len(self) <= i < len(self):
+            raise IndexError("LinearRing index out of range")
+        return i % len(self)
+
+
     def __setitem__(self, key, value):
-        self.open()
-        self.vertices[key] = value
-        self.close()
+        if isinstance(key, slice):
+            self.open()
+            self.vertices[key] = value
+            self.close()
+        else:
+            i = self._index(key)
+            closed = self.is_closed()
+            self.vertices[i] = value
+            if i == 0 and closed:
+                self.vertices[-1] = value  # the last vertex of a closed ring IS the first one
+        self.invalidate_substructures()
 
 
     def __getitem__(self, i):
-        self.open()
-        the_item = self.vertices[i]
-        self.close()
-        return the_item
+        # the ring is read as if it was open, without actually opening (and closing) it
+        if isinstance(i, slice):
+            return self.vertices[:len(self)][i]
+        return self.vertices[self._index(i)]
 
 
     def pop_vertex(self, i=-1):
         self.open()
-        popped = self.vertices.pop(i)
+        popped = LineString.pop_vertex(self, i)
         self.close()
-        self.update_substructures()
         return popped
 
 
@@ -84,8 +98,7 @@ class LinearRing(LineString):
         """
         if self.is_closed():
             # print("open")
-            del self.vertices[-1]
-            self.update_substructures()
+            LineString.pop_vertex(self)  # removes the tail in O(1)
 
 
     def close(self):
@@ -95,8 +108,7 @@ class LinearRing(LineString):
         """
         if len(self) >= 3 and self.is_open():
             # print("close")
-            self.vertices.append(self.vertices[0])
-            self.update_substructures()
+            LineString.add_vertex(self, self.vertices[0])  # appends the first vertex in O(1)
 
 
     def is_valid(self):
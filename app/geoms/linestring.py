@@ -1,8 +1,11 @@
 from app.geoms.point import Point3
 from app.geoms.curve import Curve
 from app.geoms.utils.renderable import Renderable3d
+from app.geoms.utils.growing_array import GrowingArray
 from OpenGL import GL
 
+import numpy as np
+
 
 class LineString(Curve, Renderable3d):
 
@@ -20,31 +23,99 @@ class LineString(Curve, Renderable3d):
 
         self.vertices = vertices
 
-        self.update_substructures()
+        # when the line has at least 2 vertices, the renderable arrays are views of these over-allocated buffers,
+        # so that adding, moving, and removing the last vertex can be done in place, in O(1) amortized
+        # (see add_vertex, update_vertex, and pop_vertex). They are None when the line has less than 2 vertices
+        self._vertex_rows = None
+        self._element_rows = None
+
+        self.invalidate_substructures()
 
     def update_substructures(self):
         self.update_bounding_box()
         self.update_renderable_arrays()
 
+    def invalidate_substructures(self):
+        self.invalidate_bounding_box()
+        self.invalidate_renderable_arrays()
+
+    def _can_edit_in_place(self):
+        """:return: True if the DCEL and the renderable arrays are up-to-date and can be edited in place"""
+        return self._vertex_rows is not None and not self._renderable_arrays_stale
+
     def update_dcel(self):
         if len(self) == 1:
             self.dcel.make_from_points(*self.vertices)
         elif len(self) > 1:
             self.dcel.make_from_line(self)
 
+    def update_renderable_arrays(self):
+        Renderable3d.update_renderable_arrays(self)
+
+        if len(self.vertices) > 1:
+            # copy the renderable arrays in over-allocated buffers, so that the next edits can be done in place
+            self._vertex_rows = GrowingArray.of(self.renderable_vertex_array)
+            self._element_rows = GrowingArray.of(self.renderable_element_array)
+            self.renderable_vertex_array = self._vertex_rows.view()
+            self.renderable_element_array = self._element_rows.view()
+        else:
+            self._vertex_rows = None
+            self._element_rows = None
+
     def update_bounding_box(self):
         if len(self) > 0:
-            vertices = self.vertices
-            the_min = Point3(vertices[0])
-            the_max = Point3(vertices[0])
+            coords = np.array([v.tolist() for v in self.vertices], dtype=np.float32)
+
+            self.bounding_box.set_min(Point3(*coords.min(axis=0)))
+            self.bounding_box.set_max(Point3(*coords.max(axis=0)))
+
+    def _extend_bounding_box(self, v):
+        """extend the bounding box so that it contains the Point3 v, in O(1)"""
+        if self._bounding_box_stale:
+            return  # it will be fully recomputed anyway
+
+        the_min, the_max = self.bounding_box.min().tolist(), self.bounding_box.max().tolist()
+        coords = v.tolist()
+
+        new_min = [min(a, b) for a, b in zip(the_min, coords)]
+        new_max = [max(a, b) for a, b in zip(the_max, coords)]
+        if new_min != the_min:
+            self.bounding_box.set_min(Point3(*new_min))
+        if new_max != the_max:
+            self.bounding_box.set_max(Point3(*new_max))
+
+    def _shrink_bounding_box(self, v):
+        """
+        update the bounding box after the Point3 v has been removed (or moved away). The bounding box is recomputed
+        (from the renderable arrays) only if v was lying on it
+        """
+        if self._bounding_box_stale:
+            return  # it will be fully recomputed anyway
+
+        coords = v.tolist()
+        if any(c in (low, high) for c, low, high in zip(coords, self.bounding_box.min().tolist(),
+                                                         self.bounding_box.max().tolist())):
+            rows = self._vertex_rows.view()["coords"]
+            self.bounding_box.set_min(Point3(rows["x"].min(), rows["y"].min(), rows["z"].min()))
+            self.bounding_box.set_max(Point3(rows["x"].max(), rows["y"].max(), rows["z"].max()))
 
-            for v in vertices:
-                for i, coord in enumerate(v.tolist()):
-                    the_min[i] = min(the_min[i], coord)
-                    the_max[i] = max(the_max[i], coord)
+    def _rows_changed(self, vertex_rows):
+        """
+        refresh the renderable arrays (views of the buffers) after an edit, and mark the rows to be uploaded.
+        NOTE: the elements of a line are always the pairs (0, 1), (1, 2), ..., so they only change at their end
+        :param vertex_rows: the range [start, stop) of the vertex rows that changed
+        """
+        old_elements_num = len(self.renderable_element_array)
+
+        self.renderable_vertex_array = self._vertex_rows.view()
+        self.renderable_element_array = self._element_rows.view()
+
+        elements_num = len(self.renderable_element_array)
+        self.renderable_rows_updated(vertex_rows=vertex_rows,
+                                     element_rows=(min(old_elements_num, elements_num), elements_num))
 
-            self.bounding_box.set_min(the_min)
-            self.bounding_box.set_max(the_max)
+    def _vertex_row(self, v):
+        return Renderable3d.make_renderable_vertex_array([v.tolist()], self.color)[0]
 
     def add_vertex(self, v, i=None):
         if not isinstance(v, Point3):
@@ -52,13 +123,43 @@ class LineString(Curve, Renderable3d):
 
         if i is None:
             i = len(self.vertices)  # by default add the vertex as last vertex
+        elif i < 0:
+            i = max(0, len(self.vertices) + i)  # same semantics of list.insert
+        i = min(i, len(self.vertices))
 
         self.vertices.insert(i, v)
-        self.update_substructures()
+
+        if not self._can_edit_in_place() or i == 0:
+            self.invalidate_substructures()
+        else:
+            if i == len(self.vertices) - 1:
+                self.dcel.append_line_vertex(v)
+                self._vertex_rows.append(self._vertex_row(v))
+            else:
+                # the vertices after the i-th one are shifted
+                self.dcel.split_line_edge(i - 1, v)
+                self._vertex_rows.insert(i, self._vertex_row(v))
+
+            vertices_num = len(self._vertex_rows)
+            self._element_rows.extend((vertices_num - 2, vertices_num - 1))
+
+            self._extend_bounding_box(v)
+            self._rows_changed((i, vertices_num))
 
     def pop_vertex(self, i=-1):
+        vertices_num = len(self.vertices)
         popped = self.vertices.pop(i)
-        self.update_substructures()
+
+        if self._can_edit_in_place() and i in (-1, vertices_num - 1) and vertices_num > 2:
+            self.dcel.remove_line_tail()
+            self._vertex_rows.truncate(vertices_num - 1)
+            self._element_rows.truncate(2 * (vertices_num - 2))
+
+            self._rows_changed(None)
+            self._shrink_bounding_box(popped)
+        else:
+            self.invalidate_substructures()
+
         return popped
 
     def remove_vertex(self, i=-1):
@@ -74,8 +175,22 @@ class LineString(Curve, Renderable3d):
 
         if not isinstance(v, Point3):
             raise TypeError("LineString.add_vertex requires parameter to be Point3")
+
+        old_v = self.vertices[i]
         self.vertices[i] = v
-        self.update_substructures()
+
+        if not self._can_edit_in_place():
+            self.invalidate_substructures()
+        else:
+            if i < 0:
+                i += len(self.vertices)
+
+            self.dcel.move_vertex(i, v)
+            self._vertex_rows.view()[i] = self._vertex_row(v)
+
+            self._rows_changed((i, i + 1))
+            self._extend_bounding_box(v)
+            self._shrink_bounding_box(old_v)
 
     def is_valid(self):
         return isinstance(self.vertices, (list, tuple)) and len(self) > 1
@@ -5,6 +5,9 @@ from app.geoms.utils.box import Box3D
 from app.geoms.utils.constants import *
 
 from app.utils.vector import Vector, Vector3
+from app.geoms.utils.deduplication import unique_points as deduplicated_points
+
+import numpy as np
 
 
 class Point(Vector):
@@ -26,7 +29,7 @@ class Point3(Point, Vector3, Geometry, Renderable3d):
         Geometry.__init__(self, *args, **kwargs)
         Renderable3d.__init__(self, *args, **kwargs)
 
-        self.update_substructures()
+        self.invalidate_substructures()
 
 
     def update_substructures(self):
@@ -34,6 +37,11 @@ class Point3(Point, Vector3, Geometry, Renderable3d):
         self.update_renderable_arrays()
 
 
+    def invalidate_substructures(self):
+        self.invalidate_bounding_box()
+        self.invalidate_renderable_arrays()
+
+
     def update_dcel(self):
         # print("Point3.update_dcel")
         self.dcel.make_from_points(self)
@@ -54,12 +62,12 @@ class Point3(Point, Vector3, Geometry, Renderable3d):
         if z is not None:
             Vector3.set_z(self, z)
 
-        self.update_substructures()
+        self.invalidate_substructures()
 
 
     def set_x(self, value):
         Vector3.set_x(self, value)
-        self.update_substructures()
+        self.invalidate_substructures()
 
 
     # test comment for git integration
@@ -67,12 +75,12 @@ class Point3(Point, Vector3, Geometry, Renderable3d):
 
     def set_y(self, value):
         Vector3.set_y(self, value)
-        self.update_substructures()
+        self.invalidate_substructures()
 
 
     def set_z(self, value):
         Vector3.set_z(self, value)
-        self.update_substructures()
+        self.invalidate_substructures()
 
 
     def is_valid(self):
@@ -85,30 +93,73 @@ class Point3(Point, Vector3, Geometry, Renderable3d):
 
 
     @staticmethod
-    def random(bbox, points_num=1):
+    def random_coords(bbox, points_num=1, seed=None, distribution=RANDOM_UNIFORM, clusters_num=None):
+        """
+        draw the coordinates of points_num random points, all at once, with a NumPy Generator
+        :param bbox: the Box3D the points must fall in
+        :param points_num: the number of points to generate
+        :param seed: the seed of the random generator (if None, fresh entropy is used)
+        :param distribution: either RANDOM_UNIFORM (points uniformly distributed in bbox),
+        RANDOM_GAUSSIAN (points normally distributed around the center of bbox), or
+        RANDOM_CLUSTERED (points normally distributed around clusters_num centers uniformly distributed in bbox)
+        :param clusters_num: the number of clusters for RANDOM_CLUSTERED (by default, about sqrt(points_num)/10)
+        :return: a (points_num, 3) float32 array with the coordinates of the points
+        """
         assert (isinstance(bbox, Box3D))
 
-        bbox_min, bbox_max = bbox.min(), bbox.max()
-        from random import uniform
-        random_points = list()
-        for i in range(points_num):
-            random_x = uniform(bbox_min.x(), bbox_max.x())
-            random_y = uniform(bbox_min.y(), bbox_max.y())
-            random_z = uniform(bbox_min.z(), bbox_max.z())
-            random_points.append(Point3(random_x, random_y, random_z))
+        bbox_min = np.array(bbox.min(), dtype=np.float64)
+        bbox_max = np.array(bbox.max(), dtype=np.float64)
+        extent = bbox_max - bbox_min
+
+        rng = np.random.default_rng(seed)
+
+        if distribution == RANDOM_UNIFORM:
+            coords = rng.uniform(bbox_min, bbox_max, size=(points_num, 3))
+        elif distribution == RANDOM_GAUSSIAN:
+            # most of the points (3 sigmas) fall in the box, the others are clipped to its border
+            coords = rng.normal((bbox_min + bbox_max) / 2, extent / 6, size=(points_num, 3))
+        elif distribution == RANDOM_CLUSTERED:
+            if clusters_num is None:
+                clusters_num = max(1, int(points_num ** (1 / 2) / 10))
+            centers = rng.uniform(bbox_min, bbox_max, size=(clusters_num, 3))
+            memberships = rng.integers(0, clusters_num, size=points_num)
+            spread = extent / (6 * clusters_num ** (1 / 3))
+            coords = centers[memberships] + rng.normal(0, 1, size=(points_num, 3)) * spread
+        else:
+            raise ValueError("Point3.random_coords: unknown distribution " + str(distribution))
+
+        return np.clip(coords, bbox_min, bbox_max).astype(np.float32)
 
-        return random_points
+    @staticmethod
+    def random(bbox, points_num=1, seed=None, distribution=RANDOM_UNIFORM):
+        """
+        same as random_coords, but return the points as Point3 objects (the coordinates are all drawn at once)
+        :return: a list of points_num Point3 objects
+        """
+        coords = Point3.random_coords(bbox, points_num, seed=seed, distribution=distribution)
+        return [Point3.trusted(*c) for c in coords.tolist()]
 
 
     @staticmethod
-    def raw_orientation(a, b, c, d):
+    def raw_orientation(a, b, c, d, exact=False):
         """
         compute the orientation of three points (a, b, c) as seen from a fourth point (d)
         in other words, checks the direction of the turn as moving from a to b to c CCW=LEFT, CW=RIGHT,
         COLLINEAR=STRAIGHT
+        :param exact: if True, the orientation is computed exactly (see robust_predicates), instead of up to EPSILON
         :return: CCW, CW, Collinear if the points are not coplanar, False otherwise
         """
 
+        if exact:
+            from app.geoms.utils.robust_predicates import orient3d, collinear3d
+            a, b, c, d = a.tolist(), b.tolist(), c.tolist(), d.tolist()
+            sign = orient3d(a, b, c, d)
+            if sign < 0:
+                return CCW
+            elif sign > 0:
+                return CW
+            return COLLINEAR if collinear3d(a, b, c) else CCW
+
         from app.geoms.tetrahedron import Tetrahedron
         # compute the volume of the tetrahedron formed by the points
         signed_vol = Tetrahedron.signed_volume(a, b, c, d)
@@ -134,13 +185,16 @@ class Point3(Point, Vector3, Geometry, Renderable3d):
 
 
     @staticmethod
-    def collinear_position(a, b, c):
+    def collinear_position(a, b, c, exact=False):
         """
         this function must be called only when it is known that the three input points are COLLINEAR, otherwise
         produces meaningless results
         :param a: Point
         :param b: Point
         :param c: Point
+        :param exact: kept for symmetry with orientation: the position is always found by comparing coordinates, which
+        is exact (comparing the distances a-c + c-b with a-b, instead, misclassifies some points lying between a and b
+        because of the rounding of the distances)
         :return: BEFORE, BETWEEN, or AFTER (the position of c wrt a->b)
         """
 
@@ -148,40 +202,94 @@ class Point3(Point, Vector3, Geometry, Renderable3d):
         if a == b:
             return False
 
-        # to compute the result we can use the distances between the points
-        a_b = a.distance(b)
-        a_c = a.distance(c)
-        b_c = b.distance(c)
-
-        if a_c + b_c > a_b:
-            if a_c < b_c:
-                return BEFORE
-            else:
-                return AFTER
-        else:
-            return BETWEEN
+        # along the axis where a and b differ the most, the collinear points are in the order of their coordinates
+        a, b, c = a.tolist(), b.tolist(), c.tolist()
+        k = max(range(3), key=lambda i: abs(b[i] - a[i]))
+        direction = 1 if b[k] > a[k] else -1
+        if direction * (c[k] - a[k]) < 0:
+            return BEFORE
+        elif direction * (c[k] - b[k]) > 0:
+            return AFTER
+        return BETWEEN
 
 
     @staticmethod
-    def orientation(a, b, c, d):
+    def orientation(a, b, c, d, exact=False):
         """
         return the position of the point c when going from a to b, as seen from observation point d
         :param a: Point3
         :param b: Point3
         :param c: Point3
         :param d: Point3
+        :param exact: if True, the position is computed exactly (see raw_orientation)
         :return: LEFT, RIGHT, BEFORE, BETWEEN, or AFTER
         """
 
-        orientation = Point3.raw_orientation(a, b, c, d)
+        orientation = Point3.raw_orientation(a, b, c, d, exact=exact)
         if orientation == CCW:
             return LEFT
         elif orientation == CW:
             return RIGHT
         else:  # COLLINEAR
             # if _collinear, we need to determine where exactly (BEFORE, BETWEEN, or AFTER)
-            # for this we can use the distances between the points
-            return Point3.collinear_position(a, b, c)
+            return Point3.collinear_position(a, b, c, exact=exact)
+
+
+    @staticmethod
+    def raw_orientations(a, b, c, d, exact=False):
+        """
+        same as raw_orientation, for many quadruples of points at once (computed with NumPy, in float64)
+        :param a: an (N, 3) array-like with the first point of each quadruple (or a single point, shared by all)
+        :param b: as a, for the second points
+        :param c: as a, for the third points
+        :param d: as a, for the observation points
+        :param exact: if True, the orientations are computed exactly (see raw_orientation)
+        :return: an (N,) array of CCW, CW, or COLLINEAR
+        """
+        if exact:
+            from app.geoms.utils.robust_predicates import orient3d_batch, collinear3d_batch
+            signs = orient3d_batch(a, b, c, d)
+            return np.select([signs < 0, signs > 0, ~collinear3d_batch(a, b, c)], [CCW, CW, CCW], COLLINEAR)
+
+        from app.geoms.tetrahedron import Tetrahedron
+        a, b, c, d = (np.asarray(p, dtype=np.float64) for p in (a, b, c, d))
+
+        signed_volumes = Tetrahedron.signed_volumes(a, b, c, d)
+
+        # for the coplanar quadruples, the cross-product rule with the first 3 points (as in raw_orientation)
+        cross = np.cross(b - a, c - a)
+        cross_magnitudes = np.sqrt(np.einsum('...i,...i->...', cross, cross))
+
+        return np.select([signed_volumes < -EPSILON, signed_volumes > EPSILON, cross_magnitudes > EPSILON],
+                         [CCW, CW, CCW], COLLINEAR)
+
+
+    @staticmethod
+    def collinear_positions(a, b, c, exact=False):
+        """
+        same as collinear_position, for many triplets of points at once (see raw_orientations for the parameters)
+        :return: an (N,) array of BEFORE, BETWEEN, or AFTER (or False, where a and b coincide)
+        """
+        a, b, c = np.broadcast_arrays(*(np.asarray(p, dtype=np.float64) for p in (a, b, c)))
+
+        # see collinear_position
+        k = np.argmax(np.abs(b - a), axis=-1)[..., np.newaxis]
+        a_k, b_k, c_k = (np.take_along_axis(p, k, axis=-1)[..., 0] for p in (a, b, c))
+        direction = np.where(b_k > a_k, 1, -1)
+        positions = np.select([direction * (c_k - a_k) < 0, direction * (c_k - b_k) > 0], [BEFORE, AFTER], BETWEEN)
+
+        return np.where(np.all(a == b, axis=-1), False, positions)
+
+
+    @staticmethod
+    def orientations(a, b, c, d, exact=False):
+        """
+        same as orientation, for many quadruples of points at once (see raw_orientations for the parameters)
+        :return: an (N,) array of LEFT, RIGHT, BEFORE, BETWEEN, or AFTER (or False, see collinear_positions)
+        """
+        raw_orientations = Point3.raw_orientations(a, b, c, d, exact=exact)
+        return np.select([raw_orientations == CCW, raw_orientations == CW],
+                         [LEFT, RIGHT], Point3.collinear_positions(a, b, c, exact=exact))
 
 
 
@@ -196,7 +304,7 @@ class Point3(Point, Vector3, Geometry, Renderable3d):
         if not all(isinstance(p, Vector3) for p in points):
             raise TypeError("Point.Coplanar() Arguments must be Vector3 objects")
 
-        unique_points = list(set(points))  # remove "duplicates" (points with same coordinates)
+        unique_points = deduplicated_points(points)  # remove "duplicates" (points closer than EPSILON)
 
         if len(unique_points) == 0:
             # no points given
@@ -241,7 +349,7 @@ class Point3(Point, Vector3, Geometry, Renderable3d):
         if not all(isinstance(p, Vector3) for p in points):
             raise TypeError("Arguments must be 3-vectors")
 
-        unique_points = list(set(points))  # remove "duplicates" (points with same coordinates)
+        unique_points = deduplicated_points(points)  # remove "duplicates" (points closer than EPSILON)
 
         if len(unique_points) == 0:
             # no points given
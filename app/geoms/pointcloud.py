@@ -0,0 +1,118 @@
+from app.geoms.geometry import Geometry
+from app.geoms.point import Point3
+from app.geoms.utils.renderable import Renderable3d
+from app.geoms.dcel.array_dcel import ArrayDCEL
+from app.geoms.utils.constants import *
+
+import numpy as np
+
+from OpenGL import GL
+
+
+class PointCloud(Geometry, Renderable3d):
+    """
+    A set of points stored in one contiguous (N, 3) float32 array.
+    Differently than N separate Point3 objects, a PointCloud has a single bounding box, a single VBO, and it is
+    rendered with a single draw call.
+    """
+
+    def __init__(self, points=None, color=None):
+        """
+        :param points: either a list of Point3 objects or a (N, 3) array-like with the coordinates of the points
+        :param color: the color of the points
+        """
+
+        Geometry.__init__(self)
+        Renderable3d.__init__(self, elements_type=GL.GL_POINTS, color=color, dcel_class=ArrayDCEL)
+
+        if points is None:
+            points = np.zeros((0, 3))
+
+        self.coords = np.array(points, dtype=np.float32).reshape(-1, 3)
+
+        self.invalidate_substructures()
+
+    @staticmethod
+    def random(bbox, points_num=1, seed=None, distribution=RANDOM_UNIFORM):
+        """
+        :return: a PointCloud of points_num random points (see Point3.random_coords for the parameters)
+        """
+        return PointCloud(Point3.random_coords(bbox, points_num, seed=seed, distribution=distribution))
+
+    def update_substructures(self):
+        self.update_bounding_box()
+        self.update_renderable_arrays()
+
+    def invalidate_substructures(self):
+        self.invalidate_bounding_box()
+        self.invalidate_renderable_arrays()
+
+    def update_dcel(self):
+        self.dcel.make_from_points(*self.coords)
+
+    def update_renderable_arrays(self):
+        """
+        each point of the cloud is an isolated vertex, so there is no need to go through the DCEL:
+        the renderable arrays are built directly from the coordinates array
+        """
+        self.set_renderable_arrays(Renderable3d.make_renderable_vertex_array(self.coords, self.color),
+                                   np.arange(len(self.coords), dtype=np.uint32),
+                                   None)
+
+    def update_bounding_box(self):
+        if len(self) > 0:
+            self.bounding_box.set_min(Point3(*self.coords.min(axis=0)))
+            self.bounding_box.set_max(Point3(*self.coords.max(axis=0)))
+        else:
+            # an empty cloud (e.g., after all its points were erased) has the empty box of a new geometry
+            self.bounding_box.set_min(Point3(0, 0, 0))
+            self.bounding_box.set_max(Point3(0, 0, 0))
+
+    def add_points(self, points):
+        """
+        :param points: either a list of Point3 objects or a (N, 3) array-like with the coordinates of the points
+        """
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 3)
+        self.coords = np.concatenate((self.coords, points))
+        self.invalidate_substructures()
+
+    def remove_points(self, mask):
+        """
+        :param mask: a boolean array marking the points to be removed
+        """
+        if np.any(mask):
+            self.coords = self.coords[~np.asarray(mask)]
+            self.invalidate_substructures()
+
+    def points_in_box(self, bl, tr):
+        """
+        :param bl: the bottom-left corner of a box (Point3)
+        :param tr: the top-right corner of a box (Point3)
+        :return: a boolean array marking the points falling (strictly) inside the box in the xy plane
+        """
+        x, y = self.coords[:, 0], self.coords[:, 1]
+        return (bl.x() < x) & (x < tr.x()) & (bl.y() < y) & (y < tr.y())
+
+    def is_valid(self):
+        return len(self) > 0
+
+    def wkt(self):
+        """
+        get a well-known text representation of this geometry
+        :return:
+        """
+        return "MULTIPOINT({})".format(', '.join(["({} {} {})".format(x, y, z) for x, y, z in self.coords.tolist()]))
+
+    def __len__(self):
+        return len(self.coords)
+
+    def __getitem__(self, i):
+        """:return: a new Point3 with the coordinates of the i-th point of the cloud"""
+        return Point3(*self.coords[i])
+
+    def __str__(self):
+        return "{}({} points)".format(self.__class__.__name__, len(self))
+
+    def __hash__(self):
+        """Allows for using a Geometry as a key of a set or a dictionary."""
+        return hash(id(self))
@@ -3,9 +3,12 @@ from app.geoms.linearring import LinearRing
 from app.geoms.line import Line
 from app.geoms.surface import Surface
 from app.geoms.utils.renderable import Renderable3d
+from app.geoms.utils.point_in_polygon import points_in_polygon, PreparedPolygon
+from app.geoms.utils.triangulation import ring_normal
 from app.utils.color import Color
 
 from OpenGL import GL
+import numpy as np
 
 
 class Polygon(Surface, Renderable3d):
@@ -26,9 +29,11 @@ class Polygon(Surface, Renderable3d):
 
         self.rings = rings
 
+        self._prepared = None  # the PreparedPolygon used for fast containment queries (built on demand)
+
         self.make_valid()
 
-        self.update_substructures()
+        self.invalidate_substructures()
 
     @property
     def boundary(self):
@@ -51,10 +56,12 @@ class Polygon(Surface, Renderable3d):
             raise TypeError("Polygon.holes: passed value should be either a "
                             "LinearRing or a list of LinearRing objects.")
 
-        self.rings = self[0] + val
+        self.rings = [self[0]] + val
+        self.invalidate_substructures()
 
     def __setitem__(self, i, value):
         self.rings[i] = value
+        self.invalidate_substructures()
 
     def __getitem__(self, item):
         return self.rings[item]
@@ -63,12 +70,24 @@ class Polygon(Surface, Renderable3d):
         self.update_bounding_box()
         self.update_renderable_arrays()
 
+    def invalidate_substructures(self):
+        self.invalidate_bounding_box()
+        self.invalidate_renderable_arrays()
+        self._prepared = None
+
     def update_bounding_box(self):
-        self.boundary.update_substructures()
+        # the bounding box of a polygon is that of its boundary
+        boundary_bbox = self.boundary.bounding_box
+        self.bounding_box.set_min(boundary_bbox.min())
+        self.bounding_box.set_max(boundary_bbox.max())
 
-    def render(self, shader_program):
-        Renderable3d.render(self, shader_program=shader_program)
-        self.boundary.render(shader_program=shader_program)
+    def render(self, shader_program, tint=None):
+        Renderable3d.render(self, shader_program=shader_program, tint=tint)
+        for r in self.rings:
+            r.render(shader_program=shader_program, tint=tint)
+
+    def get_renderables(self):
+        return [self] + self.rings
 
     def update_dcel(self):
         self.dcel.make_from_polygon(self)
@@ -84,7 +103,7 @@ class Polygon(Surface, Renderable3d):
         if not isinstance(v, Point3):
             raise TypeError("Polygon.add_vertex requires parameter to be Point3")
         self[ring].add_vertex(v, i)
-        self.update_substructures()
+        self.invalidate_substructures()
 
     def remove_vertex(self, i=-1, ring=-1):
         """
@@ -94,7 +113,7 @@ class Polygon(Surface, Renderable3d):
         :return:
         """
         self[ring].remove_vertex(i)
-        self.update_substructures()
+        self.invalidate_substructures()
 
     def update_vertex(self, v, i=-1, ring=0):
         """
@@ -108,14 +127,31 @@ class Polygon(Surface, Renderable3d):
         if not isinstance(v, Point3):
             raise TypeError("Polygon.add_vertex requires parameter to be Point3")
         self[ring].update_vertex(v, i)
-        self.update_substructures()
+        self.invalidate_substructures()
 
     def make_valid(self):
-        # TODO: implement a function that checks that
-        # the boundary renderable_vertex_array are in CCW order and that the
-        # holes' renderable_vertex_array are in CW order
-        # if not they are reordered correctly
-        pass
+        """
+        reorder the vertices of the rings so that the boundary is in CCW order (as seen from the positive-z halfspace)
+        and the holes are in the opposite order of the boundary (i.e., CW)
+        """
+        if len(self.boundary) < 3:
+            return
+
+        def normal_of(ring):
+            return ring_normal(np.array(ring.vertices[:len(ring)], dtype=np.float64))
+
+        boundary_normal = normal_of(self.boundary)
+        if boundary_normal[2] < 0:
+            self.boundary.vertices.reverse()
+            self.boundary.invalidate_substructures()
+            boundary_normal = -boundary_normal
+
+        for h in self.holes:
+            if len(h) > 2 and np.dot(normal_of(h), boundary_normal) > 0:
+                h.vertices.reverse()
+                h.invalidate_substructures()
+
+        self.invalidate_substructures()
 
     def contains_point_convex(self, a_point):
 
@@ -127,24 +163,37 @@ class Polygon(Surface, Renderable3d):
 
         return True
 
-    def contains_point(self, a_point):
-        boundary = list(self.boundary)
-        boundary = boundary[1:]
-        is_in = False
-
-        ray = Line([Point3(a_point.x(), a_point.y()), Point3(a_point.x(), a_point.y())])
-
-        for i, v_i in enumerate(boundary):
-            curr_edge = Line([boundary[i - 1], boundary[i]])
+    def rings_coords(self):
+        """:return: a list with a (n, 3) array of the coordinates of the vertices of each ring"""
+        return [np.array(r.vertices[:len(r)], dtype=np.float64).reshape(-1, 3) for r in self.rings]
 
-            x_max = max(curr_edge.start.x(), curr_edge.end.x())
-            if x_max > a_point.x():
-                ray.end.set_x(x_max + 1)
+    def contains_point(self, a_point):
+        """
+        :param a_point: a Point3
+        :return: True if the point is inside the polygon (on the xy plane)
+        """
+        return bool(self.contains_points([a_point])[0])
 
-            if ray.intersects(curr_edge):
-                is_in = not is_in
+    def contains_points(self, points):
+        """
+        test several points at once against the polygon (on the xy plane).
+        If the polygon was prepared (see prepare) its index is used, otherwise all the edges are tested.
+        :param points: a sequence of Point3 objects, or an (M, 2) or (M, 3) array of coordinates
+        :return: a boolean array telling, for each point, whether it is inside the polygon
+        """
+        if self._prepared is not None:
+            return self._prepared.contains_points(points)
+        return points_in_polygon(points, self.rings_coords())
 
-        return is_in
+    def prepare(self):
+        """
+        build (once, until the polygon is modified) an index of the edges of the polygon, so that each following
+        containment query costs O(log^2 n)
+        :return: the PreparedPolygon
+        """
+        if self._prepared is None:
+            self._prepared = PreparedPolygon(self.rings_coords())
+        return self._prepared
 
     def __eq__(self, other):
         # assume:
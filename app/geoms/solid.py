@@ -1,4 +1,5 @@
 from app.geoms.utils.renderable import Renderable3d
+from app.geoms.dcel.array_dcel import ArrayDCEL
 
 from OpenGL import GL
 
@@ -6,7 +7,8 @@ from OpenGL import GL
 class Solid(Renderable3d):
 
     def __init__(self, color=None):
-        Renderable3d.__init__(self, elements_type=GL.GL_TRIANGLES, color=color)
+        # solids can be large meshes, so they use the array-based DCEL
+        Renderable3d.__init__(self, elements_type=GL.GL_TRIANGLES, color=color, dcel_class=ArrayDCEL)
 
     # def update_renderable_arrays(self):
     #     """
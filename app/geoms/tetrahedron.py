@@ -81,3 +81,16 @@ class Tetrahedron(Solid):
                 (b.z() - d.z()) * (c.y() - d.y()) * (a.x() - d.x()) -
                 (c.z() - d.z()) * (a.y() - d.y()) * (b.x() - d.x())
         )
+
+    @staticmethod
+    def signed_volumes(a, b, c, d):
+        """
+        same as signed_volume, for many tetrahedra at once (computed with NumPy, in float64)
+        :param a: an (N, 3) array-like with the first vertex of each tetrahedron (or a single vertex, shared by all)
+        :param b: as a, for the second vertices
+        :param c: as a, for the third vertices
+        :param d: as a, for the fourth vertices
+        :return: an (N,) array with the volume (with sign) of each tetrahedron
+        """
+        a, b, c, d = (np.asarray(p, dtype=np.float64) for p in (a, b, c, d))
+        return np.einsum('...i,...i->...', a - d, np.cross(b - d, c - d))
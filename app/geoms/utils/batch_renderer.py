@@ -0,0 +1,304 @@
+"""
+Batched rendering of the geometries in the canvas.
+
+Rendering every geometry on its own costs a few GL calls per object (bind its buffers, set the attributes, upload its
+model matrix, draw), so the time needed to draw a frame grows with the number of objects, not with their size.
+The BatchRenderer groups the renderables by elements_type and packs each group into shared vertex/element/outline
+arrays (a RenderBatch), so that each group is drawn with one draw call for the elements and one for the outline.
+
+Only renderables whose model matrix is the identity can be batched (all vertices of a batch share the same u_model).
+The others, and the renderables explicitly excluded (e.g., the geometry being drawn, which changes at every mouse
+move), are rendered one by one as before.
+"""
+
+from app.geoms.utils.renderable import Renderable3d
+
+import numpy as np
+
+
+def _remove_identical(items, item):
+    """remove the given object from the list (list.remove would remove the first item equal to it, e.g., a Point3)"""
+    del items[next(k for k, other in enumerate(items) if other is item)]
+
+
+class RenderBatch(Renderable3d):
+    """
+    a set of renderables with the same elements_type whose renderable arrays are concatenated
+    (the indices of each member being shifted by the offset of its first vertex)
+    """
+
+    def __init__(self, elements_type):
+        Renderable3d.__init__(self, elements_type=elements_type)
+
+        self.members = list()
+        # key, value = id of a member, the ranges [start, stop) of its rows in the vertex, element, and outline arrays
+        self.member_rows = dict()
+        self._signature = None  # identifies the members (and their versions) packed in the batch
+        self._positions = dict()  # key, value = id of a member, its position in members (and in the signature)
+
+    def update_dcel(self):
+        """a batch has no geometry of its own, its renderable arrays are built by pack()"""
+        pass
+
+    @staticmethod
+    def _signature_of(members):
+        return [RenderBatch._member_signature(m) for m in members]
+
+    @staticmethod
+    def _member_signature(member):
+        return id(member), member.renderable_arrays_version, member.show_outline
+
+    @staticmethod
+    def _outline_of(member):
+        """:return: the outline elements of the member drawn by the batch (None if its outline is not shown)"""
+        return member.renderable_outline_element_array if member.show_outline else None
+
+    def needs_packing(self, members):
+        """:return: True if the batch does not contain exactly the given members, in their current version"""
+        return self._signature != RenderBatch._signature_of(members)
+
+    def pack(self, members):
+        """
+        concatenate the renderable arrays of the given members into the renderable arrays of this batch.
+        If the members are the same of the last packing and the changed ones still have as many rows, only their rows
+        are rewritten (and uploaded to the GPU)
+        :param members: a list of Renderable3d, all with the same elements_type of the batch
+        """
+        signature = RenderBatch._signature_of(members)
+        if self._signature is not None and [s[0] for s in signature] == [s[0] for s in self._signature]:
+            changed = [m for m, new, old in zip(members, signature, self._signature) if new != old]
+            if all(self._has_same_rows(m) for m in changed):
+                for m in changed:
+                    self._rewrite(m)
+                self._signature = signature
+                return
+
+        self.members = list(members)
+        self.member_rows = dict()
+        self._positions = dict((id(m), k) for k, m in enumerate(self.members))
+
+        vertex_arrays, element_arrays, outline_element_arrays = [], [], []
+        vertex_offset = element_offset = outline_offset = 0
+        for m in self.members:
+            outline = RenderBatch._outline_of(m)
+            vertex_num, element_num = len(m.renderable_vertex_array), len(m.renderable_element_array)
+            outline_num = len(outline) if outline is not None else 0
+            self.member_rows[id(m)] = ((vertex_offset, vertex_offset + vertex_num),
+                                       (element_offset, element_offset + element_num),
+                                       (outline_offset, outline_offset + outline_num))
+
+            vertex_arrays.append(m.renderable_vertex_array)
+            element_arrays.append(m.renderable_element_array + np.uint32(vertex_offset))
+            if outline is not None:
+                outline_element_arrays.append(outline + np.uint32(vertex_offset))
+
+            vertex_offset += vertex_num
+            element_offset += element_num
+            outline_offset += outline_num
+
+        # only the rows that differ from the previous packing are uploaded to the GPU (e.g., when members are appended)
+        self.set_renderable_arrays(
+            np.concatenate(vertex_arrays),
+            np.concatenate(element_arrays).astype(np.uint32),
+            np.concatenate(outline_element_arrays).astype(np.uint32) if outline_element_arrays else None)
+
+        self._signature = signature
+
+    def update_members(self, changed):
+        """
+        take the new renderable arrays of the given members: only their rows are rewritten (and uploaded to the GPU),
+        unless some of them changed their number of rows, in which case the whole batch is packed again
+        :param changed: a list of members of the batch
+        """
+        if all(self._has_same_rows(m) for m in changed):
+            for m in changed:
+                self._rewrite(m)
+        else:
+            self.pack(self.members)
+
+    def _has_same_rows(self, member):
+        """:return: True if the renderable arrays of the member have as many rows as when it was packed"""
+        outline = RenderBatch._outline_of(member)
+        (v0, v1), (e0, e1), (o0, o1) = self.member_rows[id(member)]
+        return len(member.renderable_vertex_array) == v1 - v0 and \
+            len(member.renderable_element_array) == e1 - e0 and \
+            (len(outline) if outline is not None else 0) == o1 - o0
+
+    def _rewrite(self, member):
+        """copy the renderable arrays of the member in its rows of the renderable arrays of the batch"""
+        (v0, v1), (e0, e1), (o0, o1) = self.member_rows[id(member)]
+        self.renderable_vertex_array[v0:v1] = member.renderable_vertex_array
+        self.renderable_element_array[e0:e1] = member.renderable_element_array + np.uint32(v0)
+        if o1 > o0:
+            self.renderable_outline_element_array[o0:o1] = RenderBatch._outline_of(member) + np.uint32(v0)
+        self.renderable_rows_updated((v0, v1), (e0, e1), (o0, o1))
+        self._signature[self._positions[id(member)]] = RenderBatch._member_signature(member)
+
+
+class BatchRenderer(object):
+    """
+    The renderables drawn by a BatchRenderer tell it when they change (see Renderable3d.renderers), so that an update
+    only visits the renderables that changed since the last one: their rows are rewritten in their batches, and only
+    the batches whose members changed are packed again. All the renderables are regrouped only after invalidate()
+    """
+
+    # the placement of a renderable that is not batched: hidden, or rendered one by one
+    HIDDEN = 'hidden'
+    UNBATCHED = 'unbatched'
+
+    def __init__(self):
+        self.batches = dict()  # key, value = elements_type, RenderBatch
+        self.unbatched = list()  # renderables that cannot be batched, so they are rendered one by one
+
+        self._renderables_changed = True
+        self._excluded_ids = set()  # the ids of the renderables excluded at the last regrouping
+
+        self._members = dict()  # key, value = elements_type, the members of its batch
+        self._placements = dict()  # key, value = id of a watched renderable, its elements_type (or HIDDEN/UNBATCHED)
+        self._watched = dict()  # key, value = id of a renderable telling this renderer when it changes, the renderable
+        self._parts = dict()  # key, value = id of a renderable passed to update, the ids of its get_renderables()
+        self._dirty = dict()  # key, value = id of a watched renderable changed since the last update, the renderable
+
+    def invalidate(self):
+        """must be called every time renderables are added to or removed from the rendered set"""
+        self._renderables_changed = True
+
+    def mark_dirty(self, renderable):
+        """called by a watched renderable when it changes (see Renderable3d.modified)"""
+        self._dirty[id(renderable)] = renderable
+
+    @staticmethod
+    def is_batchable(renderable):
+        return renderable.renderable_vertex_array is not None and \
+               renderable.renderable_element_array is not None and \
+               renderable._model2world_matrix.isIdentity()
+
+    @staticmethod
+    def placement_of(renderable):
+        """:return: the elements_type of the batch of the renderable, or HIDDEN, or UNBATCHED"""
+        if not renderable.visible:
+            return BatchRenderer.HIDDEN
+        renderable.refresh_renderable_arrays()
+        return renderable.elements_type if BatchRenderer.is_batchable(renderable) else BatchRenderer.UNBATCHED
+
+    def update(self, renderables, excluded=()):
+        """
+        regroup the renderables (after invalidate()), or update the batches of the renderables that changed.
+        Nothing is done if no renderable was added, removed, or modified since the last update.
+        :param renderables: the renderables to be drawn
+        :param excluded: renderables that must be rendered one by one
+        """
+        excluded_ids = set(id(r) for r in excluded if r is not None)
+        if self._renderables_changed or excluded_ids != self._excluded_ids:
+            self._regroup(renderables, excluded_ids)
+        elif self._dirty:
+            # a renderable made of other renderables (e.g., a polygon and its rings) may have changed its parts
+            if any(key in self._parts and self._parts[key] != [id(r) for r in renderable.get_renderables()]
+                   for key, renderable in self._dirty.items()):
+                self._regroup(renderables, excluded_ids)
+            else:
+                self._update_dirty()
+
+    def _watch(self, renderable):
+        self._watched[id(renderable)] = renderable
+        if self not in renderable.renderers:
+            renderable.renderers.append(self)
+
+    def _regroup(self, renderables, excluded_ids):
+        """group all the renderables by elements_type, and pack the batches whose members changed"""
+        watched = self._watched
+        self._watched, self._parts, self._placements = dict(), dict(), dict()
+        self._members = dict()  # key, value = elements_type, list of renderables
+        self.unbatched = list()
+
+        for renderable in renderables:
+            if id(renderable) in excluded_ids:
+                self.unbatched.append(renderable)
+                continue
+
+            parts = renderable.get_renderables()
+            self._parts[id(renderable)] = [id(r) for r in parts]
+            self._watch(renderable)
+            for r in parts:
+                self._watch(r)
+                placement = self._placements[id(r)] = BatchRenderer.placement_of(r)
+                if placement == BatchRenderer.UNBATCHED:
+                    self.unbatched.append(r)
+                elif placement != BatchRenderer.HIDDEN:
+                    self._members.setdefault(placement, list()).append(r)
+
+        # the renderables no longer drawn stop telling this renderer about their changes
+        for key, r in watched.items():
+            if key not in self._watched:
+                r.renderers.remove(self)
+
+        for elements_type in set(self.batches) | set(self._members):
+            self._repack(elements_type)
+
+        self._renderables_changed = False
+        self._excluded_ids = excluded_ids
+        self._dirty = dict()
+
+    def _update_dirty(self):
+        """move the renderables that changed between the batches, and update their rows in the batches"""
+        dirty = list(self._dirty.values())
+        placements = [BatchRenderer.placement_of(r) for r in dirty]  # this may refresh their arrays (and mark them)
+        self._dirty = dict()
+
+        changed = dict()  # key, value = elements_type, the members of its batch that changed
+        regrouped = set()  # the elements_types of the batches that lost or gained members
+        for r, placement in zip(dirty, placements):
+            old_placement = self._placements.get(id(r), BatchRenderer.HIDDEN)
+            if placement == old_placement:
+                if placement not in (BatchRenderer.HIDDEN, BatchRenderer.UNBATCHED):
+                    changed.setdefault(placement, list()).append(r)
+                continue
+
+            if old_placement == BatchRenderer.UNBATCHED:
+                _remove_identical(self.unbatched, r)
+            elif old_placement != BatchRenderer.HIDDEN:
+                _remove_identical(self._members[old_placement], r)
+                regrouped.add(old_placement)
+
+            if placement == BatchRenderer.UNBATCHED:
+                self.unbatched.append(r)
+            elif placement != BatchRenderer.HIDDEN:
+                self._members.setdefault(placement, list()).append(r)
+                regrouped.add(placement)
+            self._placements[id(r)] = placement
+
+        for elements_type in regrouped:
+            self._repack(elements_type)
+        for elements_type, members in changed.items():
+            if elements_type not in regrouped:
+                self.batches[elements_type].update_members(members)
+
+    def _repack(self, elements_type):
+        """pack the batch of the given elements_type again, or drop it (and free its GPU buffers) if it is empty"""
+        members = self._members.get(elements_type)
+        if not members:
+            self._members.pop(elements_type, None)
+            batch = self.batches.pop(elements_type, None)
+            if batch is not None:
+                batch.delete_GPU_buffers()
+            return
+
+        batch = self.batches.get(elements_type)
+        if batch is None:
+            batch = self.batches[elements_type] = RenderBatch(elements_type)
+        if batch.needs_packing(members):
+            batch.pack(members)
+
+    def render(self, shader_program, renderables, excluded=(), tint=None):
+        """
+        render all the given renderables: one draw call for the elements and one for the outline of each batch,
+        plus the calls of the renderables rendered one by one
+        :param tint: an (r, g, b, a) tuple multiplying the colors of all the renderables (see Renderable3d.render)
+        """
+        self.update(renderables, excluded)
+
+        for batch in self.batches.values():
+            batch.render(shader_program, tint=tint)
+
+        for renderable in self.unbatched:
+            renderable.render(shader_program, tint=tint)
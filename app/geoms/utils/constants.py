@@ -14,6 +14,11 @@ COPLANAR = 20  # one or more 3D geometries lie on the same plane
 
 EPSILON = 0.00001
 
+# distributions of random points
+RANDOM_UNIFORM = "uniform"
+RANDOM_GAUSSIAN = "gaussian"
+RANDOM_CLUSTERED = "clustered"
+
 
 
 
@@ -0,0 +1,184 @@
+"""
+Deduplication of near-coincident points, in O(n) expected time (plus the sorting done by NumPy), with a tolerance.
+
+Two points are duplicates if they are within the tolerance, and duplicates are merged transitively (single linkage):
+a group of duplicates is a connected component of the graph linking the pairs of points within the tolerance, and the
+first of its points (in input order) is its representative.
+The points are hashed to the cells of a grid whose side is the tolerance, so two points within the tolerance lie
+in the same cell or in two adjacent cells, and each point is compared only with the points in its cell and in the
+3^D - 1 cells around it. So the duplicates produced by floating-point noise (far closer than the tolerance) are always
+collapsed, wherever they are, without comparing all the pairs of points, and without the exact comparisons of a hash
+of the coordinates. Exactly equal points are merged before hashing, so that many copies of a point cost no more than
+one.
+
+The cells are numbered with a few sorts of 1-dimensional arrays, the neighbours of all the cells are found with a
+binary search per direction, and the groups of duplicates are labelled by propagating the minimum label along the
+pairs of points within the tolerance.
+"""
+
+import itertools
+
+import numpy as np
+
+from app.geoms.utils.constants import *
+
+# up to this many points, unique_points compares the points pairwise instead of hashing them
+PAIRWISE_DEDUPLICATION_MAX = 16
+
+
+class _CellTable(object):
+    """
+    the distinct cells of a set of (integer) cell coordinates, numbered in lexicographic order.
+    The coordinates are ranked axis by axis, and the ranks of the first axes are combined (and re-ranked) with the
+    rank of the next axis, so all the codes fit in an int64 and only 1-dimensional arrays are sorted
+    """
+
+    def __init__(self, cells):
+        self.axis_values = list()  # the distinct coordinates of the cells along each axis
+        self.prefix_codes = list()  # the distinct combined codes of the first 2, 3, ... axes
+
+        ranks = list()  # the rank of the coordinate of each row, along each axis
+        for d in range(cells.shape[1]):
+            values, rank = np.unique(cells[:, d], return_inverse=True)
+            self.axis_values.append(values)
+            ranks.append(rank.reshape(-1))
+
+        cell_of, first = ranks[0], None
+        for d in range(1, cells.shape[1]):
+            codes, first, cell_of = np.unique(cell_of * len(self.axis_values[d]) + ranks[d],
+                                              return_index=True, return_inverse=True)
+            self.prefix_codes.append(codes)
+        if first is None:
+            first = np.unique(cell_of, return_index=True)[1]
+
+        self.cell_of = cell_of.reshape(-1)  # the cell of each row
+        self.first = first  # the first row of each cell
+        self.cell_ranks = [rank[first] for rank in ranks]  # the ranks of the coordinates of each cell
+
+    def neighbours(self, offset):
+        """
+        :param offset: a tuple with the offset of the neighbour along each axis (in cells)
+        :return: the cells that have a neighbour at the given offset, and their neighbours
+        """
+        cells = np.arange(len(self.first))
+        code = None
+        for d, o in enumerate(offset):
+            values = self.axis_values[d]
+            rank = self.cell_ranks[d][cells]
+            if o:
+                # the shifted coordinate can only be the previous or the next distinct coordinate along the axis
+                shifted = np.clip(rank + o, 0, len(values) - 1)
+                valid = values[shifted] == values[rank] + o
+                cells, rank, code = cells[valid], shifted[valid], (code[valid] if code is not None else None)
+
+            if code is None:
+                code = rank
+            else:
+                # the cells are visited in lexicographic order, so the queries are sorted (as searchsorted likes)
+                combined = code * len(values) + rank
+                code = np.searchsorted(self.prefix_codes[d - 1], combined)
+                valid = code < len(self.prefix_codes[d - 1])
+                valid[valid] = self.prefix_codes[d - 1][code[valid]] == combined[valid]
+                cells, code = cells[valid], code[valid]
+        return cells, code
+
+
+def _point_pairs(starts, counts, a, b):
+    """
+    :param starts, counts: the position of the first point of each cell (in the points sorted by cell), and the number
+    of points in each cell
+    :param a, b: two arrays of cells
+    :return: the positions (in the points sorted by cell) of all the pairs of points of the cells a[k] and b[k]
+    """
+    pairs_num = counts[a] * counts[b]
+    pair_cells = np.repeat(np.arange(len(a)), pairs_num)
+    k = np.arange(len(pair_cells)) - np.repeat(np.cumsum(pairs_num) - pairs_num, pairs_num)
+    b_counts = counts[b][pair_cells]
+    return starts[a][pair_cells] + k // b_counts, starts[b][pair_cells] + k % b_counts
+
+
+def deduplicate(coords, tolerance=EPSILON):
+    """
+    :param coords: an (N, D) array-like with the coordinates of the points (D being 2 or 3)
+    :param tolerance: the distance under which two points are considered the same point
+    :return: the (sorted) indices of the representatives of the groups of duplicates, and, for each point, the
+    position of its representative among them (as np.unique does with return_index and return_inverse). So,
+    representatives[inverse] maps each point to its representative, and coords[representatives] are the unique points
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    if coords.size == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    coords = coords.reshape(len(coords), -1)
+    points_num = len(coords)
+
+    # merge the exactly equal points first
+    coords, first_of, distinct_of = np.unique(coords, axis=0, return_index=True, return_inverse=True)
+    distinct_of = distinct_of.reshape(-1)
+
+    # sort the (distinct) points by cell
+    table = _CellTable(np.floor(coords / tolerance).astype(np.int64))
+    order = np.argsort(table.cell_of, kind='stable')
+    counts = np.bincount(table.cell_of, minlength=len(table.first))
+    starts = np.cumsum(counts) - counts
+    dimension = coords.shape[1]
+
+    # the pairs of points within the tolerance, in the same cell or in adjacent cells (each pair of adjacent cells is
+    # found once, from the offsets greater than zero in lexicographic order)
+    pairs_a, pairs_b = list(), list()
+    for offset in itertools.product((-1, 0, 1), repeat=dimension):
+        if offset < (0,) * dimension:
+            continue
+        if offset == (0,) * dimension:
+            a = b = np.nonzero(counts > 1)[0]
+        else:
+            a, b = table.neighbours(offset)
+        i, j = _point_pairs(starts, counts, a, b)
+        i, j = order[i], order[j]
+        differences = coords[i] - coords[j]
+        close = np.sqrt(np.sum(differences * differences, axis=1)) <= tolerance
+        if offset == (0,) * dimension:
+            close &= i < j
+        pairs_a.append(i[close])
+        pairs_b.append(j[close])
+    pairs_a, pairs_b = np.concatenate(pairs_a), np.concatenate(pairs_b)
+
+    # label each group of duplicates with the smallest (distinct) point in it
+    labels = np.arange(len(coords))
+    while len(pairs_a):
+        new_labels = labels.copy()
+        np.minimum.at(new_labels, pairs_a, labels[pairs_b])
+        np.minimum.at(new_labels, pairs_b, labels[pairs_a])
+        new_labels = new_labels[new_labels]
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+    # the representative of a group is its first point
+    group_first = np.full(len(coords), points_num, dtype=np.int64)
+    np.minimum.at(group_first, labels, first_of)
+    point_representatives = group_first[labels][distinct_of]
+
+    return np.unique(point_representatives, return_inverse=True)
+
+
+def unique_points(points, tolerance=EPSILON):
+    """
+    :param points: a list of Vector3 (or Point3) objects
+    :param tolerance: the distance under which two points are considered the same point
+    :return: the list of the representatives of the groups of duplicates in points (see deduplicate), in input order
+    """
+    if len(points) <= PAIRWISE_DEDUPLICATION_MAX:
+        # a few points (as given to the predicates) are compared pairwise, which is much faster than hashing them
+        squared_tolerance = tolerance * tolerance
+        coords = [p.tolist() for p in points]
+        groups = list(range(len(points)))  # the first point of the group of each point
+        for i in range(len(points)):
+            for j in range(i):
+                if groups[i] != groups[j] and \
+                        sum((a - b) * (a - b) for a, b in zip(coords[i], coords[j])) <= squared_tolerance:
+                    merged, kept = max(groups[i], groups[j]), min(groups[i], groups[j])
+                    groups = [kept if g == merged else g for g in groups]
+        return [p for i, p in enumerate(points) if groups[i] == i]
+
+    representatives, _ = deduplicate(np.array(points, dtype=np.float64), tolerance)
+    return [points[i] for i in representatives.tolist()]
@@ -0,0 +1,88 @@
+"""
+a buffer on the GPU (VBO, IBO, ...) that is kept alive across the updates of the array it mirrors.
+
+The buffer is allocated with some spare capacity (which grows geometrically), so that a changed array of about the
+same size is uploaded in place with glBufferSubData, and only the rows that changed since the last upload are sent.
+"""
+
+from app.geoms.utils.shader_program import GL
+
+import numpy as np
+
+
+class GPUBuffer(object):
+
+    GROWTH_FACTOR = 2  # when the array does not fit the buffer any longer, the capacity is (at least) multiplied by this
+
+    def __init__(self, target, usage=GL.GL_STATIC_DRAW):
+        """
+        :param target: the type of buffer, e.g., GL_ARRAY_BUFFER or GL_ELEMENT_ARRAY_BUFFER
+        :param usage: the expected usage pattern of the buffer (GL_STATIC_DRAW, GL_DYNAMIC_DRAW, ...)
+        """
+        self.target = target
+        self.usage = usage
+
+        self.buffer_id = None  # the id of the buffer on the GPU (generated at the first upload)
+        self.capacity = 0  # the number of bytes allocated on the GPU
+
+        # the rows of the array that changed since the last upload
+        self.dirty = True
+        self.dirty_range = None  # the range [start, stop) of the changed rows, None means all of them
+
+    def set_usage(self, usage):
+        """
+        change the usage pattern: as it can only be given when the buffer is allocated, the buffer will be
+        reallocated (and the array uploaded again) at the next upload
+        """
+        if usage != self.usage:
+            self.usage = usage
+            self.capacity = 0
+            self.mark_dirty()
+
+    def mark_dirty(self, start=None, stop=None):
+        """
+        mark the rows [start, stop) of the array as changed (all the rows if start is None)
+        """
+        if start is None or (self.dirty and self.dirty_range is None):
+            self.dirty_range = None
+        elif self.dirty:
+            self.dirty_range = (min(start, self.dirty_range[0]), max(stop, self.dirty_range[1]))
+        else:
+            self.dirty_range = (start, stop)
+        self.dirty = True
+
+    def upload(self, array):
+        """
+        upload to the GPU the changed rows of the given (one-dimensional) numpy array
+        :param array: the array mirrored by this buffer
+        """
+        if not self.dirty:
+            return
+
+        if self.buffer_id is None:
+            self.buffer_id = GL.glGenBuffers(1)  # create an empty buffer on GPU side and returns its id
+
+        GL.glBindBuffer(self.target, self.buffer_id)
+
+        start, stop = 0, len(array)
+        if array.nbytes > self.capacity:
+            # (re)allocate the buffer with some spare room, so that the next arrays will likely fit it
+            self.capacity = max(array.nbytes, GPUBuffer.GROWTH_FACTOR * self.capacity)
+            GL.glBufferData(self.target, self.capacity, None, self.usage)
+        elif self.dirty_range is not None:
+            start, stop = self.dirty_range[0], min(self.dirty_range[1], len(array))
+
+        if stop > start:
+            GL.glBufferSubData(self.target, start * array.itemsize, (stop - start) * array.itemsize,
+                               np.ascontiguousarray(array[start:stop]))
+
+        self.dirty = False
+        self.dirty_range = None
+
+    def delete(self):
+        """free the buffer on the GPU"""
+        if self.buffer_id is not None:
+            GL.glDeleteBuffers(1, [self.buffer_id])
+            self.buffer_id = None
+            self.capacity = 0
+        self.mark_dirty()
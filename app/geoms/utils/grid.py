@@ -2,7 +2,7 @@ from app.geoms.utils.renderable import Renderable3d
 
 from app.config.params import *
 
-from OpenGL import GL
+from app.geoms.utils.shader_program import GL
 
 class MyGrid(Renderable3d):
     def __init__(self):
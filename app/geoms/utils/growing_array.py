@@ -0,0 +1,63 @@
+import numpy as np
+
+
+class GrowingArray(object):
+    """
+    a NumPy buffer of rows of a fixed width (or of a structured dtype), supporting amortized O(1) appends:
+    when the buffer is full its capacity is doubled
+    """
+
+    def __init__(self, dtype, width=None, capacity=64):
+        self._width = width
+        self._data = np.empty((capacity, width) if width else capacity, dtype=dtype)
+        self._size = 0
+
+    @staticmethod
+    def of(array):
+        """:return: a GrowingArray initialized with (a copy of) the rows of the given array"""
+        array = np.asarray(array)
+        growing_array = GrowingArray(array.dtype, width=array.shape[1] if array.ndim > 1 else None,
+                                     capacity=max(64, 2 * len(array)))
+        growing_array.extend(array)
+        return growing_array
+
+    def _reserve(self, size):
+        if size > len(self._data):
+            new_data = np.empty((max(size, 2 * len(self._data)),) + self._data.shape[1:], dtype=self._data.dtype)
+            new_data[:self._size] = self._data[:self._size]
+            self._data = new_data
+
+    def append(self, value):
+        self._reserve(self._size + 1)
+        self._data[self._size] = value
+        self._size += 1
+
+    def extend(self, values):
+        self._reserve(self._size + len(values))
+        self._data[self._size:self._size + len(values)] = values
+        self._size += len(values)
+
+    def insert(self, i, value):
+        """insert a row at position i, shifting the next rows by one (a single memmove)"""
+        self._reserve(self._size + 1)
+        self._data[i + 1:self._size + 1] = self._data[i:self._size]
+        self._data[i] = value
+        self._size += 1
+
+    def truncate(self, size):
+        """drop the rows after the first size ones"""
+        self._size = min(size, self._size)
+
+    def view(self):
+        """
+        :return: a view (not a copy) of the content of the buffer.
+        NOTE: the view is not valid any longer once the buffer grows, so it must be taken again after each append
+        """
+        return self._data[:self._size]
+
+    def as_array(self):
+        """:return: a (trimmed) copy of the content of the buffer"""
+        return self._data[:self._size].copy()
+
+    def __len__(self):
+        return self._size
@@ -0,0 +1,322 @@
+"""
+Nearest-vertex and nearest-segment queries (on the xy plane) over all the geometries of the canvas, used to pick the
+geometry under the cursor.
+
+The vertices are stored in a uniform grid, packed in NumPy arrays as a sorted list of cell keys (a cell being
+identified by key = column * row_num + row): the vertices of a cell are a contiguous range of the sorted arrays, and
+the cells of a row within a box are a contiguous range too, so a box query costs one binary search per row of cells.
+The cell size is chosen so that a cell contains a few vertices on average.
+Each segment is stored in all the cells covered by its box, unless they are too many: such long segments are kept
+apart, and checked at every query.
+
+A query within a radius r from a point gets the candidates from the cells covered by the box [p - r, p + r], then
+computes their exact distances. The radius is usually a few pixels, converted in world units.
+
+As the SpatialIndex of the canvas, the grid is rebuilt lazily: the geometries added (or edited) after the last build
+are pending, and are checked linearly at every query; the removed ones are marked as removed; the grid is rebuilt by
+the first query that finds too many of either.
+"""
+
+import numpy as np
+
+_VERTICES_PER_CELL = 4  # the mean number of vertices per cell, used to choose the cell size
+_MAX_SEGMENT_CELLS = 16  # segments covering more cells are not stored in the grid
+
+
+def geometry_arrays(geom):
+    """
+    :param geom: a Point3, PointCloud, LineString (Line and LinearRing included), or Polygon
+    :return: xy: an (N, 2) array with the coordinates of the vertices of the geometry (the vertices of all the rings,
+             for a polygon), segments: an (M, 2) array with the indices in xy of the extremes of its segments.
+             Other geometries have no vertices
+    """
+    from app.geoms.point import Point3
+    from app.geoms.linestring import LineString
+    from app.geoms.polygon import Polygon
+    from app.geoms.pointcloud import PointCloud
+
+    no_segments = np.empty((0, 2), dtype=np.int64)
+
+    if isinstance(geom, Point3):
+        return np.array([[geom.x(), geom.y()]], dtype=np.float64), no_segments
+    if isinstance(geom, PointCloud):
+        return np.array(geom.coords[:, :2], dtype=np.float64), no_segments
+
+    if isinstance(geom, LineString):
+        lines = [geom.vertices]
+    elif isinstance(geom, Polygon):
+        lines = [ring.vertices for ring in geom.rings]
+    else:
+        return np.empty((0, 2)), no_segments
+
+    xy, segments, offset = [np.empty((0, 2))], [no_segments], 0
+    for vertices in lines:
+        xy.append(np.array([[v.x(), v.y()] for v in vertices], dtype=np.float64).reshape(-1, 2))
+        first = np.arange(offset, offset + len(vertices) - 1)
+        segments.append(np.column_stack((first, first + 1)))
+        offset += len(vertices)
+    return np.concatenate(xy), np.concatenate(segments)
+
+
+def _segment_distances(px, py, a, b):
+    """:return: the distances of the point (px, py) from the segments a[k]-b[k] ((K, 2) arrays)"""
+    ab = b - a
+    length2 = ab[:, 0] * ab[:, 0] + ab[:, 1] * ab[:, 1]
+    t = ((px - a[:, 0]) * ab[:, 0] + (py - a[:, 1]) * ab[:, 1]) / np.where(length2 > 0, length2, 1)
+    t = np.clip(t, 0, 1)
+    return np.hypot(a[:, 0] + t * ab[:, 0] - px, a[:, 1] + t * ab[:, 1] - py)
+
+
+class _Grid(object):
+    """a uniform grid of ids, packed in sorted arrays (see the module docstring)"""
+
+    def __init__(self, x0, y0, cell_size, column_num, row_num):
+        self.x0, self.y0, self.cell_size = x0, y0, cell_size
+        self.column_num, self.row_num = column_num, row_num
+        self.keys = np.empty(0, dtype=np.int64)
+        self.ids = np.empty(0, dtype=np.int64)
+
+    def cell_ranges(self, xmin, ymin, xmax, ymax):
+        """:return: the (clipped) columns i0..i1 and rows j0..j1 of the cells covered by the given boxes"""
+        i0 = np.clip(np.floor((xmin - self.x0) / self.cell_size), 0, self.column_num - 1).astype(np.int64)
+        i1 = np.clip(np.floor((xmax - self.x0) / self.cell_size), 0, self.column_num - 1).astype(np.int64)
+        j0 = np.clip(np.floor((ymin - self.y0) / self.cell_size), 0, self.row_num - 1).astype(np.int64)
+        j1 = np.clip(np.floor((ymax - self.y0) / self.cell_size), 0, self.row_num - 1).astype(np.int64)
+        return i0, i1, j0, j1
+
+    def fill(self, ids, i0, i1, j0, j1):
+        """store each id in all the cells of its range of columns and rows"""
+        columns, rows = i1 - i0 + 1, j1 - j0 + 1
+        counts = columns * rows
+        owner = np.repeat(np.arange(len(ids)), counts)
+        k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        keys = (i0[owner] + k // rows[owner]) * self.row_num + j0[owner] + k % rows[owner]
+
+        order = np.argsort(keys, kind='stable')
+        self.keys, self.ids = keys[order], ids[owner[order]]
+
+    def query(self, xmin, ymin, xmax, ymax):
+        """:return: the ids stored in the cells covered by the given box (an id may be repeated)"""
+        if len(self.keys) == 0:
+            return np.empty(0, dtype=np.int64)
+        i0, i1, j0, j1 = self.cell_ranges(xmin, ymin, xmax, ymax)
+        columns = np.arange(i0, i1 + 1) * self.row_num
+        starts = np.searchsorted(self.keys, columns + j0, side='left')
+        stops = np.searchsorted(self.keys, columns + j1, side='right')
+        lengths = stops - starts
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return self.ids[positions]
+
+
+class PickIndex(object):
+    """the vertices and the segments of a set of geometries, indexed by a uniform grid (see the module docstring)"""
+
+    def __init__(self):
+        self._geoms = list()  # the geometry of each block (None if removed)
+        self._arrays = list()  # the (xy, segments) of each block
+        self._blocks = dict()  # key, value = id of a geometry, its block
+        self._removed_num = 0
+
+        # the blocks [0, built_num) are in the grids, the others are pending
+        self._built_num = 0
+        self._removed = np.zeros(0, dtype=bool)  # for each block in the grids, True if removed
+        self._vertex_num = 0
+
+        # the arrays of all the vertices (and segments) in the grids: the coordinates, block, and index in the block
+        self._xy = np.empty((0, 2))
+        self._vertex_blocks = self._vertex_locals = np.empty(0, dtype=np.int64)
+        self._segment_a = self._segment_b = np.empty((0, 2))
+        self._segment_blocks = self._segment_locals = np.empty(0, dtype=np.int64)
+
+        self._vertex_grid = self._segment_grid = None
+        self._long_segments = np.empty(0, dtype=np.int64)
+
+        self._pending = None  # the arrays of the pending blocks, cached until the pending blocks change
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def __contains__(self, geom):
+        return id(geom) in self._blocks
+
+    def insert(self, geom):
+        """add a geometry (or take its new vertices, if it is already in the index)"""
+        if id(geom) in self._blocks:
+            self.remove(geom)
+        self._blocks[id(geom)] = len(self._geoms)
+        self._geoms.append(geom)
+        self._arrays.append(geometry_arrays(geom))
+        self._pending = None
+
+    def remove(self, geom):
+        block = self._blocks.pop(id(geom), None)
+        if block is not None:
+            self._geoms[block] = None
+            self._arrays[block] = None
+            self._removed_num += 1
+            if block < self._built_num:
+                self._removed[block] = True
+            else:
+                self._pending = None
+
+    def update(self, geom):
+        """take the new vertices of a geometry (e.g., after an edit)"""
+        self.insert(geom)
+
+    @staticmethod
+    def _concatenate(arrays, blocks):
+        """
+        :return: the arrays of the vertices and of the segments of the given blocks: the xy coordinates, block, and
+        index in the block of each vertex; the extremes a and b, block, and index in the block of each segment
+        """
+        arrays = [(block, xy, segments) for block, (xy, segments) in zip(blocks, arrays)]
+        vertex_num = np.array([len(xy) for block, xy, segments in arrays], dtype=np.int64)
+        segment_num = np.array([len(segments) for block, xy, segments in arrays], dtype=np.int64)
+        block_ids = np.array([block for block, xy, segments in arrays], dtype=np.int64)
+
+        xy = np.concatenate([np.empty((0, 2))] + [xy for block, xy, segments in arrays])
+        vertex_blocks = np.repeat(block_ids, vertex_num)
+        vertex_locals = np.arange(len(xy)) - np.repeat(np.cumsum(vertex_num) - vertex_num, vertex_num)
+
+        offsets = np.repeat(np.cumsum(vertex_num) - vertex_num, segment_num)
+        segments = np.concatenate([np.empty((0, 2), dtype=np.int64)] + [s for block, xy, s in arrays])
+        segments = segments + offsets[:, None]
+        segment_blocks = np.repeat(block_ids, segment_num)
+        segment_locals = np.arange(len(segments)) - np.repeat(np.cumsum(segment_num) - segment_num, segment_num)
+
+        return (xy, vertex_blocks, vertex_locals), \
+               (xy[segments[:, 0]], xy[segments[:, 1]], segment_blocks, segment_locals)
+
+    def _needs_rebuild(self):
+        pending_num = sum(len(a[0]) for a in self._arrays[self._built_num:] if a is not None) \
+            if self._pending is None else len(self._pending[0][0])
+        return pending_num > max(4096, self._vertex_num // 32) or self._removed_num > max(256, len(self._geoms) // 2)
+
+    def _build(self):
+        """compact the blocks (dropping the removed geometries) and store all the vertices and segments in new grids"""
+        live = [block for block, geom in enumerate(self._geoms) if geom is not None]
+        self._geoms = [self._geoms[block] for block in live]
+        self._arrays = [self._arrays[block] for block in live]
+        self._blocks = dict((id(geom), block) for block, geom in enumerate(self._geoms))
+        self._removed_num = 0
+        self._built_num = len(self._geoms)
+        self._removed = np.zeros(self._built_num, dtype=bool)
+        self._pending = None
+
+        (self._xy, self._vertex_blocks, self._vertex_locals), \
+            (self._segment_a, self._segment_b, self._segment_blocks, self._segment_locals) = \
+            PickIndex._concatenate(self._arrays, range(self._built_num))
+        self._vertex_num = len(self._xy)
+
+        if self._vertex_num == 0:
+            self._vertex_grid = self._segment_grid = None
+            return
+
+        (x0, y0), (x1, y1) = self._xy.min(axis=0), self._xy.max(axis=0)
+        extent = max(x1 - x0, y1 - y0, 1e-9)
+        cell_size = extent / np.sqrt(max(1.0, self._vertex_num / _VERTICES_PER_CELL))
+        column_num = int((x1 - x0) / cell_size) + 1
+        row_num = int((y1 - y0) / cell_size) + 1
+
+        self._vertex_grid = _Grid(x0, y0, cell_size, column_num, row_num)
+        i, _, j, _ = self._vertex_grid.cell_ranges(self._xy[:, 0], self._xy[:, 1], self._xy[:, 0], self._xy[:, 1])
+        self._vertex_grid.fill(np.arange(self._vertex_num), i, i, j, j)
+
+        self._segment_grid = _Grid(x0, y0, cell_size, column_num, row_num)
+        lo, hi = np.minimum(self._segment_a, self._segment_b), np.maximum(self._segment_a, self._segment_b)
+        i0, i1, j0, j1 = self._segment_grid.cell_ranges(lo[:, 0], lo[:, 1], hi[:, 0], hi[:, 1])
+        short = (i1 - i0 + 1) * (j1 - j0 + 1) <= _MAX_SEGMENT_CELLS
+        self._segment_grid.fill(np.nonzero(short)[0], i0[short], i1[short], j0[short], j1[short])
+        self._long_segments = np.nonzero(~short)[0]
+
+    def _pending_arrays(self):
+        if self._pending is None:
+            blocks = [block for block in range(self._built_num, len(self._geoms)) if self._geoms[block] is not None]
+            self._pending = PickIndex._concatenate([self._arrays[block] for block in blocks], blocks)
+        return self._pending
+
+    def vertex_xy(self, geom, k):
+        """:return: the xy coordinates of the k-th vertex of the given geometry (as indexed by nearest_vertex)"""
+        xy, segments = self._arrays[self._blocks[id(geom)]]
+        return xy[k]
+
+    def segment_xy(self, geom, k):
+        """:return: the xy coordinates of the extremes of the k-th segment of the given geometry"""
+        xy, segments = self._arrays[self._blocks[id(geom)]]
+        return xy[segments[k, 0]], xy[segments[k, 1]]
+
+    def nearest_vertex(self, x, y, radius, exclude=None):
+        """
+        :param x, y: the coordinates of the query point
+        :param radius: the max distance of the vertex from the point
+        :param exclude: a geometry whose vertices are ignored (e.g., the geometry being drawn)
+        :return: (geometry, index of the vertex in the geometry, distance) of the nearest vertex, or None if no vertex
+        is within the radius. The vertices of a polygon are indexed as the vertices of its rings, concatenated
+        """
+        if self._needs_rebuild():
+            self._build()
+
+        candidates = list()
+        if self._vertex_grid is not None:
+            ids = self._vertex_grid.query(x - radius, y - radius, x + radius, y + radius)
+            ids = ids[~self._removed[self._vertex_blocks[ids]]]
+            candidates.append((self._xy[ids], self._vertex_blocks[ids], self._vertex_locals[ids]))
+        candidates.append(self._pending_arrays()[0])
+
+        return self._nearest(candidates, lambda xy: np.hypot(xy[:, 0] - x, xy[:, 1] - y), radius, exclude)
+
+    def nearest_segment(self, x, y, radius, exclude=None):
+        """
+        :param x, y: the coordinates of the query point
+        :param radius: the max distance of the segment from the point
+        :param exclude: a geometry whose segments are ignored
+        :return: (geometry, index of the segment in the geometry, distance) of the nearest segment, or None if no
+        segment is within the radius. The segment k joins the vertices k and k + 1 (see nearest_vertex)
+        """
+        if self._needs_rebuild():
+            self._build()
+
+        candidates = list()
+        if self._segment_grid is not None:
+            ids = np.concatenate((self._segment_grid.query(x - radius, y - radius, x + radius, y + radius),
+                                  self._long_segments))
+            ids = ids[~self._removed[self._segment_blocks[ids]]]
+            candidates.append((self._segment_a[ids], self._segment_b[ids],
+                               self._segment_blocks[ids], self._segment_locals[ids]))
+        candidates.append(self._pending_arrays()[1])
+
+        def distances(a, b):
+            return _segment_distances(x, y, a, b)
+
+        return self._nearest(candidates, distances, radius, exclude)
+
+    def nearest_geometry(self, x, y, radius):
+        """
+        :return: the geometry with the nearest vertex or segment within the radius from the point (x, y), or None
+        (vertices win the ties, so that points lying on a line can be picked)
+        """
+        nearest = [n for n in (self.nearest_vertex(x, y, radius), self.nearest_segment(x, y, radius)) if n is not None]
+        if not nearest:
+            return None
+        return min(nearest, key=lambda n: n[2])[0]
+
+    def _nearest(self, candidates, distances, radius, exclude=None):
+        """
+        :param candidates: a list of tuples of arrays (the arrays passed to distances..., block, index in the block)
+        :param distances: the function computing the distances of the candidates from the query point
+        :param exclude: a geometry whose candidates are ignored
+        :return: (geometry, index in the geometry, distance) of the nearest candidate within the radius, or None
+        """
+        excluded_block = self._blocks.get(id(exclude)) if exclude is not None else None
+
+        best = None
+        for arrays in candidates:
+            if len(arrays[-1]) == 0:
+                continue
+            d = distances(*arrays[:-2])
+            if excluded_block is not None:
+                d = np.where(arrays[-2] == excluded_block, np.inf, d)
+            k = int(np.argmin(d))
+            if d[k] <= radius and (best is None or d[k] < best[2]):
+                best = (self._geoms[arrays[-2][k]], int(arrays[-1][k]), float(d[k]))
+        return best
@@ -0,0 +1,186 @@
+"""
+Vectorized point-in-polygon tests (on the xy plane), for polygons with holes.
+
+Both tests are based on the crossing number (even-odd rule): a point is inside the polygon if a ray going from the
+point towards +x crosses the rings of the polygon an odd number of times. An edge (a, b) is crossed if
+min(a.y, b.y) <= p.y < max(a.y, b.y) and the edge is on the right of the point at height p.y; this half-open rule
+counts each vertex once and ignores horizontal edges, so no special case is needed.
+
+    - points_in_polygon tests M points against all the E edges at once: O(M * E) operations, run by NumPy in chunks
+      of points so that the memory stays bounded. It is the one to use for a single (or few) queries.
+    - PreparedPolygon builds an index of the edges once, then answers each query in O(log^2 E) time. The plane is cut
+      into horizontal slabs at the y of the vertices, and a segment tree is built over the slabs: each edge is stored
+      in the O(log E) nodes whose y-range it spans entirely, so the edges of a node do not cross each other inside
+      its y-range and can be sorted from left to right once and for all. A query goes up from the slab of the point
+      to the root, counting with a binary search the edges of each node on the right of the point. The index takes
+      O(E log E) memory, whatever the shape of the polygon.
+"""
+
+import numpy as np
+
+_CHUNK_SIZE = 1 << 22  # the max number of (point, edge) pairs tested at once by points_in_polygon
+
+
+def _as_xy(points):
+    """:return: a (M, 2) float64 array with the x and y coordinates of the given points (Point3 or array-like)"""
+    points = np.asarray(points, dtype=np.float64)
+    if points.size == 0:
+        return np.empty((0, 2))
+    return points.reshape(len(points), -1)[:, :2]
+
+
+def ring_edges(rings):
+    """
+    :param rings: a list of (n_i, 2) or (n_i, 3) arrays with the coordinates of the vertices of the rings (the first
+    vertex not repeated at the end)
+    :return: x0, y0, x1, y1: four arrays with the coordinates of the extremes of all the edges of the rings
+    """
+    starts = [np.asarray(r, dtype=np.float64).reshape(len(r), -1)[:, :2] for r in rings if len(r) > 2]
+    if not starts:
+        return (np.empty(0),) * 4
+    ends = [np.roll(s, -1, axis=0) for s in starts]
+    starts, ends = np.concatenate(starts), np.concatenate(ends)
+    return starts[:, 0], starts[:, 1], ends[:, 0], ends[:, 1]
+
+
+def points_in_polygon(points, rings):
+    """
+    :param points: a sequence of M points (Point3 objects, or an (M, 2) or (M, 3) array)
+    :param rings: the rings of the polygon (see ring_edges), the first one being the boundary, the others the holes
+    :return: a boolean array telling, for each point, whether it is inside the polygon
+    """
+    xy = _as_xy(points)
+    x0, y0, x1, y1 = ring_edges(rings)
+
+    inside = np.zeros(len(xy), dtype=bool)
+    if len(x0) == 0:
+        return inside
+
+    # only edges that are not horizontal can be crossed
+    keep = y0 != y1
+    x0, y0, x1, y1 = x0[keep], y0[keep], x1[keep], y1[keep]
+    slope = (x1 - x0) / (y1 - y0)
+
+    chunk = max(1, _CHUNK_SIZE // max(1, len(x0)))
+    for start in range(0, len(xy), chunk):
+        px = xy[start:start + chunk, 0:1]
+        py = xy[start:start + chunk, 1:2]
+
+        spans = (y0 <= py) != (y1 <= py)
+        crossed = spans & (x0 + (py - y0) * slope > px)
+        inside[start:start + chunk] = np.count_nonzero(crossed, axis=1) % 2 == 1
+
+    return inside
+
+
+class PreparedPolygon(object):
+    """a polygon indexed for fast repeated containment queries (see the module docstring)"""
+
+    def __init__(self, rings):
+        """
+        :param rings: the rings of the polygon (see ring_edges), the first one being the boundary, the others the holes
+        """
+        x0, y0, x1, y1 = ring_edges(rings)
+
+        # orient the (non-horizontal) edges upwards
+        keep = y0 != y1
+        x0, y0, x1, y1 = x0[keep], y0[keep], x1[keep], y1[keep]
+        flip = y0 > y1
+        x0, x1 = np.where(flip, x1, x0), np.where(flip, x0, x1)
+        y0, y1 = np.where(flip, y1, y0), np.where(flip, y0, y1)
+
+        # the slab k is [slab_ys[k], slab_ys[k + 1])
+        self.slab_ys = np.unique(np.concatenate((y0, y1)))
+        slab_num = max(0, len(self.slab_ys) - 1)
+
+        # the leaves of the segment tree are the nodes size, ..., size + slab_num - 1 (the node k has children 2k
+        # and 2k + 1)
+        self.size = 1
+        while self.size < slab_num:
+            self.size *= 2
+
+        # each edge spans the slabs [first, last): split this range into the nodes that cover it (bottom-up, as in an
+        # iterative segment tree, for all the edges at once)
+        node_ids, edge_ids, node_levels = list(), list(), list()
+        edge = np.arange(len(x0))
+        lo = np.searchsorted(self.slab_ys, y0) + self.size
+        hi = np.searchsorted(self.slab_ys, y1) + self.size
+        level = 0
+        while len(edge):
+            take = (lo & 1) == 1
+            node_ids.append(lo[take])
+            edge_ids.append(edge[take])
+            node_levels.append(np.full(np.count_nonzero(take), level))
+            lo = lo + take
+
+            take = (hi & 1) == 1
+            node_ids.append(hi[take] - 1)
+            edge_ids.append(edge[take])
+            node_levels.append(np.full(np.count_nonzero(take), level))
+            hi = hi - take
+
+            keep = lo < hi
+            edge, lo, hi = edge[keep], lo[keep] >> 1, hi[keep] >> 1
+            level += 1
+
+        node = np.concatenate(node_ids) if node_ids else np.empty(0, dtype=np.int64)
+        edge = np.concatenate(edge_ids) if edge_ids else np.empty(0, dtype=np.int64)
+        level = np.concatenate(node_levels) if node_levels else np.empty(0, dtype=np.int64)
+
+        # sort the edges of each node from left to right (by their x at the middle of the y-range of the node)
+        slope = (x1 - x0) / (y1 - y0)
+        first_slab = (node << level) - self.size
+        last_slab = ((node + 1) << level) - self.size
+        y_mid = 0.5 * (self.slab_ys[first_slab] + self.slab_ys[last_slab])
+        x_mid = x0[edge] + (y_mid - y0[edge]) * slope[edge]
+        order = np.lexsort((x_mid, node))
+        edge, node = edge[order], node[order]
+
+        # the edges stored in the node k are edge[node_start[k]:node_start[k + 1]]
+        self.node_start = np.searchsorted(node, np.arange(2 * self.size + 1))
+
+        self.edge_x0, self.edge_y0, self.edge_slope = x0[edge], y0[edge], slope[edge]
+
+    def _count_on_right(self, node, px, py):
+        """
+        :return: for each point, the number of the edges stored in the given node that are on the right of the point
+        (found with a binary search, for all the points at once)
+        """
+        lo, hi = self.node_start[node], self.node_start[node + 1]
+        end = hi.copy()
+        while True:
+            active = lo < hi
+            if not active.any():
+                break
+            mid = np.where(active, (lo + hi) // 2, 0)
+            x_at = self.edge_x0[mid] + (py - self.edge_y0[mid]) * self.edge_slope[mid]
+            on_left = active & (x_at <= px)
+            lo = np.where(on_left, mid + 1, lo)
+            hi = np.where(active & ~on_left, mid, hi)
+        return end - lo
+
+    def contains_points(self, points):
+        """
+        :param points: a sequence of M points (Point3 objects, or an (M, 2) or (M, 3) array)
+        :return: a boolean array telling, for each point, whether it is inside the polygon
+        """
+        xy = _as_xy(points)
+        px, py = xy[:, 0], xy[:, 1]
+
+        if len(self.slab_ys) < 2 or len(xy) == 0:
+            return np.zeros(len(xy), dtype=bool)
+
+        slab = np.searchsorted(self.slab_ys, py, side='right') - 1
+        in_range = (slab >= 0) & (slab < len(self.slab_ys) - 1)
+
+        # the edges crossed by the ray are those on the right of the point, in the nodes from its slab to the root
+        crossings = np.zeros(len(xy), dtype=np.int64)
+        node = np.clip(slab, 0, len(self.slab_ys) - 2) + self.size
+        while node[0] >= 1:
+            crossings += self._count_on_right(node, px, py)
+            node = node >> 1
+
+        return in_range & (crossings % 2 == 1)
+
+    def contains_point(self, a_point):
+        return bool(self.contains_points([a_point])[0])
@@ -10,13 +10,31 @@ from abc import (
     abstractmethod
 )
 
-from OpenGL import GL
-
+from app.geoms.utils.shader_program import GL
 from app.geoms.utils.transformable import Transformable
+from app.geoms.utils.gpu_buffer import GPUBuffer
 from app.config.params import *
 
 from PyQt4.QtGui import QVector3D
 
+import numpy as np
+
+# the dtype of the renderable_vertex_array of a Renderable3d
+RENDERABLE_VERTEX_DTYPE = np.dtype([
+    ('coords', [
+        ('x', np.float32),
+        ('y', np.float32),
+        ('z', np.float32)
+    ]),
+    ('color', [
+        ('r', np.float32),
+        ('g', np.float32),
+        ('b', np.float32),
+        ('a', np.float32)
+    ])
+    # if needed, normals can be added here
+])
+
 
 # Python 2 syntax for abstract class
 # class Renderable3d:
@@ -30,14 +48,14 @@ class Renderable3d(Transformable, metaclass=ABCMeta):
         initialize a Renderable3d
         :param elements_type: the GL-type of elements (meshes) that will be rendered for this shape
         :param color: the color of this renderable (must be a Color Object)
+        :param dcel_class: the class of the DCEL used to represent this renderable (either DCEL or ArrayDCEL)
         """
 
         # print("Renderable3d.__init__")
 
         self.elements_type = kwargs.pop('elements_type', GL.GL_POINTS)
-        self.color = kwargs.pop('color', Color())
-        if not self.color:
-            self.color = Color()
+        self._color = kwargs.pop('color', None) or None  # if not given, a random color is picked when first needed
+        self._dcel_class = kwargs.pop('dcel_class', None)  # None stands for DCEL (imported only when needed)
 
         Transformable.__init__(self, *args, **kwargs)
 
@@ -67,12 +85,13 @@ class Renderable3d(Transformable, metaclass=ABCMeta):
 
         self.renderable_outline_element_array = None
 
-        self.VBO_id = None  # the Vertex Buffer Object (VBO) in the GPU for this object
-        self.IBO_id = None  # the Index Buffer Object (IBO) in the GPU for this object (it instructs the GPU on
-        # how to make faces from the VBO)
-        self.OBO_id = None  # the Outline Index Buffer: contains pairs of indices denoting the lines forming
-        # the edges of the renderable. NOTE that this is different than the edges of the elements (because we
-        # always split a face into triangles, but the outline must only contain "proper" edges)
+        # the buffers on the GPU mirroring the renderable arrays. They are kept alive across the updates of the arrays,
+        # and only the rows that changed are uploaded (see GPUBuffer)
+        # They are created when first needed (see the properties VBO, IBO, and OBO): many geometries, e.g., the points
+        # made by the geometric predicates, are never rendered on their own
+        self._vbo = None
+        self._ibo = None
+        self._obo = None
 
         # when there is a change in the renderable (e.g., a vertex is added) this variable is set to True, which means
         # that the GPU buffers are out-of-date and have to be updated before the next rendering of the object
@@ -84,16 +103,102 @@ class Renderable3d(Transformable, metaclass=ABCMeta):
         self.show_outline = True
         self.visible = True
 
-        from app.geoms.dcel.dcel import DCEL
-        self.dcel = DCEL()  # the DCEL is used as a middleware between the geometries and the renderables:
+        # the DCEL is used as a middleware between the geometries and the renderables:
         # every geometric object will be represented with a dcel. The DCEL can be traversed to construct
-        # renderable_vertex_array and renderable_element_array of the renderable
+        # renderable_vertex_array and renderable_element_array of the renderable.
+        # It is only created when first needed (see the property dcel)
+        self._dcel = None
+
+        # mutations of a geometry only mark its DCEL and renderable arrays as stale
+        # (see invalidate_renderable_arrays): they are rebuilt once, when the renderable is next rendered
+        self._renderable_arrays_stale = False
+
+        # incremented at every update of the renderable arrays
+        self.renderable_arrays_version = 0
+
+        # the BatchRenderers drawing this renderable, which are told when it changes (see BatchRenderer.mark_dirty):
+        # a renderer only visits the renderables that changed, and the renderables that are not drawn by any renderer
+        # (e.g., the points made by the geometric predicates) cost nothing
+        self.renderers = list()
+
+    @property
+    def dcel(self):
+        if self._dcel is None:
+            if self._dcel_class is None:
+                from app.geoms.dcel.dcel import DCEL
+                self._dcel_class = DCEL
+            self._dcel = self._dcel_class()
+        return self._dcel
+
+    @property
+    def color(self):
+        if self._color is None:
+            self._color = Color()  # default to a random color
+        return self._color
+
+    @color.setter
+    def color(self, value):
+        self._color = value
+
+    @property
+    def VBO(self):
+        """the Vertex Buffer Object (VBO) in the GPU for this object"""
+        if self._vbo is None:
+            self._vbo = GPUBuffer(GL.GL_ARRAY_BUFFER)
+        return self._vbo
+
+    @property
+    def IBO(self):
+        """the Index Buffer Object (IBO) in the GPU for this object (it instructs the GPU on how to make faces from the
+        VBO)"""
+        if self._ibo is None:
+            self._ibo = GPUBuffer(GL.GL_ELEMENT_ARRAY_BUFFER)
+        return self._ibo
+
+    @property
+    def OBO(self):
+        """
+        the Outline Index Buffer: contains pairs of indices denoting the lines forming the edges of the renderable.
+        NOTE that this is different than the edges of the elements (because we always split a face into triangles, but
+        the outline must only contain "proper" edges)
+        """
+        if self._obo is None:
+            self._obo = GPUBuffer(GL.GL_ELEMENT_ARRAY_BUFFER)
+        return self._obo
+
+    def modified(self):
+        """tell the renderers drawing this renderable that it changed"""
+        for renderer in self.renderers:
+            renderer.mark_dirty(self)
+
+    def transformation_changed(self):
+        # a renderable can only be batched if its model matrix is the identity (see BatchRenderer.is_batchable)
+        self.modified()
 
     def show(self):
         self.visible = True
+        self.modified()
 
     def hide(self):
         self.visible = False
+        self.modified()
+
+    def get_renderables(self):
+        """
+        :return: the renderables drawn by render(), i.e., this renderable and the ones it renders together with itself
+        (e.g., the boundary of a polygon)
+        """
+        return [self]
+
+    def invalidate_renderable_arrays(self):
+        """mark the DCEL and the renderable arrays as out-of-date: they will be rebuilt once, when next needed"""
+        self._renderable_arrays_stale = True
+        self.modified()
+
+    def refresh_renderable_arrays(self):
+        """rebuild the DCEL and the renderable arrays, but only if they are out-of-date"""
+        if self._renderable_arrays_stale:
+            self.update_renderable_arrays()
 
     @abstractmethod
     def update_dcel(self):
@@ -111,83 +216,145 @@ class Renderable3d(Transformable, metaclass=ABCMeta):
 
         vertices, elements, outline_elements = self.dcel.get_renderable_arrays()
 
-        vertex_num = len(vertices)
-        self.renderable_vertex_array = \
-            np.zeros(vertex_num,
-                     [
-                         ('coords', [
-                             ('x', np.float32),
-                             ('y', np.float32),
-                             ('z', np.float32)
-                         ]),
-                         ('color', [
-                             ('r', np.float32),
-                             ('g', np.float32),
-                             ('b', np.float32),
-                             ('a', np.float32)
-                         ])
-                         # if needed, normals can be added here
-                     ]
-                     )
-
-        for i, v in enumerate(vertices):
-            self.renderable_vertex_array["coords"][i] = (v.point.x(), v.point.y(), v.point.z())
-            self.renderable_vertex_array["color"][i] = tuple(self.color.get_rgba())
-
-        self.renderable_element_array = np.array(elements, dtype=np.uint32)
-        self.renderable_outline_element_array = np.array(outline_elements, dtype=np.uint32)
-
         # print("set update_buffers = True")
+        self.set_renderable_arrays(Renderable3d.make_renderable_vertex_array(vertices, self.color),
+                                   np.array(elements, dtype=np.uint32),
+                                   np.array(outline_elements, dtype=np.uint32))
+
+    def set_renderable_arrays(self, vertex_array, element_array, outline_element_array):
+        """
+        replace the renderable arrays with the given ones. The new arrays are compared with the old ones so that only
+        the rows that changed will be uploaded to the GPU (e.g., if the last vertex of a line is moved, only that vertex)
+        """
+        for buffer, old_array, new_array in ((self.VBO, self.renderable_vertex_array, vertex_array),
+                                             (self.IBO, self.renderable_element_array, element_array),
+                                             (self.OBO, self.renderable_outline_element_array, outline_element_array)):
+            changed_range = Renderable3d.changed_range(old_array, new_array)
+            if changed_range is None:
+                buffer.mark_dirty()
+            elif changed_range[1] > changed_range[0]:
+                buffer.mark_dirty(*changed_range)
+
+        self.renderable_vertex_array = vertex_array
+        self.renderable_element_array = element_array
+        self.renderable_outline_element_array = outline_element_array
+        self._renderable_arrays_stale = False
+
         self.update_GPU_buffers = True
+        self._bump_renderable_arrays_version()
 
-    def update_vbo(self, usage=GL.GL_STATIC_DRAW):
+    def renderable_arrays_updated(self):
+        """must be called every time the renderable arrays are changed in place (all their rows are uploaded again)"""
+        self.VBO.mark_dirty()
+        self.IBO.mark_dirty()
+        self.OBO.mark_dirty()
 
-        # if there is an old vbo (that must be updated) delete it
-        if self.VBO_id is not None:
-            GL.glDeleteBuffers(1, [self.VBO_id])
+        self.update_GPU_buffers = True
+        self._bump_renderable_arrays_version()
 
-        # create a new vbo and save its id
-        self.VBO_id = GL.glGenBuffers(1)  # create an empty VBO on GPU side and returns a reference to it (say, its id)
-        # GL.glGenBuffers(number_of_buffers_to_generate)
+    def renderable_rows_updated(self, vertex_rows=None, element_rows=None, outline_rows=None):
+        """
+        must be called when only some rows of the renderable arrays changed (in place, or appended at their end),
+        so that only those rows are uploaded to the GPU
+        :param vertex_rows: the range [start, stop) of the changed rows of renderable_vertex_array (None if none)
+        :param element_rows: the range [start, stop) of the changed rows of renderable_element_array (None if none)
+        :param outline_rows: the range [start, stop) of the changed rows of renderable_outline_element_array
+        (None if none)
+        """
+        for buffer, rows in ((self.VBO, vertex_rows), (self.IBO, element_rows), (self.OBO, outline_rows)):
+            if rows is not None and rows[1] > rows[0]:
+                buffer.mark_dirty(*rows)
 
-        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.VBO_id)  # bind the just-created buffer on GPU to the VBO_id
-        # GL.glBindBuffer(buffer_type, buffer_id)
+        self.update_GPU_buffers = True
+        self._bump_renderable_arrays_version()
 
-        GL.glBufferData(GL.GL_ARRAY_BUFFER, self.renderable_vertex_array.nbytes, self.renderable_vertex_array, usage)
-        # GL.glBufferData(buffer_type, buffer_size, buffer_data, buffer_usage)
+    def _bump_renderable_arrays_version(self):
+        self.renderable_arrays_version += 1
+        self.modified()
+
+    @staticmethod
+    def changed_range(old_array, new_array):
+        """
+        :return: the range [start, stop) of the rows of new_array that differ from (or are not in) old_array
+        (start == stop if there is none), or None if the two arrays cannot be compared row by row
+        """
+        if old_array is None or new_array is None or old_array.dtype != new_array.dtype:
+            return None
+
+        common_len = min(len(old_array), len(new_array))
+        changed = np.flatnonzero(old_array[:common_len] != new_array[:common_len])
+
+        start = changed[0] if len(changed) > 0 else common_len
+        stop = changed[-1] + 1 if len(changed) > 0 else common_len
+        if len(new_array) > common_len:
+            stop = len(new_array)  # the rows appended at the end of the array
+
+        return int(start), int(stop)
+
+    def delete_GPU_buffers(self):
+        """
+        free the GPU buffers of this renderable (e.g., when it is removed from the canvas): they are created and filled
+        again if the renderable is rendered later
+        """
+        for buffer in (self._vbo, self._ibo, self._obo):
+            if buffer is not None:
+                buffer.delete()
+
+        self.update_GPU_buffers = True
+
+    def set_buffer_usage(self, usage):
+        """
+        :param usage: the expected usage pattern of the GPU buffers of this renderable, e.g., GL_DYNAMIC_DRAW for
+        a geometry that is being edited, GL_STATIC_DRAW otherwise
+        """
+        self.VBO.set_usage(usage)
+        self.IBO.set_usage(usage)
+        self.OBO.set_usage(usage)
+
+    @staticmethod
+    def make_renderable_vertex_array(coords, color):
+        """
+        build a renderable_vertex_array (see its layout in __init__) in one vectorized step
+        :param coords: a (V, 3) array-like with the coordinates of the vertices
+        :param color: the Color given to all vertices
+        :return: the structured array with the coordinates and the color of each vertex
+        """
+        coords = np.asarray(coords, dtype=np.float32).reshape(-1, 3)
+
+        # each row of the renderable_vertex_array is made of 7 float32 (x, y, z, r, g, b, a), so the array can be
+        # filled as a plain (V, 7) matrix and then reinterpreted with the structured dtype
+        rows = np.empty((len(coords), 7), dtype=np.float32)
+        rows[:, :3] = coords
+        rows[:, 3:] = color.get_rgba()  # broadcast the same color to all vertices
+
+        return rows.view(RENDERABLE_VERTEX_DTYPE).reshape(len(coords))
+
+    def update_vbo(self):
+        # upload the vertices that changed since the last update (the buffer is created/grown if needed)
+        self.VBO.upload(self.renderable_vertex_array)
 
         # the buffer has been updated
         self.update_GPU_buffers = False
 
-    def update_ibo(self, usage=GL.GL_STATIC_DRAW):
+    def update_ibo(self):
         if self.renderable_element_array is not None:
             # for comments see update_vbo (it performs the same steps)
-            if self.IBO_id is not None:
-                GL.glDeleteBuffers(1, [self.IBO_id])
-
-            self.IBO_id = GL.glGenBuffers(1)
-            GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, self.IBO_id)
-            GL.glBufferData(GL.GL_ELEMENT_ARRAY_BUFFER, self.renderable_element_array.nbytes,
-                            self.renderable_element_array, usage)
+            self.IBO.upload(self.renderable_element_array)
 
             self.update_GPU_buffers = False
 
-    def update_obo(self, usage=GL.GL_STATIC_DRAW):
+    def update_obo(self):
         if self.renderable_outline_element_array is not None:
             # for comments see update_vbo (it performs the same steps)
-            if self.OBO_id is not None:
-                GL.glDeleteBuffers(1, [self.OBO_id])
-
-            self.OBO_id = GL.glGenBuffers(1)
-            GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, self.OBO_id)
-            GL.glBufferData(GL.GL_ELEMENT_ARRAY_BUFFER, self.renderable_outline_element_array.nbytes,
-                            self.renderable_outline_element_array, usage)
+            self.OBO.upload(self.renderable_outline_element_array)
 
             self.update_GPU_buffers = False
 
-    def render(self, shader_program):
+    def render(self, shader_program, tint=None):
         """
         asks the GPU to draw the figure, which must be already loaded in a VBO and IBO
+        :param shader_program: the ShaderProgram in use
+        :param tint: an (r, g, b, a) tuple multiplying the colors of the vertices (e.g., to highlight the figure)
         Returns
         -------
 
@@ -196,34 +363,33 @@ class Renderable3d(Transformable, metaclass=ABCMeta):
             # print("Rendering: "+str(self))
             # print(str(self.dcel))
 
+            self.refresh_renderable_arrays()
+
             if self.update_GPU_buffers:
                 # print("Updating GPU buffers")
                 self.update_vbo()
                 self.update_ibo()
                 self.update_obo()
 
-            GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.VBO_id)  # GPU: consider this vertex buffer object
+            GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.VBO.buffer_id)  # GPU: consider this vertex buffer object
 
             stride = self.renderable_vertex_array.strides[0]
 
+            # the locations of the attribute/uniform variables in the shader are cached by the ShaderProgram
             offset = ctypes.c_void_p(0)
-            loc = GL.glGetAttribLocation(shader_program, "a_coords")  # the name of the attribute variable in the shader
-            GL.glEnableVertexAttribArray(loc)
-            GL.glVertexAttribPointer(loc, 3, GL.GL_FLOAT, False, stride, offset)
+            GL.glEnableVertexAttribArray(shader_program.a_coords)
+            GL.glVertexAttribPointer(shader_program.a_coords, 3, GL.GL_FLOAT, False, stride, offset)
 
             offset = ctypes.c_void_p(self.renderable_vertex_array.dtype["coords"].itemsize)
-            loc = GL.glGetAttribLocation(shader_program, "a_color")
-            GL.glEnableVertexAttribArray(loc)
-            GL.glVertexAttribPointer(loc, 4, GL.GL_FLOAT, False, stride, offset)
+            GL.glEnableVertexAttribArray(shader_program.a_color)
+            GL.glVertexAttribPointer(shader_program.a_color, 4, GL.GL_FLOAT, False, stride, offset)
 
-            loc = GL.glGetUniformLocation(shader_program, "u_color")
-            GL.glUniform4f(loc, 1, 1, 1, 1)
+            GL.glUniform4f(shader_program.u_color, *(tint if tint is not None else (1, 1, 1, 1)))
 
-            loc = GL.glGetUniformLocation(shader_program, "u_model")
-            GL.glUniformMatrix4fv(loc, 1, GL.GL_FALSE, self._model2world_matrix.data())
+            GL.glUniformMatrix4fv(shader_program.u_model, 1, GL.GL_FALSE, self._model2world_matrix.data())
 
             if self.renderable_element_array is not None:
-                GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, self.IBO_id)  # GPU: consider this index buffer object
+                GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, self.IBO.buffer_id)  # GPU: consider this index buffer object
 
                 GL.glDisable(GL.GL_BLEND)
                 GL.glEnable(GL.GL_DEPTH_TEST)
@@ -239,10 +405,9 @@ class Renderable3d(Transformable, metaclass=ABCMeta):
                 # GL.glEnable(GL.GL_BLEND)
 
             if self.show_outline and self.renderable_outline_element_array is not None:
-                GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, self.OBO_id)  # GPU: consider this index buffer object
+                GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, self.OBO.buffer_id)  # GPU: consider this index buffer object
 
-                loc = GL.glGetUniformLocation(shader_program, "u_color")
-                GL.glUniform4f(loc, 0, 0, 0, 1)
+                GL.glUniform4f(shader_program.u_color, 0, 0, 0, 1)
 
                 GL.glDisable(GL.GL_POLYGON_OFFSET_FILL)
                 GL.glEnable(GL.GL_BLEND)
@@ -263,6 +428,9 @@ class Renderable3d(Transformable, metaclass=ABCMeta):
             vec = self._model2world_matrix * vec
             vertex[0], vertex[1], vertex[2] = vec.x(), vec.y(), vec.z()
 
+        # the vertices changed in place
+        self.renderable_arrays_updated()
+
     def set_color(self, color=None):
         if color is not None and isinstance(color, Color):
             self.color = color
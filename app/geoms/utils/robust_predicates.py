@@ -0,0 +1,196 @@
+"""
+Exact orientation predicates, with a floating-point filter (after J. R. Shewchuk, "Adaptive Precision Floating-Point
+Arithmetic and Fast Robust Geometric Predicates", 1997).
+
+The orientation of a few points is the sign of a determinant of differences of their coordinates. The determinant is
+first evaluated in floating point, together with a bound on the rounding error of the evaluation (a small multiple of
+the machine epsilon times the same expression with the absolute values of the products, the permanent). When the
+value exceeds the bound, its sign is certainly right, which is the case for all but near-degenerate inputs. Otherwise,
+the determinant is evaluated again exactly: floats are dyadic rationals, so, scaled by a common power of 2, they are
+(Python) integers, and the sign found is exact, so exactly degenerate inputs (e.g., collinear points) are recognized
+as such.
+So, unlike the tests against EPSILON, the predicates never misclassify an input, and they cost (nearly) as much as a
+floating-point evaluation. The number of answers given by each path is recorded in predicate_counters.
+
+The inputs must be floats (float32 coordinates are converted to float64 without rounding), without overflow or
+underflow in the products.
+"""
+
+import numpy as np
+
+_EPSILON = 2.0 ** -53  # half of the distance between 1 and the next float64
+_ORIENT2D_BOUND = (3.0 + 16.0 * _EPSILON) * _EPSILON
+_ORIENT3D_BOUND = (7.0 + 56.0 * _EPSILON) * _EPSILON
+
+
+class PredicateCounters(object):
+    """the number of calls of each predicate answered by the floating-point filter, and by the exact (integer) arithmetic"""
+
+    def __init__(self):
+        self.filtered = dict()
+        self.exact = dict()
+        self.reset()
+
+    def reset(self):
+        self.filtered = dict(orient2d=0, orient3d=0)
+        self.exact = dict(orient2d=0, orient3d=0)
+
+    def total(self):
+        """:return: the number of calls answered by the filter, and the number of calls answered exactly"""
+        return sum(self.filtered.values()), sum(self.exact.values())
+
+    def __str__(self):
+        return ", ".join(name + ": " + str(self.filtered[name]) + " filtered, " + str(self.exact[name]) + " exact"
+                         for name in sorted(self.filtered))
+
+
+predicate_counters = PredicateCounters()
+
+
+def _sign(value):
+    return 1 if value > 0 else (-1 if value < 0 else 0)
+
+
+def _as_integers(*values):
+    """
+    :return: the given floats times the same power of 2, large enough to make all of them integers (floats are
+    dyadic rationals, so they are represented exactly): the signs of the determinants are not changed
+    """
+    ratios = [float(v).as_integer_ratio() for v in values]
+    denominator = max(d for _, d in ratios)
+    return [n * (denominator // d) for n, d in ratios]
+
+
+def _exact_orient2d(ax, ay, bx, by, cx, cy):
+    ax, ay, bx, by, cx, cy = _as_integers(ax, ay, bx, by, cx, cy)
+    return _sign((bx - ax) * (cy - ay) - (by - ay) * (cx - ax))
+
+
+def _exact_orient3d(a, b, c, d):
+    ax, ay, az, bx, by, bz, cx, cy, cz, dx, dy, dz = _as_integers(*a, *b, *c, *d)
+    adx, ady, adz = ax - dx, ay - dy, az - dz
+    bdx, bdy, bdz = bx - dx, by - dy, bz - dz
+    cdx, cdy, cdz = cx - dx, cy - dy, cz - dz
+    return _sign(adx * (bdy * cdz - bdz * cdy) + bdx * (cdy * adz - cdz * ady) + cdx * (ady * bdz - adz * bdy))
+
+
+def orient2d(ax, ay, bx, by, cx, cy):
+    """
+    :param ax, ay, bx, by, cx, cy: the coordinates (floats) of three points a, b, and c on a plane
+    :return: 1 if c lies on the left of the line a->b (a, b, c are CCW), -1 if on the right (CW), 0 if on the line
+    """
+    left = (bx - ax) * (cy - ay)
+    right = (by - ay) * (cx - ax)
+    det = left - right
+    if abs(det) > _ORIENT2D_BOUND * (abs(left) + abs(right)):
+        predicate_counters.filtered['orient2d'] += 1
+        return _sign(det)
+
+    predicate_counters.exact['orient2d'] += 1
+    return _exact_orient2d(ax, ay, bx, by, cx, cy)
+
+
+def orient3d(a, b, c, d):
+    """
+    :param a, b, c, d: four points (sequences of 3 floats, e.g., the lists of the coordinates of Vector3 objects)
+    :return: the sign of the volume of the tetrahedron a, b, c, d, as computed by Tetrahedron.signed_volume (-1 when
+    a, b, c are CCW as seen from d), 0 if the four points are coplanar
+    """
+    (ax, ay, az), (bx, by, bz), (cx, cy, cz), (dx, dy, dz) = a, b, c, d
+    adx, ady, adz = ax - dx, ay - dy, az - dz
+    bdx, bdy, bdz = bx - dx, by - dy, bz - dz
+    cdx, cdy, cdz = cx - dx, cy - dy, cz - dz
+
+    bdxcdy, cdxbdy = bdx * cdy, cdx * bdy
+    cdxady, adxcdy = cdx * ady, adx * cdy
+    adxbdy, bdxady = adx * bdy, bdx * ady
+    det = adz * (bdxcdy - cdxbdy) + bdz * (cdxady - adxcdy) + cdz * (adxbdy - bdxady)
+    permanent = (abs(bdxcdy) + abs(cdxbdy)) * abs(adz) + \
+                (abs(cdxady) + abs(adxcdy)) * abs(bdz) + \
+                (abs(adxbdy) + abs(bdxady)) * abs(cdz)
+    if abs(det) > _ORIENT3D_BOUND * permanent:
+        predicate_counters.filtered['orient3d'] += 1
+        return _sign(det)
+
+    predicate_counters.exact['orient3d'] += 1
+    return _exact_orient3d(a, b, c, d)
+
+
+def orient2d_batch(a, b, c):
+    """
+    same as orient2d, for many triplets of points at once
+    :param a: an (N, 2) array-like with the first point of each triplet (or a single point, shared by all)
+    :param b: as a, for the second points
+    :param c: as a, for the third points
+    :return: an (N,) array with the orientation (1, -1, or 0) of each triplet
+    """
+    a, b, c = np.broadcast_arrays(*(np.asarray(p, dtype=np.float64) for p in (a, b, c)))
+    left = (b[..., 0] - a[..., 0]) * (c[..., 1] - a[..., 1])
+    right = (b[..., 1] - a[..., 1]) * (c[..., 0] - a[..., 0])
+    det = left - right
+
+    signs = np.sign(det).astype(np.int64)
+    uncertain = np.abs(det) <= _ORIENT2D_BOUND * (np.abs(left) + np.abs(right))
+    uncertain_num = int(np.count_nonzero(uncertain))
+    predicate_counters.filtered['orient2d'] += det.size - uncertain_num
+    predicate_counters.exact['orient2d'] += uncertain_num
+    if uncertain_num:
+        signs[uncertain] = [_exact_orient2d(*p) for p in
+                            np.concatenate((a[uncertain], b[uncertain], c[uncertain]), axis=-1).tolist()]
+    return signs
+
+
+def orient3d_batch(a, b, c, d):
+    """
+    same as orient3d, for many quadruples of points at once
+    :param a: an (N, 3) array-like with the first point of each quadruple (or a single point, shared by all)
+    :param b: as a, for the second points
+    :param c: as a, for the third points
+    :param d: as a, for the fourth points
+    :return: an (N,) array with the orientation (1, -1, or 0) of each quadruple
+    """
+    a, b, c, d = np.broadcast_arrays(*(np.asarray(p, dtype=np.float64) for p in (a, b, c, d)))
+    ad, bd, cd = a - d, b - d, c - d
+
+    bdxcdy, cdxbdy = bd[..., 0] * cd[..., 1], cd[..., 0] * bd[..., 1]
+    cdxady, adxcdy = cd[..., 0] * ad[..., 1], ad[..., 0] * cd[..., 1]
+    adxbdy, bdxady = ad[..., 0] * bd[..., 1], bd[..., 0] * ad[..., 1]
+    det = ad[..., 2] * (bdxcdy - cdxbdy) + bd[..., 2] * (cdxady - adxcdy) + cd[..., 2] * (adxbdy - bdxady)
+    permanent = (np.abs(bdxcdy) + np.abs(cdxbdy)) * np.abs(ad[..., 2]) + \
+                (np.abs(cdxady) + np.abs(adxcdy)) * np.abs(bd[..., 2]) + \
+                (np.abs(adxbdy) + np.abs(bdxady)) * np.abs(cd[..., 2])
+
+    signs = np.sign(det).astype(np.int64)
+    uncertain = np.abs(det) <= _ORIENT3D_BOUND * permanent
+    uncertain_num = int(np.count_nonzero(uncertain))
+    predicate_counters.filtered['orient3d'] += det.size - uncertain_num
+    predicate_counters.exact['orient3d'] += uncertain_num
+    if uncertain_num:
+        signs[uncertain] = [_exact_orient3d(*q) for q in
+                            zip(a[uncertain].tolist(), b[uncertain].tolist(), c[uncertain].tolist(),
+                                d[uncertain].tolist())]
+    return signs
+
+
+def collinear3d(a, b, c):
+    """
+    :param a, b, c: three points (sequences of 3 floats)
+    :return: True if the three points lie (exactly) on the same line, i.e., if their projections on the xy, yz, and zx
+    planes are all collinear
+    """
+    (ax, ay, az), (bx, by, bz), (cx, cy, cz) = a, b, c
+    return orient2d(ax, ay, bx, by, cx, cy) == 0 and \
+        orient2d(ay, az, by, bz, cy, cz) == 0 and \
+        orient2d(az, ax, bz, bx, cz, cx) == 0
+
+
+def collinear3d_batch(a, b, c):
+    """
+    same as collinear3d, for many triplets of points at once (see orient3d_batch for the parameters)
+    :return: an (N,) boolean array
+    """
+    a, b, c = np.broadcast_arrays(*(np.asarray(p, dtype=np.float64) for p in (a, b, c)))
+    collinear = np.ones(a.shape[:-1], dtype=bool)
+    for i, j in ((0, 1), (1, 2), (2, 0)):
+        collinear &= orient2d_batch(a[..., (i, j)], b[..., (i, j)], c[..., (i, j)]) == 0
+    return collinear
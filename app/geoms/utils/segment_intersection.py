@@ -0,0 +1,187 @@
+"""
+Vectorized intersection tests between two sets of segments (in 3-space), with the semantics of Line.intersects and
+Line.intersection.
+
+The segments are given as (N, 2, 3) arrays (the two extremes of each segment; (N, 2, 2) arrays are taken as lying on
+the z=0 plane), and all the N x M pairs are tested with NumPy expressions, in chunks of rows so that the memory stays
+bounded. Two segments a=[p, p+r] and b=[q, q+s] intersect if:
+    - they are coplanar: |det(r, q-p, q+s-p)| <= EPSILON (the test of Point3.are_coplanar), and either
+    - they cross properly: each segment has its extremes on opposite sides of the other one, the sides being given
+      by the sign of ((b-a) x (c-a)) . (r x s), i.e., as seen from the observation point used by Line.intersects, or
+    - they touch: an extreme of one segment is collinear with the other one (|(b-a) x (c-a)| <= EPSILON, the test of
+      Point3.are_collinear) and lies between its extremes (included). This also covers collinear (overlapping)
+      segments, and degenerate segments (a single point), which intersect what they lie on.
+"""
+
+import numpy as np
+
+from app.geoms.utils.constants import EPSILON
+
+_CHUNK_SIZE = 1 << 20  # the max number of pairs of segments tested at once
+
+
+def as_segments(segments):
+    """
+    :param segments: an (N, 2, 3) or (N, 2, 2) array-like with the extremes of N segments
+    :return: an (N, 2, 3) float64 array
+    """
+    segments = np.asarray(segments, dtype=np.float64)
+    if segments.size == 0:
+        return np.empty((0, 2, 3))
+    segments = segments.reshape(len(segments), 2, -1)
+    if segments.shape[2] == 2:
+        segments = np.concatenate((segments, np.zeros((len(segments), 2, 1))), axis=2)
+    return segments
+
+
+def _dot(u, v):
+    return u[..., 0] * v[..., 0] + u[..., 1] * v[..., 1] + u[..., 2] * v[..., 2]
+
+
+def _cross(u, v):
+    # (np.cross has a large overhead on small arrays)
+    return np.stack((u[..., 1] * v[..., 2] - u[..., 2] * v[..., 1],
+                     u[..., 2] * v[..., 0] - u[..., 0] * v[..., 2],
+                     u[..., 0] * v[..., 1] - u[..., 1] * v[..., 0]), axis=-1)
+
+
+def _norm(u):
+    return np.sqrt(_dot(u, u))
+
+
+def _between(c, a, b):
+    """
+    :return: for each triplet of (collinear) points, True if c lies between a and b (included).
+    If a and b coincide, c must coincide with them.
+    """
+    ab = b - a
+    ac = c - a
+    length2 = _dot(ab, ab)
+    t = _dot(ac, ab)
+    return np.where(length2 > 0,
+                    (0 <= t) & (t <= length2),
+                    _dot(ac, ac) <= EPSILON * EPSILON)
+
+
+def _is_collinear_with(c, a, b):
+    """:return: for each triplet of points, True if c is collinear with the segment a->b"""
+    return _norm(_cross(b - a, c - a)) <= EPSILON
+
+
+def _pairwise_intersects(a, b):
+    """
+    :param a: an (N, 2, 3) array of segments
+    :param b: an (M, 2, 3) array of segments
+    :return: an (N, M) boolean array telling, for each pair of segments, whether they intersect
+    """
+    p0, p1 = a[:, None, 0], a[:, None, 1]
+    q0, q1 = b[None, :, 0], b[None, :, 1]
+    r, s = p1 - p0, q1 - q0
+
+    # the segments must lie on the same plane
+    r_x_q0 = _cross(r, q0 - p0)
+    r_x_q1 = _cross(r, q1 - p0)
+    coplanar = np.abs(_dot(r_x_q0, q1 - p0)) <= EPSILON
+
+    # proper crossing: the extremes of each segment lie on opposite sides of the other one
+    # (parallel segments have n = 0, so they never cross properly)
+    n = _cross(r, s)
+    side_q0 = _dot(r_x_q0, n)
+    side_q1 = _dot(r_x_q1, n)
+    side_p0 = _dot(_cross(s, p0 - q0), n)
+    side_p1 = _dot(_cross(s, p1 - q0), n)
+    crossing = (side_q0 * side_q1 < 0) & (side_p0 * side_p1 < 0)
+
+    # touching: an extreme of a segment lies on the other segment
+    touching = \
+        (_norm(r_x_q0) <= EPSILON) & _between(q0, p0, p1) | \
+        (_norm(r_x_q1) <= EPSILON) & _between(q1, p0, p1) | \
+        _is_collinear_with(p0, q0, q1) & _between(p0, q0, q1) | \
+        _is_collinear_with(p1, q0, q1) & _between(p1, q0, q1)
+
+    return coplanar & (crossing | touching)
+
+
+def _chunks(a, b):
+    """:return: the ranges of rows of a to be tested at once against all the segments of b"""
+    step = max(1, _CHUNK_SIZE // max(1, len(b)))
+    return ((start, min(start + step, len(a))) for start in range(0, len(a), step))
+
+
+def intersection_matrix(a, b):
+    """
+    :param a: an (N, 2, 3) (or (N, 2, 2)) array-like of segments
+    :param b: an (M, 2, 3) (or (M, 2, 2)) array-like of segments
+    :return: an (N, M) boolean array, whose element [i, j] is True if a[i] intersects b[j]
+    """
+    a, b = as_segments(a), as_segments(b)
+
+    matrix = np.zeros((len(a), len(b)), dtype=bool)
+    if len(b):
+        for start, stop in _chunks(a, b):
+            matrix[start:stop] = _pairwise_intersects(a[start:stop], b)
+    return matrix
+
+
+def intersecting_pairs(a, b):
+    """
+    :param a: an (N, 2, 3) (or (N, 2, 2)) array-like of segments
+    :param b: an (M, 2, 3) (or (M, 2, 2)) array-like of segments
+    :return: a (K, 2) array with the pairs of indices (i, j) such that a[i] intersects b[j], sorted by i and j
+    """
+    a, b = as_segments(a), as_segments(b)
+
+    pairs = [np.empty((0, 2), dtype=np.int64)]
+    if len(b):
+        for start, stop in _chunks(a, b):
+            i, j = np.nonzero(_pairwise_intersects(a[start:stop], b))
+            pairs.append(np.column_stack((i + start, j)))
+    return np.concatenate(pairs)
+
+
+def intersection_points(a, b, pairs=None):
+    """
+    compute the intersections of pairs of intersecting segments, as Line.intersection does: the common point of two
+    crossing (or touching) segments, or the extremes of the common part of two collinear overlapping segments.
+    :param a: an (N, 2, 3) (or (N, 2, 2)) array-like of segments
+    :param b: an (M, 2, 3) (or (M, 2, 2)) array-like of segments
+    :param pairs: a (K, 2) array of pairs of indices (i, j) of intersecting segments (computed, if not given)
+    :return: pairs: the (K, 2) pairs of indices,
+             starts, ends: two (K, 3) arrays with the extremes of the intersection of each pair (ordered as the
+             segment of a). They are equal when the intersection is a single point
+    """
+    a, b = as_segments(a), as_segments(b)
+    if pairs is None:
+        pairs = intersecting_pairs(a, b)
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+
+    p, q = a[pairs[:, 0], 0], b[pairs[:, 1], 0]
+    r, s = a[pairs[:, 0], 1] - p, b[pairs[:, 1], 1] - q
+
+    n = _cross(r, s)
+    n2 = _dot(n, n)
+    r2 = _dot(r, r)
+    parallel = n2 <= EPSILON * EPSILON
+
+    # general case: the point p + t * r, with t = ((q - p) x s) . n / |n|^2
+    t = _dot(_cross(q - p, s), n) / np.where(parallel, 1, n2)
+
+    # collinear case: the overlap of the parameters (along r) of the extremes of the two segments
+    safe_r2 = np.where(r2 > 0, r2, 1)
+    t_q0 = _dot(q - p, r) / safe_r2
+    t_q1 = _dot(q + s - p, r) / safe_r2
+    t_start = np.clip(np.minimum(t_q0, t_q1), 0, 1)
+    t_end = np.clip(np.maximum(t_q0, t_q1), 0, 1)
+
+    t_start = np.where(parallel, t_start, t)
+    t_end = np.where(parallel, t_end, t)
+
+    starts = p + t_start[:, None] * r
+    ends = p + t_end[:, None] * r
+
+    # a degenerate segment of a (a single point) intersects b in that point
+    degenerate = r2 == 0
+    starts[degenerate] = p[degenerate]
+    ends[degenerate] = p[degenerate]
+
+    return pairs, starts, ends
@@ -0,0 +1,88 @@
+"""
+Incremental computation of the geometries selected by a SelectionBox, while its corner is being dragged.
+
+A geometry is selected if it lies (strictly) inside the box. When the box changes from old to new, a geometry can
+change its state only if it meets the region covered by one box and not by the other: a geometry inside old and not
+inside new reaches a point of old that is not inside new, and vice versa. So, at each move, only the geometries
+meeting the (closed) differences old \\ new and new \\ old are re-checked. They are found with the spatial index of
+the canvas, each difference being split into at most 4 rectangles. The work done at a move is proportional to the
+geometries near the edges swept by the mouse, not to the geometries in the box or on the canvas.
+"""
+
+
+def box_difference(a, b):
+    """
+    :param a: a (xmin, ymin, xmax, ymax) box
+    :param b: a (xmin, ymin, xmax, ymax) box
+    :return: a list of at most 4 boxes covering the closure of a \\ b
+    """
+    ax0, ay0, ax1, ay1 = a
+    bx0, by0, bx1, by1 = b
+
+    if bx0 > ax1 or bx1 < ax0 or by0 > ay1 or by1 < ay0:
+        return [a]
+
+    boxes = list()
+    if bx0 > ax0:
+        boxes.append((ax0, ay0, bx0, ay1))  # the strip on the left of b
+    if bx1 < ax1:
+        boxes.append((bx1, ay0, ax1, ay1))  # the strip on the right of b
+    x0, x1 = max(ax0, bx0), min(ax1, bx1)
+    if by0 > ay0:
+        boxes.append((x0, ay0, x1, by0))  # the strip below b
+    if by1 < ay1:
+        boxes.append((x0, by1, x1, ay1))  # the strip above b
+    return boxes
+
+
+class SelectionPreview(object):
+    """the geometries selected by a SelectionBox, kept up-to-date as the box changes (see the module docstring)"""
+
+    def __init__(self, selection_box, spatial_index):
+        """
+        :param selection_box: the SelectionBox being dragged
+        :param spatial_index: the SpatialIndex of the geometries that can be selected
+        """
+        self.selection_box = selection_box
+        self.spatial_index = spatial_index
+
+        self.selected = dict()  # key, value = id of a selected geometry, the geometry
+        self._box = None  # the (xmin, ymin, xmax, ymax) box of the last update
+
+    def update(self):
+        """
+        re-check the geometries whose state may have changed since the last update
+        :return: True if the set of the selected geometries changed
+        """
+        from app.geoms.point import Point3
+
+        bl, tr = self.selection_box.get_classical_bbox()
+        box = (bl.x(), bl.y(), tr.x(), tr.y())
+        if box == self._box:
+            return False
+
+        if self._box is None:
+            candidates = self.spatial_index.query(bl, tr, contained=True)
+        else:
+            candidates = dict()
+            for x0, y0, x1, y1 in box_difference(self._box, box) + box_difference(box, self._box):
+                for g in self.spatial_index.query(Point3(x0, y0, 0), Point3(x1, y1, 0)):
+                    candidates[id(g)] = g
+            candidates = list(candidates.values())
+        self._box = box
+
+        inside = set(id(g) for g in self.selection_box.select_geometries(candidates))
+
+        changed = False
+        for g in candidates:
+            if id(g) in inside:
+                if id(g) not in self.selected:
+                    self.selected[id(g)] = g
+                    changed = True
+            elif self.selected.pop(id(g), None) is not None:
+                changed = True
+        return changed
+
+    def selected_geometries(self):
+        """:return: a list with the selected geometries"""
+        return list(self.selected.values())
@@ -1,3 +1,5 @@
+import numpy as np
+
 from app.geoms.point import Point3
 from app.geoms.linearring import LinearRing
 from app.utils.color import Color
@@ -93,6 +95,7 @@ class SelectionBox:
     def select_geometries(self, geoms):
         """
         given a set of geoms return the subset of them that falls within the rectangle
+        (the canvas passes only the candidates found by its spatial index, which are checked here vertex by vertex)
         :param geoms: input geoms
         :return: a set of references to the original geoms
         """
@@ -100,30 +103,32 @@ class SelectionBox:
         from app.geoms.point import Point3
         from app.geoms.linestring import LineString
         from app.geoms.polygon import Polygon
+        from app.geoms.pointcloud import PointCloud
 
         selected_geoms = []
         bl, tr = self.get_classical_bbox()
 
         for g in geoms:
-            all_points_to_check = []
             if isinstance(g, Point3):
-                all_points_to_check.append(g)
+                if bl.x() < g.x() < tr.x() and bl.y() < g.y() < tr.y():
+                    selected_geoms.append(g)
+                continue
             elif isinstance(g, LineString):
-                for p in g.vertices:
-                    all_points_to_check.append(p)
+                vertices = g.vertices
             elif isinstance(g, Polygon):
-                for p in g.boundary.vertices:
-                    all_points_to_check.append(p)
+                vertices = g.boundary.vertices
+            elif isinstance(g, PointCloud):
+                # the points of a cloud are checked all at once
+                if g.is_valid() and g.points_in_box(bl, tr).all():
+                    selected_geoms.append(g)
+                continue
             else:
                 continue
 
-            is_inside = True
-            for p in all_points_to_check:
-                if not (bl.x() < p.x() < tr.x() and bl.y() < p.y() < tr.y()):
-                    is_inside = False
-                    break
-
-            if is_inside:
+            # all the vertices are checked at once
+            coords = np.array([p.tolist() for p in vertices], dtype=np.float64).reshape(-1, 3)
+            x, y = coords[:, 0], coords[:, 1]
+            if np.all((bl.x() < x) & (x < tr.x()) & (bl.y() < y) & (y < tr.y())):
                 selected_geoms.append(g)
 
         return selected_geoms
@@ -0,0 +1,106 @@
+"""
+the shader program used to render the geometries, and a proxy of the OpenGL.GL module that counts the GL calls.
+
+The locations of the attributes and of the uniforms of the shaders are resolved once, when the program is linked,
+instead of being looked up by name (with glGetAttribLocation / glGetUniformLocation) for every object at every frame.
+
+Modules that want their GL calls to be counted must import GL from this module instead of OpenGL:
+    from app.geoms.utils.shader_program import GL
+"""
+
+from OpenGL import GL as _GL
+
+
+class GLCallCounter(object):
+    """a proxy of the OpenGL.GL module: constants are returned as they are, functions are wrapped to count the calls"""
+
+    def __init__(self, gl_module):
+        self._gl_module = gl_module
+        self.calls_num = 0  # the number of GL calls done through this proxy so far
+
+    def __getattr__(self, name):
+        # called only the first time a name is looked up: the result is then stored in the instance, so that next
+        # look-ups do not pass through here
+        attr = getattr(self._gl_module, name)
+        if callable(attr):
+            attr = self._counted(attr)
+        setattr(self, name, attr)
+        return attr
+
+    def _counted(self, function):
+        def counted_function(*args, **kwargs):
+            self.calls_num += 1
+            return function(*args, **kwargs)
+        return counted_function
+
+
+GL = GLCallCounter(_GL)
+
+
+class ShaderProgram(object):
+
+    ATTRIBUTES = ("a_coords", "a_color")
+    UNIFORMS = ("u_color", "u_model", "u_view", "u_projection")
+
+    def __init__(self, vertex_shader_code, fragment_shader_code):
+        """
+        compile and link the shader program and cache the locations of its attributes and uniforms
+        :param vertex_shader_code: the source code of the vertex shader
+        :param fragment_shader_code: the source code of the fragment shader
+        """
+        self.program_id = GL.glCreateProgram()
+        if not self.program_id:
+            raise Exception("ERROR in shader PROGRAM creation")
+
+        vertex_shader = ShaderProgram.compile_shader(GL.GL_VERTEX_SHADER, vertex_shader_code)
+        fragment_shader = ShaderProgram.compile_shader(GL.GL_FRAGMENT_SHADER, fragment_shader_code)
+
+        # build and link the shader program given the vertex and the fragment shader
+        GL.glAttachShader(self.program_id, vertex_shader)
+        GL.glAttachShader(self.program_id, fragment_shader)
+        GL.glLinkProgram(self.program_id)
+
+        # get rid of the shaders as 1. they have been compiled in the program, 2. we do not need them any longer
+        GL.glDetachShader(self.program_id, vertex_shader)
+        GL.glDetachShader(self.program_id, fragment_shader)
+
+        # resolve the locations once and for all (they do not change until the program is linked again)
+        self.locations = dict()
+        for name in ShaderProgram.ATTRIBUTES:
+            self.locations[name] = GL.glGetAttribLocation(self.program_id, name)
+        for name in ShaderProgram.UNIFORMS:
+            self.locations[name] = GL.glGetUniformLocation(self.program_id, name)
+
+        self.a_coords = self.locations["a_coords"]
+        self.a_color = self.locations["a_color"]
+        self.u_color = self.locations["u_color"]
+        self.u_model = self.locations["u_model"]
+        self.u_view = self.locations["u_view"]
+        self.u_projection = self.locations["u_projection"]
+
+        self._frame_start_calls_num = None
+        self.last_frame_gl_calls = 0  # the number of GL calls done in the last frame (see begin_frame and end_frame)
+
+    @staticmethod
+    def compile_shader(shader_type, shader_code):
+        """
+        :param shader_type: either GL_VERTEX_SHADER or GL_FRAGMENT_SHADER
+        :param shader_code: the source code of the shader
+        :return: the id of the compiled shader
+        """
+        shader = GL.glCreateShader(shader_type)
+        GL.glShaderSource(shader, shader_code)
+        GL.glCompileShader(shader)
+        return shader
+
+    def use(self):
+        """make this the program to be run"""
+        GL.glUseProgram(self.program_id)
+
+    def begin_frame(self):
+        self._frame_start_calls_num = GL.calls_num
+
+    def end_frame(self):
+        """:return: the number of GL calls done since the last call to begin_frame"""
+        self.last_frame_gl_calls = GL.calls_num - self._frame_start_calls_num
+        return self.last_frame_gl_calls
@@ -0,0 +1,130 @@
+"""
+Snapping of the cursor to the geometries of the canvas, while drawing.
+
+A position within a radius (a few pixels, converted in world units) from something to snap to is moved onto it, in
+this order of priority:
+    - the nearest vertex of a geometry of the canvas (or a vertex already placed of the geometry being drawn),
+    - the nearest point of the nearest segment,
+    - the nearest intersection of the lines of the xy grid.
+The vertices and the segments are found by the PickIndex of the canvas, which is kept up-to-date as geometries are
+added, edited, and removed, so a snap costs two grid queries whatever the size of the scene.
+The vertices already placed of the geometry being drawn (which is not up-to-date in the PickIndex) are kept in a
+spatial hash of their own, with cells as large as the radius: a vertex is added to it when it is placed, and removed
+when it is deleted, so neither the edits nor the snaps visit all the vertices of the geometry being drawn.
+"""
+
+import math
+
+import numpy as np
+
+
+class Snapper(object):
+    NONE = 0  # the position was not snapped
+    VERTEX = 1
+    SEGMENT = 2
+    GRID = 3
+
+    def __init__(self, pick_index, grid_cell_size=None):
+        """
+        :param pick_index: the PickIndex of the geometries to snap to
+        :param grid_cell_size: the spacing of the lines of the grid to snap to (no grid snapping, if None)
+        """
+        self.pick_index = pick_index
+        self.grid_cell_size = grid_cell_size
+
+        self._own_xy = list()  # the (x, y) of the own vertices (see add_own_vertex), in the order they were added
+        self._own_cells = dict()  # key, value = (column, row) of a cell of the hash, the indices of its own vertices
+        self._own_cell_size = None  # the side of the cells of the hash (None until the first query)
+
+    @property
+    def own_vertex_num(self):
+        return len(self._own_xy)
+
+    def _own_cell(self, x, y):
+        return int(math.floor(x / self._own_cell_size)), int(math.floor(y / self._own_cell_size))
+
+    def add_own_vertex(self, x, y):
+        """add a vertex to snap to, besides the ones of the PickIndex (e.g., a vertex of the geometry being drawn)"""
+        self._own_xy.append((x, y))
+        if self._own_cell_size is not None:
+            self._own_cells.setdefault(self._own_cell(x, y), list()).append(len(self._own_xy) - 1)
+
+    def remove_own_vertex(self):
+        """remove the last vertex added by add_own_vertex"""
+        x, y = self._own_xy.pop()
+        if self._own_cell_size is not None:
+            cell = self._own_cell(x, y)
+            self._own_cells[cell].pop()  # the indices of a cell are sorted, so the last vertex is the last of its cell
+            if not self._own_cells[cell]:
+                del self._own_cells[cell]
+
+    def clear_own_vertices(self):
+        self._own_xy = list()
+        self._own_cells = dict()
+
+    def _nearest_own_vertex(self, x, y, radius):
+        """:return: the (x, y) of the nearest own vertex within the radius, and its distance (or None)"""
+        if not self._own_xy or radius <= 0:
+            return None
+
+        # the hash is rebuilt only if the radius changed a lot (i.e., after a zoom), so that a query visits 25 cells
+        # at most, and a cell does not gather too many vertices
+        if self._own_cell_size is None or not self._own_cell_size / 4 <= radius <= self._own_cell_size * 2:
+            self._own_cell_size = radius
+            self._own_cells = dict()
+            for k, (vx, vy) in enumerate(self._own_xy):
+                self._own_cells.setdefault(self._own_cell(vx, vy), list()).append(k)
+
+        (i0, j0), (i1, j1) = self._own_cell(x - radius, y - radius), self._own_cell(x + radius, y + radius)
+        best = None
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                for k in self._own_cells.get((i, j), ()):
+                    vx, vy = self._own_xy[k]
+                    d = math.hypot(vx - x, vy - y)
+                    if d <= radius and (best is None or d < best[1]):
+                        best = ((vx, vy), d)
+        return best
+
+    def snap(self, x, y, radius, exclude=None, own_vertices=None):
+        """
+        :param x, y: the position to snap
+        :param radius: the max distance of the snapped position from the given one
+        :param exclude: a geometry of the index to be ignored (e.g., the geometry being drawn, which is not
+        up-to-date in the index)
+        :param own_vertices: an (N, 2) array-like with further vertices to snap to, besides the own vertices (see
+        add_own_vertex), e.g., the last vertex of the geometry being drawn, when a new vertex is placed
+        :return: the (x, y) of the snapped position, and what it was snapped to (Snapper.NONE, VERTEX, SEGMENT, GRID)
+        """
+        vertex = self.pick_index.nearest_vertex(x, y, radius, exclude=exclude)
+        best = (self.pick_index.vertex_xy(vertex[0], vertex[1]), vertex[2]) if vertex is not None else None
+
+        own = self._nearest_own_vertex(x, y, radius)
+        if own is not None and (best is None or own[1] < best[1]):
+            best = own
+
+        if own_vertices is not None and len(own_vertices):
+            own_vertices = np.asarray(own_vertices, dtype=np.float64).reshape(-1, 2)
+            d = np.hypot(own_vertices[:, 0] - x, own_vertices[:, 1] - y)
+            k = int(np.argmin(d))
+            if d[k] <= radius and (best is None or d[k] < best[1]):
+                best = (own_vertices[k], d[k])
+
+        if best is not None:
+            return float(best[0][0]), float(best[0][1]), Snapper.VERTEX
+
+        segment = self.pick_index.nearest_segment(x, y, radius, exclude=exclude)
+        if segment is not None:
+            a, b = self.pick_index.segment_xy(segment[0], segment[1])
+            ab = b - a
+            length2 = np.dot(ab, ab)
+            t = np.clip(np.dot((x, y) - a, ab) / length2, 0, 1) if length2 > 0 else 0
+            return float(a[0] + t * ab[0]), float(a[1] + t * ab[1]), Snapper.SEGMENT
+
+        if self.grid_cell_size:
+            grid_x = round(x / self.grid_cell_size) * self.grid_cell_size
+            grid_y = round(y / self.grid_cell_size) * self.grid_cell_size
+            if np.hypot(grid_x - x, grid_y - y) <= radius:
+                return grid_x, grid_y, Snapper.GRID
+
+        return x, y, Snapper.NONE
@@ -0,0 +1,167 @@
+"""
+A spatial index over the bounding boxes (on the xy plane) of a set of items, answering box queries in about
+O(log n + k) time for n items and k results.
+
+The index is an R-tree packed by Sort-Tile-Recursive (STR, Leutenegger et al., 1997): the n boxes are sorted by the x
+of their centers and cut into S = ceil(sqrt(n / M)) vertical slices, each slice is sorted by the y of the centers, and
+runs of M consecutive boxes become the leaves (M being the node capacity). The same packing is repeated on the
+leaves, and so on up to the root. The tree is stored level by level in NumPy arrays (the boxes of the nodes and the
+range of their children in the level below), so a query visits a whole level with a few vectorized operations.
+
+A packed tree cannot be updated in place, so the index is rebuilt lazily:
+    - inserted items are kept in a list of pending items, scanned linearly by the queries;
+    - removed items are only marked as removed, and filtered out of the results;
+    - the tree is rebuilt (in O(n log n)) by the first query that finds too many pending or removed items.
+So adding or removing an item is O(1), and a long sequence of insertions costs a single rebuild.
+"""
+
+import numpy as np
+
+
+def geometry_box(geom):
+    """:return: the (xmin, ymin, xmax, ymax) box of the bounding box of the given geometry"""
+    bbox = geom.bounding_box
+    the_min, the_max = bbox.min(), bbox.max()
+    return the_min.x(), the_min.y(), the_max.x(), the_max.y()
+
+
+class SpatialIndex(object):
+    """an STR-packed R-tree over the xy boxes of a set of items (see the module docstring)"""
+
+    def __init__(self, node_capacity=16):
+        self.node_capacity = node_capacity
+
+        self._items = list()  # the item of each slot (None if removed)
+        self._boxes = list()  # the (xmin, ymin, xmax, ymax) box of each slot
+        self._slots = dict()  # key, value = id of an item, its slot
+        self._removed_num = 0
+
+        # the slots [0, tree_size) are in the tree, the others are pending
+        self._tree_size = 0
+        self._entry_slots = np.empty(0, dtype=np.int64)  # the slots of the tree, in the order of the leaves
+        self._entry_boxes = np.empty((0, 4))
+        self._levels = list()  # from the root down to the leaves: (boxes (K, 4), child_start (K,), child_stop (K,))
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, item):
+        return id(item) in self._slots
+
+    def insert(self, item, box):
+        """
+        :param item: the item to be indexed (any object; items are told apart by identity)
+        :param box: its (xmin, ymin, xmax, ymax) box
+        """
+        if id(item) in self._slots:
+            self.remove(item)
+        self._slots[id(item)] = len(self._items)
+        self._items.append(item)
+        self._boxes.append(tuple(box))
+
+    def remove(self, item):
+        slot = self._slots.pop(id(item), None)
+        if slot is not None:
+            self._items[slot] = None
+            self._removed_num += 1
+
+    def update(self, item, box):
+        """set the new box of an item (e.g., after the item changed its shape)"""
+        self.insert(item, box)
+
+    def clear(self):
+        self.__init__(self.node_capacity)
+
+    def _needs_rebuild(self):
+        pending_num = len(self._items) - self._tree_size
+        return pending_num > max(256, self._tree_size // 8) or self._removed_num > max(256, len(self._items) // 2)
+
+    @staticmethod
+    def _str_order(boxes, capacity):
+        """:return: the permutation sorting the boxes in the order of the STR packing"""
+        n = len(boxes)
+        cx = boxes[:, 0] + boxes[:, 2]
+        cy = boxes[:, 1] + boxes[:, 3]
+
+        slice_num = int(np.ceil(np.sqrt(np.ceil(n / capacity))))
+        slice_size = capacity * int(np.ceil(n / (capacity * slice_num)))
+
+        by_x = np.argsort(cx, kind='stable')
+        slices = np.empty(n, dtype=np.int64)
+        slices[by_x] = np.arange(n) // slice_size
+        return np.lexsort((cy, slices))
+
+    def _build(self):
+        """compact the slots (dropping the removed items) and pack all the items in a new tree"""
+        live = [slot for slot, item in enumerate(self._items) if item is not None]
+        self._items = [self._items[slot] for slot in live]
+        self._boxes = [self._boxes[slot] for slot in live]
+        self._slots = dict((id(item), slot) for slot, item in enumerate(self._items))
+        self._removed_num = 0
+        self._tree_size = len(self._items)
+        self._levels = list()
+
+        boxes = np.array(self._boxes, dtype=np.float64).reshape(-1, 4)
+        order = SpatialIndex._str_order(boxes, self.node_capacity) if len(boxes) else np.empty(0, dtype=np.int64)
+        self._entry_slots = order
+        self._entry_boxes = boxes[order]
+
+        # each level groups runs of node_capacity consecutive elements of the level below, then it is sorted itself
+        # (together with the ranges of the children of its nodes) so that the level above can be packed in turn
+        boxes = self._entry_boxes
+        while len(boxes) > 0:
+            starts = np.arange(0, len(boxes), self.node_capacity)
+            stops = np.minimum(starts + self.node_capacity, len(boxes))
+            node_boxes = np.column_stack((np.minimum.reduceat(boxes[:, 0], starts),
+                                          np.minimum.reduceat(boxes[:, 1], starts),
+                                          np.maximum.reduceat(boxes[:, 2], starts),
+                                          np.maximum.reduceat(boxes[:, 3], starts)))
+            if len(node_boxes) > 1:
+                order = SpatialIndex._str_order(node_boxes, self.node_capacity)
+                node_boxes, starts, stops = node_boxes[order], starts[order], stops[order]
+            self._levels.insert(0, (node_boxes, starts, stops))
+            if len(node_boxes) == 1:
+                break
+            boxes = node_boxes
+
+    @staticmethod
+    def _intersecting(boxes, xmin, ymin, xmax, ymax):
+        return (boxes[:, 0] <= xmax) & (boxes[:, 2] >= xmin) & (boxes[:, 1] <= ymax) & (boxes[:, 3] >= ymin)
+
+    @staticmethod
+    def _inside(boxes, xmin, ymin, xmax, ymax):
+        return (boxes[:, 0] > xmin) & (boxes[:, 2] < xmax) & (boxes[:, 1] > ymin) & (boxes[:, 3] < ymax)
+
+    def query(self, bl, tr, contained=False):
+        """
+        :param bl: the bottom-left corner of the query box (Point3)
+        :param tr: the top-right corner of the query box (Point3)
+        :param contained: if True, only the items whose box lies strictly inside the query box are returned, else all
+        the items whose box intersects the query box
+        :return: a list with the items found
+        """
+        if self._needs_rebuild():
+            self._build()
+
+        xmin, ymin, xmax, ymax = bl.x(), bl.y(), tr.x(), tr.y()
+        test = SpatialIndex._inside if contained else SpatialIndex._intersecting
+
+        # go down the tree, keeping the nodes that intersect the query box
+        found = np.empty(0, dtype=np.int64)
+        if self._levels:
+            nodes = np.arange(len(self._levels[0][0]))
+            for boxes, starts, stops in self._levels:
+                nodes = nodes[SpatialIndex._intersecting(boxes[nodes], xmin, ymin, xmax, ymax)]
+                starts, stops = starts[nodes], stops[nodes]
+                # the children of all the nodes kept (their ranges concatenated)
+                lengths = stops - starts
+                nodes = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            found = self._entry_slots[nodes[test(self._entry_boxes[nodes], xmin, ymin, xmax, ymax)]]
+
+        # the pending items are all checked
+        if len(self._items) > self._tree_size:
+            pending = np.array(self._boxes[self._tree_size:], dtype=np.float64).reshape(-1, 4)
+            found = np.concatenate((found, np.nonzero(test(pending, xmin, ymin, xmax, ymax))[0] + self._tree_size))
+
+        items = self._items
+        return [items[slot] for slot in found.tolist() if items[slot] is not None]
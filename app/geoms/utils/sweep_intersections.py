@@ -0,0 +1,162 @@
+"""
+Bentley-Ottmann sweep-line algorithm reporting all the intersections among a set of segments on the xy plane (see
+de Berg et al., Computational Geometry, ch. 2), for n segments and k intersection points.
+
+A horizontal line sweeps the plane from top to bottom, stopping at the event points: the extremes of the segments and
+the intersection points found so far. Ties in y are broken by x (a point with the same y and a smaller x comes first),
+which amounts to a symbolic rotation of the plane, so that horizontal segments go from left to right.
+The status holds the segments crossed by the sweep line, sorted from left to right, in a treap (see SweepStatus). At
+each event point p, the segments through p are those starting at p (stored in the event) and those found in a
+contiguous range of the status, right after the last segment on the left of p (found with a search of the status);
+these are removed, and the ones continuing below p are inserted again in the order they have just below p. Only the
+segments that become adjacent in the status are tested for intersection.
+Each of the O(n + k) events costs O(log n) time for the heap of the events and the search of the status, plus
+O(log n) expected time per segment removed or inserted, and a segment is removed and inserted once per event point
+it passes through, so the running time is O((n + k) log n) (as expected for a treap).
+
+All the segments through an event point are handled together, so points shared by many segments, extremes lying on
+other segments, vertical, horizontal, collinear, and degenerate (zero-length) segments need no special treatment.
+Coordinates closer than a tolerance (relative to the extent of the input) are taken as the same point, while whether
+two segments cross is decided with exact predicates (see robust_predicates).
+"""
+
+import heapq
+
+import numpy as np
+
+from app.geoms.utils.robust_predicates import orient2d
+from app.geoms.utils.sweep_status import SweepStatus
+
+
+def sweep_intersections(segments):
+    """
+    :param segments: an (N, 2, 2) or (N, 2, 3) array-like with the extremes of the segments (z is ignored)
+    :return: points: a (K, 2) array with the intersection points, sorted from top to bottom,
+             segment_ids: a list with, for each intersection point, the sorted list of the indices of the segments
+             passing through it (at least two)
+    """
+    segments = np.asarray(segments, dtype=np.float64)
+    if segments.size == 0:
+        return np.empty((0, 2)), []
+    segments = segments.reshape(len(segments), 2, -1)[:, :, :2]
+
+    # the upper extreme of each segment is the one met first by the sweep
+    a, b = segments[:, 0], segments[:, 1]
+    swap = (a[:, 1] < b[:, 1]) | ((a[:, 1] == b[:, 1]) & (a[:, 0] > b[:, 0]))
+    upper = np.where(swap[:, None], b, a)
+    lower = np.where(swap[:, None], a, b)
+
+    horizontal = upper[:, 1] == lower[:, 1]
+    dy = np.where(horizontal, 1, lower[:, 1] - upper[:, 1])
+    inverse_slope = np.where(horizontal, 0, (lower[:, 0] - upper[:, 0]) / dy)  # dx / dy
+
+    tol = 1e-9 * max(1.0, float(np.abs(segments).max()))
+
+    degenerate = ((upper[:, 0] == lower[:, 0]) & horizontal).tolist()
+
+    ux, uy = upper[:, 0].tolist(), upper[:, 1].tolist()
+    lx, ly = lower[:, 0].tolist(), lower[:, 1].tolist()
+    horizontal = horizontal.tolist()
+    inverse_slope = inverse_slope.tolist()
+
+    def x_at(s, px, py):
+        """:return: the x of the segment s at the height py (for a horizontal segment, the x of p clamped to s)"""
+        if horizontal[s]:
+            return min(max(px, ux[s]), lx[s])
+        return ux[s] + (py - uy[s]) * inverse_slope[s]
+
+    def order_below(s):
+        """the key sorting the segments through an event point from left to right, just below the point"""
+        return float('inf') if horizontal[s] else -inverse_slope[s]
+
+    # the event queue: key = (-y, x), and the segments whose upper extreme is the event point
+    upper_segments = dict()
+    for s in range(len(ux)):
+        upper_segments.setdefault((-uy[s], ux[s]), list()).append(s)
+    queue = list(upper_segments)
+    heapq.heapify(queue)
+
+    # the lower extremes are events too (with no segment starting there)
+    for s in range(len(lx)):
+        key = (-ly[s], lx[s])
+        if key not in upper_segments:
+            upper_segments[key] = list()
+            heapq.heappush(queue, key)
+
+    def schedule_intersection(s, t, event_key):
+        """if the segments s and t cross below the event point, schedule the crossing point as an event"""
+        # the extremes of each segment must lie strictly on opposite sides of the other one
+        # (touching extremes are found when the sweep reaches them). The sides are computed exactly, so that
+        # (nearly) collinear segments are never taken as crossing
+        if orient2d(ux[s], uy[s], lx[s], ly[s], ux[t], uy[t]) * orient2d(ux[s], uy[s], lx[s], ly[s], lx[t], ly[t]) >= 0:
+            return
+        if orient2d(ux[t], uy[t], lx[t], ly[t], ux[s], uy[s]) * orient2d(ux[t], uy[t], lx[t], ly[t], lx[s], ly[s]) >= 0:
+            return
+
+        dxs, dys = lx[s] - ux[s], ly[s] - uy[s]
+        dxt, dyt = lx[t] - ux[t], ly[t] - uy[t]
+        o1 = dxs * (uy[t] - uy[s]) - dys * (ux[t] - ux[s])
+        o2 = dxs * (ly[t] - uy[s]) - dys * (lx[t] - ux[s])
+        u = o1 / (o1 - o2)  # the crossing point is at u along t
+        qx, qy = ux[t] + u * dxt, uy[t] + u * dyt
+
+        key = (-qy, qx)
+        if key > event_key and key not in upper_segments and \
+                not (abs(qx - event_key[1]) <= tol and abs(qy + event_key[0]) <= tol):
+            upper_segments[key] = list()
+            heapq.heappush(queue, key)
+
+    status = SweepStatus(len(ux))
+    points = list()
+    segment_ids = list()
+    reported = dict()  # key, value = cell of a reported point, index of the point
+
+    while queue:
+        event_key = heapq.heappop(queue)
+        starting = upper_segments.pop(event_key)
+        px, py = event_key[1], -event_key[0]
+
+        # the segments of the status through p are contiguous: they follow the last segment on the left of p
+        left_neighbour = status.last_where(lambda s: x_at(s, px, py) < px - tol)
+        through = list()
+        s = status.next(left_neighbour) if left_neighbour is not None else status.first()
+        while s is not None and x_at(s, px, py) <= px + tol:
+            through.append(s)
+            s = status.next(s)
+        right_neighbour = s
+
+        # report p if more than one segment passes through it. The same crossing, computed from different pairs of
+        # segments, may differ in the last digits: points in the same cell of a grid of step tol are merged
+        if len(starting) + len(through) > 1:
+            cell = (round(px / tol), round(py / tol))
+            i = reported.get(cell)
+            if i is None:
+                reported[cell] = len(points)
+                points.append((px, py))
+                segment_ids.append(sorted(starting + through))
+            else:
+                segment_ids[i] = sorted(set(segment_ids[i]).union(starting + through))
+
+        # the segments through p that continue below it, sorted as they are just below p
+        continuing = [s for s in starting if not degenerate[s]] + \
+                     [s for s in through if not (abs(lx[s] - px) <= tol and abs(ly[s] - py) <= tol)]
+        continuing.sort(key=order_below)
+
+        for s in through:
+            status.remove(s)
+        anchor = left_neighbour
+        for s in continuing:
+            status.insert_after(s, anchor)
+            anchor = s
+
+        # test the segments that became adjacent
+        if not continuing:
+            if left_neighbour is not None and right_neighbour is not None:
+                schedule_intersection(left_neighbour, right_neighbour, event_key)
+        else:
+            if left_neighbour is not None:
+                schedule_intersection(left_neighbour, continuing[0], event_key)
+            if right_neighbour is not None:
+                schedule_intersection(continuing[-1], right_neighbour, event_key)
+
+    return np.array(points, dtype=np.float64).reshape(-1, 2), segment_ids
@@ -0,0 +1,174 @@
+"""
+The status of a plane sweep: the sequence of the items (e.g., segments) crossed by the sweep line, sorted from left to
+right, in O(log n) expected time per operation for n items.
+
+The order of the items is given by their position along the sweep line, which changes as the sweep advances, so the
+items are not stored with a key: the sequence is a treap (a binary search tree whose nodes also satisfy the heap
+property on random priorities, so that its expected depth is O(log n)) that is searched with a predicate on the items,
+true for a prefix of the sequence (e.g., "the segment is on the left of the event point"), and whose nodes are
+inserted next to a given item. The items are the integers in [0, capacity) (e.g., the indices of the segments), which
+are also the nodes of the treap: the links of the nodes are stored in lists indexed by item, and the nodes know their
+parent, so an item is removed (or its neighbours are found) without searching for it, even when the predicates are
+not consistent with the order of the sequence (e.g., for degenerate input).
+"""
+
+import random
+
+
+class SweepStatus(object):
+    """a sequence of distinct items in [0, capacity), stored as a treap (see the module docstring)"""
+
+    def __init__(self, capacity, seed=0):
+        """
+        :param capacity: the items are the integers in [0, capacity)
+        :param seed: the seed of the random priorities of the nodes
+        """
+        generator = random.Random(seed)
+        self._priority = [generator.random() for _ in range(capacity)]
+        self._left = [-1] * capacity
+        self._right = [-1] * capacity
+        self._parent = [-1] * capacity
+        self._present = [False] * capacity
+        self._root = -1
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, item):
+        return self._present[item]
+
+    def __iter__(self):
+        item = self.first()
+        while item is not None:
+            yield item
+            item = self.next(item)
+
+    def last_where(self, predicate):
+        """
+        :param predicate: a function of an item, true for a prefix of the sequence (possibly empty), false afterwards
+        :return: the last item of the prefix, or None if the prefix is empty
+        """
+        left, right = self._left, self._right
+        node, found = self._root, None
+        while node != -1:
+            if predicate(node):
+                found = node
+                node = right[node]
+            else:
+                node = left[node]
+        return found
+
+    def first(self):
+        """:return: the first item of the sequence, or None if it is empty"""
+        if self._root == -1:
+            return None
+        return self._leftmost(self._root)
+
+    def next(self, item):
+        """:return: the item following the given one in the sequence, or None if it is the last one"""
+        right, parent = self._right, self._parent
+        if right[item] != -1:
+            return self._leftmost(right[item])
+        while parent[item] != -1 and right[parent[item]] == item:
+            item = parent[item]
+        return parent[item] if parent[item] != -1 else None
+
+    def previous(self, item):
+        """:return: the item preceding the given one in the sequence, or None if it is the first one"""
+        left, parent = self._left, self._parent
+        if left[item] != -1:
+            node = left[item]
+            while self._right[node] != -1:
+                node = self._right[node]
+            return node
+        while parent[item] != -1 and left[parent[item]] == item:
+            item = parent[item]
+        return parent[item] if parent[item] != -1 else None
+
+    def insert_after(self, item, anchor):
+        """
+        insert an item (not in the sequence) right after another one
+        :param anchor: the item that will precede the new one, or None to insert the new item at the beginning
+        """
+        left, right, parent = self._left, self._right, self._parent
+        left[item] = right[item] = -1
+        self._present[item] = True
+        self._size += 1
+
+        if self._root == -1:
+            self._root = item
+            parent[item] = -1
+            return
+
+        # the new node becomes a leaf: the left child of the first node after the anchor, or the right child of the
+        # anchor (if it has none)
+        if anchor is None:
+            node = self._leftmost(self._root)
+            left[node] = item
+        elif right[anchor] == -1:
+            node = anchor
+            right[node] = item
+        else:
+            node = self._leftmost(right[anchor])
+            left[node] = item
+        parent[item] = node
+
+        # then it goes up until the heap property holds again
+        priority = self._priority
+        while parent[item] != -1 and priority[item] < priority[parent[item]]:
+            self._rotate_up(item)
+
+    def remove(self, item):
+        """remove an item from the sequence"""
+        left, right, parent = self._left, self._right, self._parent
+        priority = self._priority
+
+        # the node goes down until it has at most one child, which then takes its place
+        while left[item] != -1 and right[item] != -1:
+            self._rotate_up(left[item] if priority[left[item]] < priority[right[item]] else right[item])
+        child = left[item] if left[item] != -1 else right[item]
+
+        p = parent[item]
+        if child != -1:
+            parent[child] = p
+        if p == -1:
+            self._root = child
+        elif left[p] == item:
+            left[p] = child
+        else:
+            right[p] = child
+
+        left[item] = right[item] = parent[item] = -1
+        self._present[item] = False
+        self._size -= 1
+
+    def _leftmost(self, node):
+        left = self._left
+        while left[node] != -1:
+            node = left[node]
+        return node
+
+    def _rotate_up(self, node):
+        """rotate the node with its parent, so that the parent becomes its child (the order does not change)"""
+        left, right, parent = self._left, self._right, self._parent
+        p = parent[node]
+        g = parent[p]
+        if left[p] == node:
+            left[p] = right[node]
+            if right[node] != -1:
+                parent[right[node]] = p
+            right[node] = p
+        else:
+            right[p] = left[node]
+            if left[node] != -1:
+                parent[left[node]] = p
+            left[node] = p
+        parent[p] = node
+        parent[node] = g
+        if g == -1:
+            self._root = node
+        elif left[g] == p:
+            left[g] = node
+        else:
+            right[g] = node
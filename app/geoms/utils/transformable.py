@@ -15,7 +15,13 @@ class Transformable(object, metaclass=ABCMeta):
         # print("Movable3d.__init__")
 
         # TODO: replace Qt with numpy
-        self._model2world_matrix = kwargs.pop('model2world_matrix', QMatrix4x4())
+        self._model2world = kwargs.pop('model2world_matrix', None)  # None stands for the identity (made when needed)
+
+    @property
+    def _model2world_matrix(self):
+        if self._model2world is None:
+            self._model2world = QMatrix4x4()
+        return self._model2world
 
     def translate(self, x, y, z):
         """
@@ -27,6 +33,7 @@ class Transformable(object, metaclass=ABCMeta):
         """
 
         self._model2world_matrix.translate(x, y, z)
+        self.transformation_changed()
 
     def rotate(self, angle, x_component, y_component, z_component):
         """
@@ -39,6 +46,7 @@ class Transformable(object, metaclass=ABCMeta):
         """
 
         self._model2world_matrix.rotate(angle, x_component, y_component, z_component)
+        self.transformation_changed()
 
     def scale(self, x, y=None, z=None):
         """
@@ -53,6 +61,7 @@ class Transformable(object, metaclass=ABCMeta):
         if y is None:
             y = z = x
         self._model2world_matrix.scale(x, y, z)
+        self.transformation_changed()
 
     def move(self, delta_x=0, delta_y=0, delta_z=0):
         self.translate(delta_x, delta_y, delta_z)
@@ -78,6 +87,11 @@ class Transformable(object, metaclass=ABCMeta):
     def reset(self):
         # reset the _model2world_matrix
         self._model2world_matrix.setToIdentity()
+        self.transformation_changed()
+
+    def transformation_changed(self):
+        """called every time the _model2world_matrix changes (it does nothing, unless reimplemented)"""
+        pass
 
     @abstractmethod
     def apply_transformation(self):
@@ -0,0 +1,431 @@
+"""
+Triangulation of polygons with holes, in O(n log n) time (see de Berg et al., Computational Geometry, chapter 3).
+
+The rings of the polygon are projected on the coordinate plane that is the most parallel to them, then:
+    1. a plane sweep (from top to bottom) partitions the polygon into y-monotone pieces, by adding a diagonal at each
+       split and merge vertex (the status of the sweep holds the edges crossed by the sweep line, sorted from left to
+       right, in a treap: see SweepStatus);
+    2. the faces of the planar graph made of the edges of the rings and the diagonals are traced, to get the pieces;
+    3. each y-monotone piece is triangulated in linear time with the stack-based greedy algorithm.
+
+Ties in the y coordinate are broken by the x coordinate (a point is above another if its y is greater or, when the
+y coordinates are the same, if its x is smaller), which amounts to a symbolic rotation of the plane, so horizontal
+edges need no special treatment.
+Convex polygons without holes are triangulated with a fan, which needs no sweep at all.
+
+The rings drawn on the canvas are not always valid: a vertex may be repeated (e.g., the last vertex closing the ring
+on the first one), and a ring may self-intersect while it is being drawn. Repeated consecutive vertices are dropped
+before the sweep. Rings that are not simple (or holes that are not inside the boundary) are detected either by the
+sweep itself or by checking that the triangles found cover the area of the polygon, and the boundary is then
+triangulated with a fan, as if it were convex.
+"""
+
+import numpy as np
+
+from app.geoms.utils.robust_predicates import orient2d
+from app.geoms.utils.sweep_status import SweepStatus
+
+# the types of the vertices met by the sweep
+_START, _END, _SPLIT, _MERGE, _REGULAR = 1, 2, 3, 4, 5
+
+
+class _NotSimpleError(Exception):
+    """raised when the sweep finds out that the rings are not simple (or that they intersect each other)"""
+    pass
+
+
+def ring_normal(coords):
+    """:return: the (non-normalized) normal of the ring with the given (n, 3) coordinates"""
+    following = np.roll(coords, -1, axis=0)
+    return np.array([np.sum((coords[:, 1] - following[:, 1]) * (coords[:, 2] + following[:, 2])),
+                     np.sum((coords[:, 2] - following[:, 2]) * (coords[:, 0] + following[:, 0])),
+                     np.sum((coords[:, 0] - following[:, 0]) * (coords[:, 1] + following[:, 1]))])
+
+
+def _signed_area(xs, ys):
+    """:return: the signed area of the ring with the given coordinates (positive if it is in CCW order)"""
+    return 0.5 * float(np.dot(xs, np.roll(ys, -1)) - np.dot(np.roll(xs, -1), ys))
+
+
+def project_rings(rings):
+    """
+    project the rings on the coordinate plane that is the most parallel to the boundary (the first ring), choosing
+    the axes so that the boundary is in CCW order in the projection.
+    :param rings: a list of (n_i, 2) or (n_i, 3) arrays with the coordinates of the vertices of the rings
+    :return: xs, ys: two float64 arrays with the projected coordinates of the vertices of all the rings
+    """
+    coords = np.concatenate([np.asarray(r, dtype=np.float64).reshape(len(r), -1) for r in rings])
+
+    if coords.shape[1] == 2:
+        xs, ys = coords[:, 0], coords[:, 1]
+    else:
+        normal = ring_normal(np.asarray(rings[0], dtype=np.float64))
+        k = int(np.argmax(np.abs(normal)))
+        xs, ys = coords[:, (k + 1) % 3], coords[:, (k + 2) % 3]
+
+    # mirror the projection if the boundary is in CW order
+    if _signed_area(xs[:len(rings[0])], ys[:len(rings[0])]) < 0:
+        xs = -xs
+
+    return xs, ys
+
+
+def triangulate(rings):
+    """
+    triangulate a polygon with holes.
+    :param rings: a list of (n_i, 2) or (n_i, 3) arrays with the coordinates of the vertices of the rings, the first
+    one being the boundary and the others the holes. Rings should be simple and not intersect each other (their
+    orientation does not matter); otherwise, the boundary is triangulated with a fan (see the module docstring).
+    Repeated consecutive vertices (and a last vertex repeating the first one) are ignored.
+    :return: a (T, 3) int32 array of triangles, whose indices refer to the concatenation of the vertices of all
+    the rings. Triangles have the same orientation of the boundary. A polygon with n (distinct) vertices and h holes
+    has n + 2h - 2 triangles.
+    """
+    rings, kept = _drop_repeated_vertices(rings)
+    if not rings or len(rings[0]) < 3:
+        return np.empty((0, 3), dtype=np.int32)
+
+    xs, ys = project_rings(rings)
+    kept = np.concatenate(kept)
+
+    if len(rings) == 1 and _is_convex(xs, ys):
+        return kept[_fan(len(xs))].astype(np.int32)
+
+    try:
+        triangles = _triangulate_sweep(rings, xs, ys)
+    except _NotSimpleError:
+        triangles = None
+
+    if triangles is None or not _covers_polygon(triangles, rings, xs, ys):
+        triangles = _fan(len(rings[0]))
+
+    return kept[triangles].astype(np.int32)
+
+
+def _fan(n):
+    """:return: the triangles of the fan of the first n vertices, centered on the first one"""
+    fan = np.arange(2, n, dtype=np.int64)
+    return np.column_stack((np.zeros_like(fan), fan - 1, fan))
+
+
+def _drop_repeated_vertices(rings):
+    """
+    :return: the rings (as float64 arrays) without the vertices that are equal to the following one (so, without the
+    last vertex if it closes the ring on the first one), dropping the holes left with less than 3 vertices; and, for
+    each ring, the indices of the vertices kept in the concatenation of the given rings
+    """
+    cleaned, kept = list(), list()
+    start = 0
+    for i, ring in enumerate(rings):
+        ring = np.asarray(ring, dtype=np.float64)
+        ring = ring.reshape(len(ring), -1) if ring.size else ring.reshape(0, 2)
+        keep = ~np.all(ring == np.roll(ring, -1, axis=0), axis=1)
+        if len(ring) and not keep.any():
+            keep[0] = True  # all the vertices are the same one
+
+        if i == 0 or np.count_nonzero(keep) > 2:
+            cleaned.append(ring[keep])
+            kept.append(start + np.nonzero(keep)[0])
+        start += len(ring)
+
+    return cleaned, kept
+
+
+def _covers_polygon(triangles, rings, xs, ys):
+    """
+    :return: True if the triangles found have the expected number, and they cover exactly the area of the polygon
+    (which is not the case if the rings are not simple, or if the holes are not inside the boundary)
+    """
+    n = len(xs)
+    if len(triangles) != n + 2 * (len(rings) - 1) - 2:
+        return False
+
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    triangles_area = 0.5 * np.sum(np.abs((xs[b] - xs[a]) * (ys[c] - ys[a]) - (ys[b] - ys[a]) * (xs[c] - xs[a])))
+
+    polygon_area, start = 0.0, 0
+    for i, ring in enumerate(rings):
+        ring_area = abs(_signed_area(xs[start:start + len(ring)], ys[start:start + len(ring)]))
+        polygon_area += ring_area if i == 0 else -ring_area
+        start += len(ring)
+
+    return abs(triangles_area - polygon_area) <= 1e-9 * triangles_area
+
+
+def _triangulate_sweep(rings, xs, ys):
+    """
+    triangulate the polygon by partitioning it into y-monotone pieces (see the module docstring)
+    :return: a (T, 3) int64 array of triangles (of the vertices of the rings, with the given projected coordinates)
+    """
+    n = len(xs)
+    nxt, prv = _link_rings(rings, xs, ys)
+
+    # rank[v] < rank[w] iff v is above w (i.e., v is met by the sweep before w)
+    order = np.lexsort((xs, -ys))
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n)
+
+    rank_list = rank.tolist()
+    xs_list, ys_list = xs.tolist(), ys.tolist()
+
+    diagonals = _monotone_diagonals(xs_list, ys_list, nxt, prv, rank_list, order.tolist())
+    pieces = _trace_pieces(xs_list, ys_list, nxt, diagonals)
+
+    triangles = list()
+    for piece in pieces:
+        _triangulate_monotone(piece, xs_list, ys_list, rank_list, triangles)
+
+    triangles = np.array(triangles, dtype=np.int64).reshape(-1, 3)
+
+    # orient all triangles as the boundary (CCW in the projection)
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    cw = (xs[b] - xs[a]) * (ys[c] - ys[a]) - (ys[b] - ys[a]) * (xs[c] - xs[a]) < 0
+    triangles[cw] = triangles[cw][:, ::-1]
+
+    return triangles
+
+
+def _is_convex(xs, ys):
+    """:return: True if the (CCW) ring with the given coordinates is convex"""
+    dx, dy = np.roll(xs, -1) - xs, np.roll(ys, -1) - ys
+    turns = dx * np.roll(dy, -1) - dy * np.roll(dx, -1)
+    return bool(np.all(turns >= 0))
+
+
+def _link_rings(rings, xs, ys):
+    """
+    :return: nxt, prv: two lists with the next and the previous vertex of each vertex, going around each ring with
+    the interior of the polygon on the left (i.e., the boundary in CCW order and the holes in CW order)
+    """
+    nxt, prv = list(), list()
+    start = 0
+    for i, ring in enumerate(rings):
+        stop = start + len(ring)
+        indices = list(range(start, stop))
+
+        if i > 0 and _signed_area(xs[start:stop], ys[start:stop]) > 0:
+            indices.reverse()  # holes must be in CW order
+
+        following = indices[1:] + indices[:1]
+        nxt.extend([0] * len(indices))
+        prv.extend([0] * len(indices))
+        for v, w in zip(indices, following):
+            nxt[v] = w
+            prv[w] = v
+
+        start = stop
+
+    return nxt, prv
+
+
+def _monotone_diagonals(xs, ys, nxt, prv, rank, order):
+    """
+    sweep the polygon from top to bottom, adding a diagonal at each split and merge vertex.
+    The edge i goes from vertex i to vertex nxt[i]; the status holds the edges crossed by the sweep line that have
+    the interior of the polygon on their right, sorted from left to right.
+    :return: the list of diagonals (pairs of vertices) partitioning the polygon into y-monotone pieces
+    """
+
+    def last_on_the_left(v):
+        """:return: the last edge of the status that is (strictly) on the left of the vertex v, or None"""
+        x, y = xs[v], ys[v]
+
+        def on_the_left(u):
+            w = nxt[u]
+            return (xs[w] - xs[u]) * (y - ys[u]) - (ys[w] - ys[u]) * (x - xs[u]) > 0
+
+        return status.last_where(on_the_left)
+
+    def insert(e, v):
+        status.insert_after(e, last_on_the_left(v))
+        helper[e] = v
+
+    def delete(e, v):
+        if e not in status:
+            raise _NotSimpleError()
+        status.remove(e)
+
+    def edge_on_the_left(v):
+        """:return: the edge of the status immediately on the left of the vertex v"""
+        left = last_on_the_left(v)
+        if left is None:
+            raise _NotSimpleError()  # there must be one, if the polygon is simple
+        return left
+
+    def connect_merge_helper(e, v):
+        h = helper[e]
+        if vertex_type[h] == _MERGE:
+            diagonals.append((v, h))
+
+    vertex_type = [_REGULAR] * len(xs)
+    for v in order:
+        p, q = prv[v], nxt[v]
+        p_below, q_below = rank[p] > rank[v], rank[q] > rank[v]
+        if p_below == q_below:
+            convex = (xs[v] - xs[p]) * (ys[q] - ys[p]) - (ys[v] - ys[p]) * (xs[q] - xs[p]) > 0
+            if p_below:
+                vertex_type[v] = _START if convex else _SPLIT
+            else:
+                vertex_type[v] = _END if convex else _MERGE
+
+    status = SweepStatus(len(xs))
+    helper = dict()
+    diagonals = list()
+
+    for v in order:
+        t = vertex_type[v]
+        if t == _START:
+            insert(v, v)
+        elif t == _END:
+            connect_merge_helper(prv[v], v)
+            delete(prv[v], v)
+        elif t == _SPLIT:
+            left = edge_on_the_left(v)
+            diagonals.append((v, helper[left]))
+            helper[left] = v
+            insert(v, v)
+        elif t == _MERGE:
+            connect_merge_helper(prv[v], v)
+            delete(prv[v], v)
+            left = edge_on_the_left(v)
+            connect_merge_helper(left, v)
+            helper[left] = v
+        elif rank[prv[v]] < rank[v]:
+            # regular vertex with the interior of the polygon on its right
+            connect_merge_helper(prv[v], v)
+            delete(prv[v], v)
+            insert(v, v)
+        else:
+            # regular vertex with the interior of the polygon on its left
+            left = edge_on_the_left(v)
+            connect_merge_helper(left, v)
+            helper[left] = v
+
+    return diagonals
+
+
+def _trace_pieces(xs, ys, nxt, diagonals):
+    """
+    :return: the faces of the planar graph made of the edges of the rings and of the diagonals, each face being a
+    list of vertices in CCW order
+    """
+    if not diagonals:
+        # no diagonals: each ring is a piece by itself (and there are no holes, or there would be diagonals)
+        return [_walk(nxt, 0)]
+
+    # the half-edges going out of the vertices touched by diagonals
+    out_neighbours = dict()
+    for u, v in diagonals:
+        out_neighbours.setdefault(u, [nxt[u]]).append(v)
+        out_neighbours.setdefault(v, [nxt[v]]).append(u)
+
+    def clockwise_side(u, v, w):
+        """
+        :return: 0 if v->w is clockwise from v->u by less than 180 degrees, 1 if by 180 degrees, 2 if by more, 3 if
+        v->w has the direction of v->u
+        """
+        side = orient2d(xs[v], ys[v], xs[u], ys[u], xs[w], ys[w])
+        if side != 0:
+            return 0 if side < 0 else 2
+        return 1 if (xs[w] - xs[v]) * (xs[u] - xs[v]) + (ys[w] - ys[v]) * (ys[u] - ys[v]) < 0 else 3
+
+    def next_half_edge(u, v):
+        """:return: the target of the half-edge following u->v on the face on its left"""
+        neighbours = out_neighbours.get(v)
+        if neighbours is None:
+            return nxt[v]
+
+        # the first half-edge going out of v clockwise from v->u (compared with exact predicates, since a diagonal
+        # can be almost collinear with an edge)
+        best, best_side = None, None
+        for w in neighbours:
+            if w == u:
+                continue
+            side = clockwise_side(u, v, w)
+            if best is None or side < best_side or \
+                    (side == best_side and orient2d(xs[v], ys[v], xs[best], ys[best], xs[w], ys[w]) > 0):
+                best, best_side = w, side
+        return best
+
+    half_edges = set((v, nxt[v]) for v in range(len(nxt)))
+    half_edges.update(diagonals)
+    half_edges.update((v, u) for u, v in diagonals)
+
+    # each half-edge is on exactly one face, so all the faces are traced in len(half_edges) steps (unless the rings
+    # are not simple, in which case a walk may never get back to its start)
+    steps_left = len(half_edges)
+
+    pieces = list()
+    while half_edges:
+        u, v = half_edges.pop()
+        piece = [u]
+        while v != piece[0]:
+            steps_left -= 1
+            if steps_left < 0 or v is None:
+                raise _NotSimpleError()
+            piece.append(v)
+            u, v = v, next_half_edge(u, v)
+            half_edges.discard((u, v))
+        pieces.append(piece)
+
+    return pieces
+
+
+def _walk(nxt, first):
+    piece = [first]
+    v = nxt[first]
+    while v != first:
+        if len(piece) > len(nxt):
+            raise _NotSimpleError()
+        piece.append(v)
+        v = nxt[v]
+    return piece
+
+
+def _triangulate_monotone(piece, xs, ys, rank, triangles):
+    """
+    triangulate a y-monotone polygon (see de Berg et al., section 3.3) appending its triangles to the given list
+    :param piece: the vertices of the polygon, in CCW order
+    """
+    if len(piece) < 3:
+        raise _NotSimpleError()
+
+    if len(piece) == 3:
+        triangles.append(piece)
+        return
+
+    # walking in CCW order from the top vertex, the left chain is met first, down to the bottom vertex
+    top = min(range(len(piece)), key=lambda i: rank[piece[i]])
+    bottom = max(range(len(piece)), key=lambda i: rank[piece[i]])
+    on_left_chain = dict()
+    i = top
+    while i != bottom:
+        on_left_chain[piece[i]] = True
+        i = (i + 1) % len(piece)
+    while i != top:
+        on_left_chain[piece[i]] = False
+        i = (i + 1) % len(piece)
+
+    def is_convex(a, b, c):
+        return (xs[b] - xs[a]) * (ys[c] - ys[a]) - (ys[b] - ys[a]) * (xs[c] - xs[a]) > 0
+
+    vertices = sorted(piece, key=lambda v: rank[v])
+    stack = [vertices[0], vertices[1]]
+    for u in vertices[2:-1]:
+        if on_left_chain[u] != on_left_chain[stack[-1]]:
+            # u is on the other chain: connect it to all the vertices on the stack
+            for a, b in zip(stack, stack[1:]):
+                triangles.append((u, a, b))
+            stack = [stack[-1], u]
+        else:
+            last = stack.pop()
+            # connect u to the vertices on the stack, as long as the diagonals are inside the polygon
+            while stack and (is_convex(stack[-1], last, u) if on_left_chain[u] else is_convex(u, last, stack[-1])):
+                triangles.append((u, last, stack[-1]))
+                last = stack.pop()
+            stack.append(last)
+            stack.append(u)
+
+    u = vertices[-1]
+    for a, b in zip(stack, stack[1:]):
+        triangles.append((u, a, b))
@@ -1,25 +1,53 @@
 import numpy as np
 
 
+# the types accepted as elements of a vector: the exact types are looked up in a set (much faster than a long
+# isinstance check, which is only the fallback for their subclasses, e.g., bool)
+_NUMERIC_TYPES = frozenset((int, float,
+                            np.int_, np.intc, np.intp, np.int8, np.int16, np.int32, np.int64,
+                            np.uint8, np.uint16, np.uint32, np.uint64,
+                            np.float16, np.float32, np.float64))
+_NUMERIC_BASES = (int, float, np.integer, np.floating)
+
+
 class Vector(np.ndarray):
 
     def __new__(cls, *args, **kwargs):
         # print("Vector.__new__")
         if isinstance(args[0], Vector):
             # copy-constructor
-            obj = np.array(args[0].tolist(), dtype=np.float32, copy=True, subok=True)
-        elif isinstance(args, (list, tuple, np.ndarray, Vector)) \
-                and all(isinstance(i, (int, float,
-                                       np.int_, np.intc, np.intp, np.int8, np.int16, np.int32, np.int64,
-                                       np.uint8, np.uint16, np.uint32, np.uint64,
-                                       np.float_, np.float16, np.float32, np.float64)) for i in args):
-            obj = np.array(args, dtype=np.float32, copy=True, subok=True)
+            obj = np.array(args[0], dtype=np.float32)
+        elif _NUMERIC_TYPES.issuperset(map(type, args)) or all(isinstance(i, _NUMERIC_BASES) for i in args):
+            obj = np.array(args, dtype=np.float32)
         else:
             raise TypeError(str(cls) +
                             ".__new__ accepts only array-like parameters of numeric type")
 
         return obj.view(cls)
 
+    @classmethod
+    def trusted(cls, *values):
+        """
+        fast constructor skipping all the checks on the input
+        :param values: the elements of the vector: they must be numbers, exactly as many as the elements of a vector of
+        this class (e.g., 3 for a Vector3)
+        """
+        obj = np.array(values, dtype=np.float32).view(cls)
+        obj.__init__()
+        return obj
+
+    @classmethod
+    def view_of(cls, buffer):
+        """
+        fast constructor making a vector that shares the memory of the given buffer (no copy is made: changes to the
+        vector change the buffer, and vice versa)
+        :param buffer: a 1-dimensional float32 array with as many elements as a vector of this class (e.g., a row of
+        an (N, 3) array of coordinates, for a Vector3)
+        """
+        obj = buffer.view(cls)
+        obj.__init__()
+        return obj
+
     def __str__(self):
         return self.__class__.__name__ + repr(self)
 
@@ -33,31 +61,30 @@ class Vector(np.ndarray):
         return not self == other
 
     def __hash__(self):
-        coords_concatenation = ""
-        for elem in self:
-            coords_concatenation += str(elem)
-        return hash(coords_concatenation)
+        # consistent with __eq__ (e.g., 0.0 and -0.0 have the same hash), and no string is made
+        return hash(tuple(self.tolist()))
+
+    @staticmethod
+    def _plain(a):
+        """:return: a seen as a plain ndarray (numpy operations on ndarray subclasses are much slower)"""
+        return a.view(np.ndarray) if isinstance(a, np.ndarray) else a
 
     def __add__(self, other):
-        return self.__class__(np.ndarray.__add__(self, other))
+        # the sum is computed on plain arrays (no intermediate vector is made), and owned by the new vector
+        result = self.view(np.ndarray) + Vector._plain(other)
+        return self.__class__.view_of(result if result.dtype == np.float32 else result.astype(np.float32))
 
     def __sub__(self, other):
-        return self.__class__(np.ndarray.__sub__(self, other))
+        result = self.view(np.ndarray) - Vector._plain(other)
+        return self.__class__.view_of(result if result.dtype == np.float32 else result.astype(np.float32))
 
     def magnitude(self):
-        sum_of_squares = 0
-        for x in self:
-            sum_of_squares += x ** 2
-
-        return sum_of_squares ** (1 / 2)
+        plain = self.view(np.ndarray)
+        return np.sqrt(np.dot(plain, plain))
 
     def norm(self):
         n = len(self)
-        nth_sum = 0
-        for x in self:
-            nth_sum += x ** n
-
-        return nth_sum ** (1 / n)
+        return np.sum(self.view(np.ndarray) ** n) ** (1 / n)
 
     def normalize(self):
         """returns a normalized copy (a versor) of self"""
@@ -77,15 +104,13 @@ class Vector2(Vector):
         # first, create a Vector obj
         obj = Vector.__new__(cls, *args, **kwargs)
 
-        # 2d vectors must have exactly 2 elements
-        if len(obj) > 2:
-            obj = obj[:2]
-        else:
-            # if it has less then two elements append enough zeros to get a 2d vector
-            while len(obj) < 2:
-                obj = np.append(obj, [0.0])
+        # 2d vectors must have exactly 2 elements: if it has less, the missing ones are zeros
+        if len(obj) != 2:
+            elements = np.zeros(2, dtype=np.float32)
+            elements[:min(len(obj), 2)] = obj[:2]
+            obj = elements.view(cls)
 
-        return obj.view(cls)
+        return obj
 
     def x(self):
         """Property x is first element of vector."""
@@ -110,15 +135,13 @@ class Vector3(Vector):
         # first, create a Vector obj
         obj = Vector.__new__(cls, *args, **kwargs)
 
-        # 3d vectors must have exactly 3 elements
-        if len(obj) > 3:
-            obj = obj[:3]
-        else:
-            # if it has less then three elements append enough zeros to get a 3d vector
-            while len(obj) < 3:
-                obj = np.append(obj, [0.0])
+        # 3d vectors must have exactly 3 elements: if it has less, the missing ones are zeros
+        if len(obj) != 3:
+            elements = np.zeros(3, dtype=np.float32)
+            elements[:min(len(obj), 3)] = obj[:3]
+            obj = elements.view(cls)
 
-        return obj.view(cls)
+        return obj
 
     def x(self):
         """Property x is first element of vector."""
@@ -163,18 +186,144 @@ class Vector3(Vector):
         self[2] = value
 
     def cross(self, other):
-            return Vector3(self.y()*other.z() - self.z()*other.y(),
-                           self.z()*other.x() - self.x()*other.z(),
-                           self.x()*other.y() - self.y()*other.x())
+        result = np.cross(self.view(np.ndarray), Vector._plain(other))
+        return Vector3.view_of(result if result.dtype == np.float32 else result.astype(np.float32))
 
     def __mul__(self, other):
         """NOTE!!! this implementation only considers the multiplication by a 4x4 transformation matrix"""
         if isinstance(other, np.ndarray):
-            other = np.matrix(other)
-        if isinstance(other, np.matrix):
-            if other.shape == (4, 4):
-                self_list = self.tolist()
-                self_list.append(1)
-                vec4 = np.array(self_list, dtype=np.float32)
-                res_list = other.dot(vec4).tolist()[0]
-                return Vector3(*res_list)
+            matrix = np.asarray(other)
+            if matrix.shape == (4, 4):
+                # the same as multiplying the matrix by (x, y, z, 1), and dropping the 4th coordinate
+                result = np.dot(matrix[:3, :3], self.view(np.ndarray)) + matrix[:3, 3]
+                return Vector3.view_of(result.astype(np.float32))
+
+
+class Vector3Array(np.ndarray):
+    """
+    An (N, 3) float32 array of 3D vectors (or points), with the operations of Vector3 computed on all the rows at once.
+    It is meant for the bulk geometry of algorithms and importers: millions of coordinates are handled without making a
+    Vector3 (or a Point3) per row, and single rows can still be seen as vectors when needed (see vector).
+    Indexing and numpy operations give a Vector3Array as long as the result is still (N, 3), else a plain ndarray (e.g.,
+    a column, or the magnitudes of the vectors).
+    """
+
+    def __new__(cls, vectors=None):
+        """
+        :param vectors: either a list of Vector3 (or Point3) objects or an (N, 3) array-like with their coordinates.
+        (N, 2) coordinates are accepted as well: the missing z are zeros
+        """
+        if vectors is None:
+            vectors = np.zeros((0, 3))
+
+        coords = np.array(vectors, dtype=np.float32)
+        if coords.ndim == 1 and len(coords) in (0, 2, 3):
+            coords = coords.reshape(-1, len(coords) or 3)  # a single vector, or no vectors at all
+        if coords.ndim != 2 or coords.shape[1] not in (2, 3):
+            raise TypeError(str(cls) + ".__new__ accepts only (N, 3) or (N, 2) array-like parameters")
+
+        if coords.shape[1] == 2:
+            elements = np.zeros((len(coords), 3), dtype=np.float32)
+            elements[:, :2] = coords
+            coords = elements
+
+        return coords.view(cls)
+
+    @classmethod
+    def view_of(cls, buffer):
+        """
+        fast constructor making a Vector3Array that shares the memory of the given buffer (no copy is made)
+        :param buffer: an (N, 3) float32 array (e.g., the coords of a PointCloud)
+        """
+        return buffer.view(cls)
+
+    def __array_wrap__(self, obj, context=None, return_scalar=False):
+        if obj.ndim == 2 and obj.shape[1] == 3:
+            return np.ndarray.__array_wrap__(self, obj, context, return_scalar)
+        return obj[()] if return_scalar else obj.view(np.ndarray)
+
+    def __getitem__(self, item):
+        result = np.ndarray.__getitem__(self, item)
+        if isinstance(result, Vector3Array) and (result.ndim != 2 or result.shape[1] != 3):
+            return result.view(np.ndarray)
+        return result
+
+    def __str__(self):
+        return self.__class__.__name__ + str(self.view(np.ndarray))
+
+    def __repr__(self):
+        return self.__class__.__name__ + "(" + repr(self.view(np.ndarray)) + ")"
+
+    def x(self):
+        """the column of the x coordinates (a view: changing it changes the array)"""
+        return self.view(np.ndarray)[:, 0]
+
+    def set_x(self, values):
+        self.view(np.ndarray)[:, 0] = values
+
+    def y(self):
+        """the column of the y coordinates (a view: changing it changes the array)"""
+        return self.view(np.ndarray)[:, 1]
+
+    def set_y(self, values):
+        self.view(np.ndarray)[:, 1] = values
+
+    def z(self):
+        """the column of the z coordinates (a view: changing it changes the array)"""
+        return self.view(np.ndarray)[:, 2]
+
+    def set_z(self, values):
+        self.view(np.ndarray)[:, 2] = values
+
+    def vector(self, i, vector_class=Vector3):
+        """
+        :param i: the index of a row
+        :param vector_class: the class of the vector returned (e.g., Vector3 or Point3)
+        :return: the i-th row as a vector sharing the memory of the array (changes to it change the array)
+        """
+        return vector_class.view_of(self.view(np.ndarray)[i])
+
+    def vectors(self, vector_class=Vector3):
+        """:return: a list with all the rows as vectors sharing the memory of the array (see vector)"""
+        plain = self.view(np.ndarray)
+        return [vector_class.view_of(plain[i]) for i in range(len(plain))]
+
+    def magnitude(self):
+        """:return: an (N,) array with the magnitude of each vector"""
+        plain = self.view(np.ndarray)
+        return np.sqrt(np.einsum('ij,ij->i', plain, plain))
+
+    def normalize(self):
+        """returns a normalized copy of self: each vector becomes a versor (zero vectors are left zero)"""
+        magnitude = self.magnitude()
+        magnitude[magnitude == 0] = 1
+        return (self.view(np.ndarray) / magnitude[:, np.newaxis]).view(Vector3Array)
+
+    def dot(self, other):
+        """
+        :param other: a Vector3 (dotted with every row) or an (N, 3) array-like (dotted row by row)
+        :return: an (N,) array with the dot products
+        """
+        return np.einsum('ij,ij->i', self.view(np.ndarray), np.broadcast_to(Vector._plain(other), self.shape))
+
+    def cross(self, other):
+        """
+        :param other: a Vector3 (crossed with every row) or an (N, 3) array-like (crossed row by row)
+        :return: a Vector3Array with the cross products
+        """
+        result = np.cross(self.view(np.ndarray), Vector._plain(other))
+        return (result if result.dtype == np.float32 else result.astype(np.float32)).view(Vector3Array)
+
+    def transform(self, matrix):
+        """
+        apply a 4x4 transformation matrix to all the vectors, as Vector3.__mul__ does to a single one
+        :param matrix: a 4x4 array-like (row major)
+        :return: a new Vector3Array with the transformed vectors
+        """
+        matrix = np.asarray(matrix, dtype=np.float64)
+        if matrix.shape != (4, 4):
+            raise TypeError("Vector3Array.transform requires a 4x4 matrix")
+
+        # the same as multiplying the matrix by each (x, y, z, 1), and dropping the 4th coordinates
+        result = np.dot(self.view(np.ndarray), matrix[:3, :3].T) + matrix[:3, 3]
+        return result.astype(np.float32).view(Vector3Array)
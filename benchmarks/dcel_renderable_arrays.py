@@ -0,0 +1,43 @@
+"""
+time DCEL.get_renderable_arrays on convex polygons from about 100 to about 1M half-edges: the time per half-edge
+should not grow with the size of the DCEL.
+
+run from the root of the repository:
+    python -m benchmarks.dcel_renderable_arrays
+"""
+
+import math
+import time
+
+from app.geoms.dcel.dcel import DCEL
+from app.geoms.linearring import LinearRing
+from app.geoms.point import Point3
+from app.geoms.polygon import Polygon
+
+VERTEX_NUMS = (20, 2000, 20000, 170000)  # a double-sided fan of n vertices has 6(n - 2) half-edges
+REPEATS = 3
+
+
+def regular_polygon(vertex_num):
+    angles = [2 * math.pi * i / vertex_num for i in range(vertex_num)]
+    return Polygon([LinearRing([Point3(math.cos(a), math.sin(a), 0.0) for a in angles])])
+
+
+def main():
+    print("{:>10} {:>12} {:>14}".format("half-edges", "time (s)", "us/half-edge"))
+    for vertex_num in VERTEX_NUMS:
+        dcel = DCEL()
+        dcel.make_from_polygon(regular_polygon(vertex_num))
+        half_edge_num = len(dcel.edges)
+
+        timings = list()
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            dcel.get_renderable_arrays()
+            timings.append(time.perf_counter() - start)
+
+        print("{:>10} {:>12.4f} {:>14.2f}".format(half_edge_num, min(timings), 1e6 * min(timings) / half_edge_num))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""
+time the construction of vectors and points, and the arithmetic between them (which makes new points).
+
+run from the root of the repository:
+    python -m benchmarks.point_construction
+"""
+
+import timeit
+
+from app.geoms.point import Point3
+from app.utils.vector import Vector3
+
+NUMBER = 20000  # the number of operations per repeat
+REPEATS = 7
+
+a, b = Point3(1.0, 2.0, 3.0), Point3(4.0, 5.0, 6.0)
+va, vb = Vector3(1.0, 2.0, 3.0), Vector3(4.0, 5.0, 6.0)
+
+STATEMENTS = (
+    "Point3(1.0, 2.0, 3.0)",
+    "Point3.trusted(1.0, 2.0, 3.0)",
+    "Point3(a)",
+    "a - b",
+    "a + b",
+    "Vector3(1.0, 2.0, 3.0)",
+    "va - vb",
+)
+
+
+def main():
+    print("{:<32} {:>10}".format("statement", "us / op"))
+    for statement in STATEMENTS:
+        timings = timeit.repeat(statement, globals=globals(), number=NUMBER, repeat=REPEATS)
+        print("{:<32} {:>10.2f}".format(statement, 1e6 * min(timings) / NUMBER))
+
+
+if __name__ == '__main__':
+    main()
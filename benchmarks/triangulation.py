@@ -0,0 +1,91 @@
+"""
+time the triangulation of concave polygons, up to 10^5 vertices:
+    - a star-shaped boundary with random radii and a grid of square holes;
+    - a comb, whose teeth (of random heights) are all crossed by the sweep line at once, so that the status of the
+      sweep holds a constant fraction of the edges for most of the sweep.
+The area of the triangles is checked against the area of the rings.
+
+run from the root of the repository:
+    python -m benchmarks.triangulation
+"""
+
+import math
+import time
+
+import numpy as np
+
+from app.geoms.dcel.array_dcel import ArrayDCEL
+from app.geoms.utils.triangulation import triangulate
+
+SIZES = ((10 ** 3, 9), (10 ** 4, 100), (10 ** 5, 961))  # (vertex number, hole number)
+REPEATS = 3
+
+
+def star_with_holes(vertex_num, hole_num, seed=0):
+    """:return: the rings of a star-shaped polygon with vertex_num vertices in total, hole_num of them square holes"""
+    rng = np.random.RandomState(seed)
+    boundary_num = vertex_num - 4 * hole_num
+    angles = np.linspace(0, 2 * math.pi, boundary_num, endpoint=False)
+    radii = rng.uniform(0.8, 1.0, boundary_num)
+    rings = [np.column_stack((radii * np.cos(angles), radii * np.sin(angles)))]
+
+    # the holes lie on a grid inside the circle of radius 0.5, which is inside the boundary
+    side = int(math.ceil(math.sqrt(hole_num)))
+    cell = 0.7 / side
+    for i in range(hole_num):
+        x, y = -0.35 + cell * (i % side), -0.35 + cell * (i // side)
+        rings.append(np.array([(x, y), (x + cell / 2, y), (x + cell / 2, y + cell / 2), (x, y + cell / 2)]))
+    return rings
+
+
+def comb(vertex_num, seed=0):
+    """:return: the ring of a comb with vertex_num // 4 teeth pointing up"""
+    rng = np.random.RandomState(seed)
+    teeth = vertex_num // 4
+    heights = rng.uniform(1, 2, teeth)
+    ring = [(0, 0), (teeth - 0.5, 0)]
+    for i in reversed(range(teeth)):
+        ring.extend([(i + 0.5, heights[i]), (i, heights[i])])
+        if i > 0:
+            ring.extend([(i, 0.1), (i - 0.5, 0.1)])
+    return [np.array(ring, dtype=np.float64)]
+
+
+def ring_area(ring):
+    xs, ys = ring[:, 0], ring[:, 1]
+    return 0.5 * abs(float(np.dot(xs, np.roll(ys, -1)) - np.dot(np.roll(xs, -1), ys)))
+
+
+def best_time(function, *args):
+    timings = list()
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = function(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    print("{:>6} {:>9} {:>6} {:>10} {:>16} {:>15}".format("shape", "vertices", "holes", "triangles", "triangulate (s)",
+                                                          "ArrayDCEL (s)"))
+    cases = [("star", star_with_holes(vertex_num, hole_num)) for vertex_num, hole_num in SIZES] + \
+            [("comb", comb(vertex_num)) for vertex_num, hole_num in SIZES]
+    for shape, rings in cases:
+        coords = np.concatenate(rings)
+
+        triangulate_time, triangles = best_time(triangulate, rings)
+
+        a, b, c = coords[triangles[:, 0]], coords[triangles[:, 1]], coords[triangles[:, 2]]
+        area = 0.5 * np.sum(np.abs((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])))
+        expected = ring_area(rings[0]) - sum(ring_area(h) for h in rings[1:])
+        assert abs(area - expected) <= 1e-9 * expected, "the triangles do not cover the polygon"
+
+        dcel_coords = np.column_stack((coords, np.zeros(len(coords))))
+        dcel_time, _ = best_time(lambda: ArrayDCEL()._make_from_triangles(dcel_coords, triangles, double_sided=True))
+
+        print("{:>6} {:>9} {:>6} {:>10} {:>16.3f} {:>15.3f}".format(shape, len(coords), len(rings) - 1,
+                                                                     len(triangles), triangulate_time, dcel_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+import pytest
+
+pytest.importorskip('OpenGL')
+pytest.importorskip('PyQt4')
+
+from app.geoms.linestring import LineString
+from app.geoms.point import Point3
+from app.geoms.polygon import Polygon
+from app.geoms.linearring import LinearRing
+from app.geoms.utils.batch_renderer import BatchRenderer
+
+
+def packed_coords(renderer, renderable):
+    """:return: the coordinates of the vertices of the renderable in its batch"""
+    batch = renderer.batches[renderable.elements_type]
+    (v0, v1), _, _ = batch.member_rows[id(renderable)]
+    return batch.renderable_vertex_array[v0:v1]['coords'].tolist()
+
+
+def batched(renderer):
+    return set(id(m) for batch in renderer.batches.values() for m in batch.members)
+
+
+def make_scene():
+    points = [Point3(float(i), 0.0, 0.0) for i in range(20)]
+    line = LineString([Point3(0, 0, 0), Point3(1, 1, 0)])
+    renderer = BatchRenderer()
+    renderer.update(points + [line])
+    return renderer, points, line
+
+
+def test_temporary_geometries_do_not_dirty_the_renderer():
+    renderer, points, line = make_scene()
+    Point3(1, 2, 3)
+    LineString([Point3(0, 0, 0), Point3(1, 1, 0)])
+    assert not renderer._dirty
+
+
+def test_changed_members_are_rewritten_in_place():
+    renderer, points, line = make_scene()
+    batch = renderer.batches[points[0].elements_type]
+    points[3].set_coords(5, 6, 7)
+    renderer.update(points + [line])
+    assert renderer.batches[points[0].elements_type] is batch
+    assert packed_coords(renderer, points[3]) == [(5, 6, 7)]
+
+    line.add_vertex(Point3(2, 0, 0))
+    renderer.update(points + [line])
+    assert packed_coords(renderer, line) == [(0, 0, 0), (1, 1, 0), (2, 0, 0)]
+
+
+def test_hidden_and_transformed_members_leave_their_batch():
+    renderer, points, line = make_scene()
+    points[1].hide()
+    points[2].translate(1, 0, 0)
+    renderer.update(points + [line])
+    assert id(points[1]) not in batched(renderer) and points[1] not in renderer.unbatched
+    assert id(points[2]) not in batched(renderer) and any(r is points[2] for r in renderer.unbatched)
+
+    points[1].show()
+    points[2].reset()
+    renderer.update(points + [line])
+    assert set(id(p) for p in points) <= batched(renderer)
+    assert not renderer.unbatched
+
+
+def test_removed_renderables_are_no_longer_watched():
+    renderer, points, line = make_scene()
+    renderer.invalidate()
+    renderer.update(points[1:] + [line])
+    assert renderer not in points[0].renderers
+    points[0].set_coords(1, 1, 1)
+    assert not renderer._dirty
+
+
+def test_replaced_rings_are_regrouped():
+    polygon = Polygon([LinearRing([Point3(0, 0, 0), Point3(4, 0, 0), Point3(4, 4, 0), Point3(0, 4, 0)])])
+    renderer = BatchRenderer()
+    renderer.update([polygon])
+    old_boundary = polygon.boundary
+    polygon.boundary = LinearRing([Point3(0, 0, 0), Point3(8, 0, 0), Point3(8, 8, 0), Point3(0, 8, 0)])
+    renderer.update([polygon])
+    assert id(polygon.boundary) in batched(renderer) and id(old_boundary) not in batched(renderer)
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from app.geoms.utils.deduplication import deduplicate, unique_points, PAIRWISE_DEDUPLICATION_MAX
+from app.utils.vector import Vector3
+
+
+def brute_force_representatives(coords, tolerance):
+    """the first point of each connected component of the graph of the pairs of points within the tolerance"""
+    distances = np.sqrt(np.sum((coords[:, None, :] - coords[None, :, :]) ** 2, axis=2))
+    groups = list(range(len(coords)))
+    for i in range(len(coords)):
+        for j in range(i):
+            if distances[i, j] <= tolerance and groups[i] != groups[j]:
+                merged, kept = max(groups[i], groups[j]), min(groups[i], groups[j])
+                groups = [kept if g == merged else g for g in groups]
+    return np.array(groups)
+
+
+def check_deduplicate(coords, tolerance):
+    representatives, inverse = deduplicate(coords, tolerance)
+    assert np.array_equal(representatives[inverse], brute_force_representatives(coords, tolerance))
+
+
+def test_empty():
+    representatives, inverse = deduplicate(np.empty((0, 3)))
+    assert len(representatives) == 0 and len(inverse) == 0
+
+
+def test_points_across_cells():
+    # the first points of the cells of the last two points are farther than the tolerance, the points are not
+    coords = np.array([[0, 0, 0], [1.9e-5, 0, 0], [0.99999e-5, 0, 0], [1.00001e-5, 0, 0]])
+    representatives, inverse = deduplicate(coords, 1e-5)
+    assert representatives.tolist() == [0]
+    assert inverse.tolist() == [0, 0, 0, 0]
+
+
+def test_points_in_the_same_cell():
+    # the two points are in the same cell, but farther than the tolerance
+    coords = np.array([[0.01e-5, 0.01e-5, 0.01e-5], [0.99e-5, 0.99e-5, 0.99e-5]])
+    assert deduplicate(coords, 1e-5)[0].tolist() == [0, 1]
+
+
+def test_exact_copies():
+    coords = np.repeat(np.random.RandomState(0).uniform(0, 1, (100, 3)), 50, axis=0)
+    representatives, inverse = deduplicate(coords, 1e-9)
+    assert representatives.tolist() == list(range(0, 5000, 50))
+    assert np.array_equal(inverse, np.repeat(np.arange(100), 50))
+
+
+@pytest.mark.parametrize('dimension', [2, 3])
+@pytest.mark.parametrize('seed', range(5))
+def test_random_clusters(dimension, seed):
+    rng = np.random.RandomState(seed)
+    centers = rng.uniform(0, 10, (100, dimension))
+    coords = centers[rng.randint(0, len(centers), 500)] + rng.normal(0, 0.3, (500, dimension))
+    check_deduplicate(coords, 0.25)
+
+
+def test_unique_points_does_not_depend_on_the_number_of_points():
+    coords = [[0, 0, 0], [1.9e-5, 0, 0], [0.99999e-5, 0, 0], [1.00001e-5, 0, 0]]
+    few = [Vector3(*c) for c in coords]
+    many = few + [Vector3(i, 0, 0) for i in range(1, PAIRWISE_DEDUPLICATION_MAX + 1)]
+
+    assert unique_points(few, 1e-5) == [few[0]]
+    assert unique_points(many, 1e-5) == [many[0]] + many[len(few):]
+
+
+@pytest.mark.parametrize('n', [PAIRWISE_DEDUPLICATION_MAX, 4 * PAIRWISE_DEDUPLICATION_MAX])
+def test_unique_points_random(n):
+    rng = np.random.RandomState(n)
+    points = [Vector3(*c) for c in rng.uniform(0, 1, (n, 3))]
+    coords = np.array([p.tolist() for p in points])
+    groups = brute_force_representatives(coords, 0.3)
+    assert [p.tolist() for p in unique_points(points, 0.3)] == coords[np.unique(groups)].tolist()
@@ -0,0 +1,88 @@
+import math
+
+import numpy as np
+import pytest
+
+pytest.importorskip('OpenGL')
+pytest.importorskip('PyQt4')
+
+from app.geoms.linestring import LineString
+from app.geoms.point import Point3
+from app.geoms.utils.pick_index import PickIndex
+
+
+def random_line(rng, vertices_num):
+    x, y = rng.uniform(0, 100, 2)
+    steps = np.cumsum(rng.uniform(-2, 2, (vertices_num, 2)), axis=0)
+    return LineString([Point3(x + dx, y + dy, 0) for dx, dy in steps.tolist()])
+
+
+def point_segment_distance(px, py, ax, ay, bx, by):
+    abx, aby = bx - ax, by - ay
+    length2 = abx * abx + aby * aby
+    t = 0 if length2 == 0 else min(1, max(0, ((px - ax) * abx + (py - ay) * aby) / length2))
+    return math.hypot(ax + t * abx - px, ay + t * aby - py)
+
+
+def brute_force(lines, x, y, exclude):
+    """:return: two dicts, mapping (id of a line, index) to the distance of each vertex and of each segment"""
+    vertices, segments = dict(), dict()
+    for line in lines:
+        if line is exclude:
+            continue
+        xy = [(v.x(), v.y()) for v in line.vertices]
+        vertices.update(((id(line), k), math.hypot(vx - x, vy - y)) for k, (vx, vy) in enumerate(xy))
+        segments.update(((id(line), k), point_segment_distance(x, y, *(xy[k] + xy[k + 1]))) for k in range(len(xy) - 1))
+    return vertices, segments
+
+
+def check_queries(index, lines, rng, exclude=None, queries_num=100):
+    for _ in range(queries_num):
+        x, y = rng.uniform(-10, 110, 2)
+        radius = rng.choice([0.5, 2, 10])
+        vertices, segments = brute_force(lines, x, y, exclude)
+        for found, distances in ((index.nearest_vertex(x, y, radius, exclude), vertices),
+                                 (index.nearest_segment(x, y, radius, exclude), segments)):
+            nearest = min(distances.values())
+            if nearest > radius:
+                assert found is None
+            else:
+                # any of the nearest ones (e.g., the two segments sharing the nearest vertex)
+                assert found[2] == pytest.approx(nearest)
+                assert distances[id(found[0]), found[1]] == pytest.approx(nearest)
+
+
+def test_queries_after_insertions_removals_and_updates():
+    rng = np.random.RandomState(0)
+    index = PickIndex()
+
+    # enough vertices to build the grids, then a few pending lines
+    lines = [random_line(rng, 50) for _ in range(100)]
+    for line in lines:
+        index.insert(line)
+    check_queries(index, lines, rng)
+    pending = [random_line(rng, 20) for _ in range(10)]
+    for line in pending:
+        index.insert(line)
+    lines += pending
+    check_queries(index, lines, rng)
+    check_queries(index, lines, rng, exclude=lines[0])
+
+    # remove some lines (in the grids and pending), and edit one of them
+    for line in lines[::7]:
+        index.remove(line)
+    lines = [line for k, line in enumerate(lines) if k % 7]
+    lines[3].add_vertex(Point3(50, 50, 0))
+    index.update(lines[3])
+    check_queries(index, lines, rng)
+
+
+def test_long_segments():
+    rng = np.random.RandomState(1)
+    index = PickIndex()
+    lines = [random_line(rng, 50) for _ in range(100)]
+    lines.append(LineString([Point3(-50, -50, 0), Point3(150, 150, 0)]))  # it crosses far more cells than allowed
+    for line in lines:
+        index.insert(line)
+    check_queries(index, lines, rng)
+    assert index.nearest_segment(20, 20, 1e-3)[0] is lines[-1]
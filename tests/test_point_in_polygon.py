@@ -0,0 +1,73 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.geoms.utils.point_in_polygon import points_in_polygon, PreparedPolygon
+
+
+def brute_force_contains(point, rings):
+    """the crossing number of the ray from the point towards +x, edge by edge"""
+    x, y = point
+    crossings = 0
+    for ring in rings:
+        for (ax, ay), (bx, by) in zip(ring, np.roll(ring, -1, axis=0)):
+            if min(ay, by) <= y < max(ay, by) and ax + (y - ay) * (bx - ax) / (by - ay) > x:
+                crossings += 1
+    return crossings % 2 == 1
+
+
+def square(x, y, side):
+    return np.array([(x, y), (x + side, y), (x + side, y + side), (x, y + side)], dtype=np.float64)
+
+
+def star_with_holes(seed):
+    rng = np.random.RandomState(seed)
+    angles = np.linspace(0, 2 * math.pi, 100, endpoint=False)
+    radii = rng.uniform(50, 100, len(angles))
+    boundary = np.column_stack((radii * np.cos(angles), radii * np.sin(angles)))
+    return [boundary] + [square(x, y, 5) for x in range(-25, 25, 10) for y in range(-25, 25, 10)]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_points(seed):
+    rings = star_with_holes(seed)
+    points = np.random.RandomState(seed).uniform(-110, 110, (500, 2))
+    expected = [brute_force_contains(p, rings) for p in points]
+
+    assert points_in_polygon(points, rings).tolist() == expected
+    assert PreparedPolygon(rings).contains_points(points).tolist() == expected
+
+
+def test_points_on_the_grid_of_the_vertices():
+    # the points share the coordinates of the vertices, so the half-open rule of the crossings matters
+    rings = [square(0, 0, 4), square(1, 1, 1), square(2, 2, 1)]
+    points = np.array([(x, y) for x in np.arange(-1, 6, 0.5) for y in np.arange(-1, 6, 0.5)])
+    expected = [brute_force_contains(p, rings) for p in points]
+
+    assert points_in_polygon(points, rings).tolist() == expected
+    assert PreparedPolygon(rings).contains_points(points).tolist() == expected
+
+
+def test_3d_points():
+    points = np.array([(1, 1, 7), (5, 5, -3)], dtype=np.float64)
+    assert points_in_polygon(points, [square(0, 0, 2)]).tolist() == [True, False]
+    assert PreparedPolygon([square(0, 0, 2)]).contains_points(points).tolist() == [True, False]
+
+
+def test_prepared_polygon_is_invalidated():
+    pytest.importorskip('OpenGL')
+    pytest.importorskip('PyQt4')
+    from app.geoms.linearring import LinearRing
+    from app.geoms.point import Point3
+    from app.geoms.polygon import Polygon
+
+    def ring(x, y, side):
+        return LinearRing([Point3(float(vx), float(vy), 0) for vx, vy in square(x, y, side)])
+
+    polygon = Polygon([ring(0, 0, 1)])
+    polygon.prepare()
+    assert polygon.contains_points([(0.5, 0.5)]).tolist() == [True]
+
+    polygon.boundary = ring(10, 10, 1)
+    assert polygon.contains_points([(0.5, 0.5), (10.5, 10.5)]).tolist() == [False, True]
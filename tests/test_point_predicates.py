@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('OpenGL')
+pytest.importorskip('PyQt4')
+
+from app.geoms.point import Point3
+from app.geoms.utils.constants import *
+
+
+def random_quadruples(seed, n=500):
+    """
+    :return: n quadruples of points with small integer coordinates, many of them coplanar or collinear (c is
+    sometimes put on the line a-b, before, between or after a and b, or on a or b themselves)
+    """
+    rng = np.random.RandomState(seed)
+    a, b, c, d = rng.randint(-3, 4, (4, n, 3)).astype(np.float64)
+    on_line = rng.rand(n) < 0.5
+    t = rng.choice([-2, -1, 0, 0.5, 1, 2, 3], n)
+    c[on_line] = a[on_line] + t[on_line, np.newaxis] * (b[on_line] - a[on_line])
+    d[::5] = a[::5] + (b[::5] - a[::5]) + (c[::5] - a[::5])  # coplanar with a, b, c
+    b[::17] = a[::17]
+    return a, b, c, d
+
+
+def as_points(*arrays):
+    return [[Point3(*p) for p in array.tolist()] for array in arrays]
+
+
+@pytest.mark.parametrize('exact', [False, True])
+@pytest.mark.parametrize('seed', range(3))
+def test_batched_predicates_agree_with_the_scalar_ones(seed, exact):
+    a, b, c, d = random_quadruples(seed)
+    points = list(zip(*as_points(a, b, c, d)))
+
+    expected = [Point3.raw_orientation(*q, exact=exact) for q in points]
+    assert Point3.raw_orientations(a, b, c, d, exact=exact).tolist() == expected
+    assert COLLINEAR in expected
+
+    expected = [Point3.collinear_position(p, q, r, exact=exact) for p, q, r, s in points]
+    assert Point3.collinear_positions(a, b, c, exact=exact).tolist() == expected
+    assert BEFORE in expected and BETWEEN in expected and AFTER in expected and False in expected
+
+    expected = [Point3.orientation(*q, exact=exact) for q in points]
+    assert Point3.orientations(a, b, c, d, exact=exact).tolist() == expected
+
+
+@pytest.mark.parametrize('exact', [False, True])
+def test_collinear_position_of_an_interior_point(exact):
+    # the distances a-c + c-b exceed a-b by a rounding error
+    a, b, c = np.array([(3, 0, 0)], dtype=np.float64), np.array([(0, 3, 0)], dtype=np.float64), \
+        np.array([(2, 1, 0)], dtype=np.float64)
+    assert Point3.collinear_position(*[p[0] for p in as_points(a, b, c)], exact=exact) == BETWEEN
+    assert Point3.collinear_positions(a, b, c, exact=exact).tolist() == [BETWEEN]
+
+
+def test_shared_observation_point():
+    a, b, c, d = random_quadruples(3, n=50)
+    observer = (0.5, 0.25, 10)
+    expected = [Point3.orientation(*q, Point3(*observer)) for q in zip(*as_points(a, b, c))]
+    assert Point3.orientations(a, b, c, observer).tolist() == expected
@@ -0,0 +1,103 @@
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+from app.geoms.utils.robust_predicates import orient2d, orient2d_batch, orient3d, orient3d_batch, collinear3d, \
+    collinear3d_batch, predicate_counters
+
+
+def sign(value):
+    return 1 if value > 0 else (-1 if value < 0 else 0)
+
+
+def exact_orient2d(a, b, c):
+    (ax, ay), (bx, by), (cx, cy) = [[Fraction(v) for v in p] for p in (a, b, c)]
+    return sign((bx - ax) * (cy - ay) - (by - ay) * (cx - ax))
+
+
+def exact_orient3d(a, b, c, d):
+    (ax, ay, az), (bx, by, bz), (cx, cy, cz), (dx, dy, dz) = [[Fraction(v) for v in p] for p in (a, b, c, d)]
+    adx, ady, adz = ax - dx, ay - dy, az - dz
+    bdx, bdy, bdz = bx - dx, by - dy, bz - dz
+    cdx, cdy, cdz = cx - dx, cy - dy, cz - dz
+    return sign(adz * (bdx * cdy - cdx * bdy) + bdz * (cdx * ady - adx * cdy) + cdz * (adx * bdy - bdx * ady))
+
+
+def near_collinear(rng, n):
+    """:return: n triplets of points on random lines, with the third point moved by a few ulps (or not at all)"""
+    a = rng.uniform(-10, 10, (n, 2))
+    b = rng.uniform(-10, 10, (n, 2))
+    c = a + rng.uniform(-3, 3, (n, 1)) * (b - a)
+    c[::3] = a[::3] + 0.5 * (b[::3] - a[::3])  # exactly collinear, when the halving is exact
+    c[1::3] = np.nextafter(c[1::3], c[1::3] + rng.choice([-1, 1], (len(c[1::3]), 2)))
+    return a, b, c
+
+
+def near_coplanar(rng, n):
+    """:return: n quadruples of points, with the fourth point (nearly) on the plane of the other three"""
+    a, b, c = (rng.uniform(-10, 10, (n, 3)) for _ in range(3))
+    u, v = rng.uniform(-2, 2, (2, n, 1))
+    d = a + u * (b - a) + v * (c - a)
+    d[::3] = a[::3] + 0.5 * (b[::3] - a[::3])  # on the segment ab, so exactly coplanar when the halving is exact
+    d[1::3] = np.nextafter(d[1::3], d[1::3] + rng.choice([-1, 1], (len(d[1::3]), 3)))
+    return a, b, c, d
+
+
+@pytest.mark.parametrize('degenerate', [False, True])
+def test_orient2d(degenerate):
+    rng = np.random.RandomState(0)
+    a, b, c = near_collinear(rng, 300) if degenerate else (rng.uniform(-10, 10, (300, 2)) for _ in range(3))
+    expected = [exact_orient2d(*p) for p in zip(a.tolist(), b.tolist(), c.tolist())]
+    assert [orient2d(*(p + q + r)) for p, q, r in zip(a.tolist(), b.tolist(), c.tolist())] == expected
+    assert orient2d_batch(a, b, c).tolist() == expected
+    if degenerate:
+        assert 0 in expected and 1 in expected and -1 in expected
+
+
+@pytest.mark.parametrize('degenerate', [False, True])
+def test_orient3d(degenerate):
+    rng = np.random.RandomState(1)
+    a, b, c, d = near_coplanar(rng, 300) if degenerate else (rng.uniform(-10, 10, (300, 3)) for _ in range(4))
+    expected = [exact_orient3d(*q) for q in zip(a.tolist(), b.tolist(), c.tolist(), d.tolist())]
+    assert [orient3d(*q) for q in zip(a.tolist(), b.tolist(), c.tolist(), d.tolist())] == expected
+    assert orient3d_batch(a, b, c, d).tolist() == expected
+    if degenerate:
+        assert 0 in expected and 1 in expected and -1 in expected
+
+
+def test_orient3d_sign_convention():
+    # a, b, c are CCW as seen from d (above the xy plane)
+    assert orient3d((0, 0, 0), (1, 0, 0), (0, 1, 0), (0, 0, 1)) == -1
+    assert orient3d((0, 0, 0), (0, 1, 0), (1, 0, 0), (0, 0, 1)) == 1
+
+
+def test_batch_with_a_shared_point():
+    rng = np.random.RandomState(2)
+    b, c = near_collinear(rng, 100)[1:]
+    a = (0.25, -0.5)
+    expected = [exact_orient2d(a, p, q) for p, q in zip(b.tolist(), c.tolist())]
+    assert orient2d_batch(a, b, c).tolist() == expected
+
+
+def test_collinear3d():
+    rng = np.random.RandomState(3)
+    a, b = rng.uniform(-10, 10, (2, 200, 3))
+    c = a + 0.5 * (b - a)
+    c[1::2] = np.nextafter(c[1::2], np.inf)
+    projections = ((0, 1), (1, 2), (2, 0))  # on the xy, yz, and zx planes
+    expected = [all(exact_orient2d(*[(point[i], point[j]) for point in t]) == 0 for i, j in projections)
+                for t in zip(a.tolist(), b.tolist(), c.tolist())]
+    assert [collinear3d(*t) for t in zip(a.tolist(), b.tolist(), c.tolist())] == expected
+    assert collinear3d_batch(a, b, c).tolist() == expected
+    assert any(expected) and not all(expected)
+
+
+def test_counters():
+    predicate_counters.reset()
+    orient2d(0.0, 0.0, 1.0, 0.0, 0.0, 1.0)
+    orient2d(0.0, 0.0, 1.0, 1.0, 2.0, 2.0)
+    orient3d_batch(np.zeros((4, 3)), np.eye(3)[[0, 0, 1, 1]], np.eye(3)[[1, 1, 2, 2]], np.eye(3)[[2, 0, 0, 1]])
+    assert predicate_counters.filtered == dict(orient2d=1, orient3d=2)
+    assert predicate_counters.exact == dict(orient2d=1, orient3d=2)
+    assert predicate_counters.total() == (3, 3)
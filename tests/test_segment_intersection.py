@@ -0,0 +1,127 @@
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+from app.geoms.utils import segment_intersection
+from app.geoms.utils.segment_intersection import intersection_matrix, intersecting_pairs, intersection_points
+
+
+def sub(u, v):
+    return [x - y for x, y in zip(u, v)]
+
+
+def dot(u, v):
+    return sum(x * y for x, y in zip(u, v))
+
+
+def cross(u, v):
+    return [u[1] * v[2] - u[2] * v[1], u[2] * v[0] - u[0] * v[2], u[0] * v[1] - u[1] * v[0]]
+
+
+def exact_intersection(segment_a, segment_b):
+    """
+    :return: the parameters (along the segment a, in [0, 1]) of the extremes of the intersection of the two segments,
+    or None if they do not intersect, computed with exact rational arithmetic
+    """
+    (p, p1), (q, q1) = [[[Fraction(c) for c in point] for point in segment] for segment in (segment_a, segment_b)]
+    r, s = sub(p1, p), sub(q1, q)
+    zero = [0, 0, 0]
+
+    if r == zero:
+        # the point p must lie on b (or coincide with q, if b is a point too)
+        if s == zero:
+            return (0, 0) if p == q else None
+        on_b = cross(s, sub(p, q)) == zero and 0 <= dot(sub(p, q), s) <= dot(s, s)
+        return (0, 0) if on_b else None
+
+    if dot(cross(r, sub(q, p)), sub(q1, p)) != 0:
+        return None  # not coplanar
+
+    n = cross(r, s)
+    if n != zero:
+        t = Fraction(dot(cross(sub(q, p), s), n), dot(n, n))
+        u = Fraction(dot(cross(sub(q, p), r), n), dot(n, n))
+        return (t, t) if 0 <= t <= 1 and 0 <= u <= 1 else None
+
+    # parallel: they must be collinear and overlap
+    if cross(r, sub(q, p)) != zero:
+        return None
+    t_q0, t_q1 = Fraction(dot(sub(q, p), r), dot(r, r)), Fraction(dot(sub(q1, p), r), dot(r, r))
+    t_start, t_end = max(min(t_q0, t_q1), 0), min(max(t_q0, t_q1), 1)
+    return (t_start, t_end) if t_start <= t_end else None
+
+
+def random_segments(rng, n, planar):
+    """
+    :return: n segments with small integer coordinates (on the z=0 plane, if planar), among which some are points,
+    and some are collinear with, or touch, the previous segment
+    """
+    segments = rng.randint(-3, 4, (n, 2, 3)).astype(np.float64)
+    if planar:
+        segments[:, :, 2] = 0
+    segments[::7, 1] = segments[::7, 0]  # points
+    for k in range(3, n, 5):
+        p, q = segments[k - 1]
+        t = rng.choice([-1, 0, 0.5, 1, 2], 2)
+        segments[k] = [p + t[0] * (q - p), p + t[1] * (q - p)]  # collinear with the previous segment
+    segments[4::9, 0] = segments[3::9, 1][:len(segments[4::9])]  # touching the previous segment at an extreme
+    return segments
+
+
+@pytest.mark.parametrize('planar', [True, False])
+def test_against_exact_pairwise_answers(planar):
+    rng = np.random.RandomState(0 if planar else 1)
+    a, b = random_segments(rng, 60, planar), random_segments(rng, 50, planar)
+    expected = [[exact_intersection(sa, sb) for sb in b.tolist()] for sa in a.tolist()]
+
+    matrix = intersection_matrix(a, b)
+    assert matrix.tolist() == [[e is not None for e in row] for row in expected]
+    assert matrix.any() and not matrix.all()
+
+    pairs = intersecting_pairs(a, b)
+    assert pairs.tolist() == np.argwhere(matrix).tolist()
+
+    pairs, starts, ends = intersection_points(a, b, pairs)
+    for (i, j), start, end in zip(pairs.tolist(), starts, ends):
+        t_start, t_end = expected[i][j]
+        p, r = a[i, 0], a[i, 1] - a[i, 0]
+        assert start == pytest.approx(p + float(t_start) * r)
+        assert end == pytest.approx(p + float(t_end) * r)
+
+
+def test_special_cases():
+    segments = [
+        [(0, 0, 0), (4, 0, 0)],
+        [(1, 0, 0), (6, 0, 0)],  # collinear, overlapping the first one on [1, 4]
+        [(4, 0, 0), (4, 3, 0)],  # touching the end of the first one
+        [(2, 0, 0), (2, 0, 0)],  # a point on the first one
+        [(2, -1, 1), (2, 1, 1)],  # skew with the first one (above it)
+        [(5, 0, 0), (7, 0, 0)],  # collinear with the first one, but disjoint
+    ]
+    matrix = intersection_matrix(segments[:1], segments)
+    assert matrix.tolist() == [[True, True, True, True, False, False]]
+
+    pairs, starts, ends = intersection_points(segments[:1], segments)
+    assert pairs.tolist() == [[0, 0], [0, 1], [0, 2], [0, 3]]
+    assert starts.tolist() == [[0, 0, 0], [1, 0, 0], [4, 0, 0], [2, 0, 0]]
+    assert ends.tolist() == [[4, 0, 0], [4, 0, 0], [4, 0, 0], [2, 0, 0]]
+
+    # the same pairs on the xy plane, given as (N, 2, 2) arrays
+    planar = [[p[:2], q[:2]] for p, q in segments]
+    assert intersection_matrix(planar[:1], planar).tolist() == [[True, True, True, True, True, False]]
+
+
+def test_chunks(monkeypatch):
+    rng = np.random.RandomState(2)
+    a, b = random_segments(rng, 40, True), random_segments(rng, 30, True)
+    expected = intersection_matrix(a, b)
+    monkeypatch.setattr(segment_intersection, '_CHUNK_SIZE', 7)
+    assert intersection_matrix(a, b).tolist() == expected.tolist()
+    assert intersecting_pairs(a, b).tolist() == np.argwhere(expected).tolist()
+
+
+def test_empty_inputs():
+    assert intersection_matrix([], [[(0, 0), (1, 1)]]).shape == (0, 1)
+    assert intersection_matrix([[(0, 0), (1, 1)]], []).shape == (1, 0)
+    assert intersecting_pairs([], []).shape == (0, 2)
@@ -0,0 +1,55 @@
+import math
+
+import numpy as np
+
+from app.geoms.utils.pick_index import PickIndex
+from app.geoms.utils.snapping import Snapper
+
+
+def brute_force(vertices, x, y, radius):
+    """:return: the distance of the nearest of the given vertices within the radius (or None)"""
+    distances = [math.hypot(vx - x, vy - y) for vx, vy in vertices]
+    return min(d for d in distances if d <= radius) if any(d <= radius for d in distances) else None
+
+
+def check_snaps(snapper, vertices, rng, radius, queries_num=100):
+    for _ in range(queries_num):
+        x, y = rng.uniform(-5, 105, 2)
+        sx, sy, snapped_to = snapper.snap(x, y, radius)
+        nearest = brute_force(vertices, x, y, radius)
+        if nearest is None:
+            assert (sx, sy, snapped_to) == (x, y, Snapper.NONE)
+        else:
+            assert snapped_to == Snapper.VERTEX
+            assert (sx, sy) in vertices
+            assert math.hypot(sx - x, sy - y) == nearest
+
+
+def test_own_vertices():
+    rng = np.random.RandomState(0)
+    snapper = Snapper(PickIndex())
+    vertices = [tuple(v) for v in rng.uniform(0, 100, (500, 2)).tolist()]
+    for x, y in vertices[:200]:
+        snapper.add_own_vertex(x, y)
+    check_snaps(snapper, vertices[:200], rng, radius=5)
+
+    # vertices added and removed after the hash was built, and queries with the radius of a different zoom
+    for x, y in vertices[200:]:
+        snapper.add_own_vertex(x, y)
+    for _ in range(100):
+        snapper.remove_own_vertex()
+    assert snapper.own_vertex_num == 400
+    for radius in (5, 0.5, 40, 3):
+        check_snaps(snapper, vertices[:400], rng, radius)
+
+    snapper.clear_own_vertices()
+    check_snaps(snapper, [], rng, radius=5, queries_num=10)
+
+
+def test_further_vertices_and_grid():
+    snapper = Snapper(PickIndex(), grid_cell_size=10)
+    snapper.add_own_vertex(1, 1)
+    assert snapper.snap(1.5, 1.5, 1, own_vertices=[(2, 2)]) == (1, 1, Snapper.VERTEX)
+    assert snapper.snap(2.2, 2.2, 1, own_vertices=[(2, 2)]) == (2, 2, Snapper.VERTEX)
+    assert snapper.snap(9.5, 9.5, 1) == (10, 10, Snapper.GRID)
+    assert snapper.snap(5, 5, 1) == (5, 5, Snapper.NONE)
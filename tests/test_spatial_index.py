@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from app.geoms.utils.spatial_index import SpatialIndex
+from app.utils.vector import Vector3
+
+
+class Item(object):
+    def __init__(self, k):
+        self.k = k
+
+
+def random_box(rng):
+    x, y = rng.uniform(0, 100, 2)
+    w, h = rng.uniform(0, 10, 2)
+    return x, y, x + w, y + h
+
+
+def brute_force(boxes, query, contained):
+    """:return: the keys of the items found by testing every box"""
+    xmin, ymin, xmax, ymax = query
+    if contained:
+        return sorted(k for k, (x0, y0, x1, y1) in boxes.items() if x0 > xmin and x1 < xmax and y0 > ymin and y1 < ymax)
+    return sorted(k for k, (x0, y0, x1, y1) in boxes.items() if x0 <= xmax and x1 >= xmin and y0 <= ymax and y1 >= ymin)
+
+
+def check_queries(index, boxes, rng, queries_num=50):
+    assert len(index) == len(boxes)
+    for _ in range(queries_num):
+        x, y = rng.uniform(-10, 100, 2)
+        w, h = rng.uniform(0, 40, 2)
+        query = (x, y, x + w, y + h)
+        for contained in (False, True):
+            found = index.query(Vector3(x, y, 0), Vector3(x + w, y + h, 0), contained)
+            assert sorted(item.k for item in found) == brute_force(boxes, query, contained)
+
+
+@pytest.mark.parametrize('node_capacity', [2, 4, 16])
+def test_queries_after_insertions_removals_and_updates(node_capacity):
+    rng = np.random.RandomState(node_capacity)
+    index = SpatialIndex(node_capacity)
+    items, boxes = dict(), dict()
+
+    def insert(k):
+        items[k] = Item(k)
+        boxes[k] = random_box(rng)
+        index.insert(items[k], boxes[k])
+
+    # enough items to build the tree, then a few pending ones
+    for k in range(1000):
+        insert(k)
+    check_queries(index, boxes, rng)
+    for k in range(1000, 1100):
+        insert(k)
+    check_queries(index, boxes, rng)
+
+    # some removals, a few updates (of items in the tree and of pending items), then enough removals to rebuild
+    for k in rng.choice(1100, 100, replace=False).tolist():
+        index.remove(items.pop(k))
+        del boxes[k]
+    for k in rng.choice(sorted(items), 50, replace=False).tolist():
+        boxes[k] = random_box(rng)
+        index.update(items[k], boxes[k])
+    check_queries(index, boxes, rng)
+    for k in rng.choice(sorted(items), 700, replace=False).tolist():
+        index.remove(items.pop(k))
+        del boxes[k]
+    check_queries(index, boxes, rng)
+
+    index.clear()
+    check_queries(index, dict(), rng, queries_num=1)
+
+
+def test_boxes_touching_the_query_box():
+    index = SpatialIndex()
+    inside, touching = Item(0), Item(1)
+    index.insert(inside, (1, 1, 2, 2))
+    index.insert(touching, (3, 0, 4, 1))
+    assert set(index.query(Vector3(0, 0, 0), Vector3(3, 3, 0))) == {inside, touching}
+    assert index.query(Vector3(0, 0, 0), Vector3(3, 3, 0), contained=True) == [inside]
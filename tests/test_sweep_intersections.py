@@ -0,0 +1,80 @@
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+from app.geoms.utils.sweep_intersections import sweep_intersections
+
+
+def brute_force_intersections(segments):
+    """:return: a dict mapping each intersection point (exact) to the set of the segments through it"""
+    segments = [[tuple(Fraction(c) for c in p) for p in s] for s in np.asarray(segments, dtype=np.float64).tolist()]
+    points = dict()
+    for i in range(len(segments)):
+        (px, py), (p2x, p2y) = segments[i]
+        rx, ry = p2x - px, p2y - py
+        for j in range(i):
+            (qx, qy), (q2x, q2y) = segments[j]
+            sx, sy = q2x - qx, q2y - qy
+            denominator = rx * sy - ry * sx
+            if denominator == 0:
+                continue  # parallel segments (the tests have no overlapping ones)
+            t = ((qx - px) * sy - (qy - py) * sx) / denominator
+            u = ((qx - px) * ry - (qy - py) * rx) / denominator
+            if 0 <= t <= 1 and 0 <= u <= 1:
+                points.setdefault((px + t * rx, py + t * ry), set()).update((i, j))
+    return points
+
+
+def check_sweep(segments):
+    expected = brute_force_intersections(segments)
+    points, segment_ids = sweep_intersections(segments)
+
+    assert len(points) == len(expected)
+    found = dict()
+    for (x, y), ids in zip(points.tolist(), segment_ids):
+        nearest = min(expected, key=lambda p: abs(float(p[0]) - x) + abs(float(p[1]) - y))
+        assert (float(nearest[0]), float(nearest[1])) == pytest.approx((x, y), abs=1e-9)
+        found[nearest] = set(ids)
+    assert found == expected
+
+
+def test_no_segments():
+    points, segment_ids = sweep_intersections(np.empty((0, 2, 2)))
+    assert points.shape == (0, 2) and segment_ids == []
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_segments(seed):
+    rng = np.random.RandomState(seed)
+    check_sweep(rng.uniform(0, 100, (60, 2, 2)))
+
+
+def test_grid():
+    # horizontal and vertical segments sharing their extremes, crossed by diagonals through the nodes of the grid
+    horizontals = [[(0, y), (10, y)] for y in range(0, 11, 2)]
+    verticals = [[(x, 0), (x, 10)] for x in range(1, 11, 2)]
+    diagonals = [[(0, 0), (10, 10)], [(0, 10), (10, 0)], [(0, 4), (6, 10)]]
+    check_sweep(np.array(horizontals + verticals + diagonals, dtype=np.float64))
+
+
+def test_segments_through_the_same_point():
+    angles = np.linspace(0, np.pi, 7, endpoint=False)
+    directions = np.column_stack((np.cos(angles), np.sin(angles)))
+    segments = np.stack((5 - 3 * directions, 5 + 3 * directions), axis=1)
+    points, segment_ids = sweep_intersections(segments)
+    assert len(points) == 1
+    assert points[0] == pytest.approx((5, 5))
+    assert segment_ids == [list(range(7))]
+
+
+def test_extremes_on_other_segments():
+    segments = np.array([[(0, 0), (10, 0)], [(5, 0), (5, 5)], [(2, 3), (8, 0)], [(10, 0), (10, 5)]], dtype=np.float64)
+    check_sweep(segments)
+
+
+def test_3d_segments():
+    segments = np.array([[(0, 0, 1), (2, 2, 5)], [(0, 2, -1), (2, 0, 3)]], dtype=np.float64)
+    points, segment_ids = sweep_intersections(segments)
+    assert points.tolist() == [[1, 1]]
+    assert segment_ids == [[0, 1]]
@@ -0,0 +1,45 @@
+import bisect
+
+import numpy as np
+import pytest
+
+from app.geoms.utils.sweep_status import SweepStatus
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_random_operations_against_a_list(seed):
+    rng = np.random.RandomState(seed)
+    capacity = 300
+    keys = rng.permutation(capacity).tolist()  # the sequence is kept sorted by these keys
+    status, expected = SweepStatus(capacity, seed=seed), list()
+
+    for _ in range(3000):
+        item = int(rng.randint(capacity))
+        if item in status:
+            status.remove(item)
+            expected.remove(item)
+        else:
+            position = bisect.bisect_left([keys[i] for i in expected], keys[item])
+            anchor = status.last_where(lambda i: keys[i] < keys[item])
+            assert anchor == (expected[position - 1] if position > 0 else None)
+            status.insert_after(item, anchor)
+            expected.insert(position, item)
+
+        assert len(status) == len(expected)
+        if rng.rand() < 0.05:
+            assert list(status) == expected
+            assert [status.previous(i) for i in expected] == [None] + expected[:-1]
+            assert [status.next(i) for i in expected] == expected[1:] + [None]
+    assert all((i in status) == (i in expected) for i in range(capacity))
+
+
+def test_empty_and_single_item():
+    status = SweepStatus(3)
+    assert status.first() is None and status.last_where(lambda i: True) is None and list(status) == []
+    status.insert_after(1, None)
+    assert list(status) == [1] and status.next(1) is None and status.previous(1) is None
+    status.insert_after(2, None)
+    status.insert_after(0, 1)
+    assert list(status) == [2, 1, 0]
+    status.remove(1)
+    assert list(status) == [2, 0] and 1 not in status
@@ -0,0 +1,140 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.geoms.utils.triangulation import triangulate
+
+
+def ring_area(ring):
+    xs, ys = np.asarray(ring, dtype=np.float64)[:, 0], np.asarray(ring, dtype=np.float64)[:, 1]
+    return 0.5 * abs(float(np.dot(xs, np.roll(ys, -1)) - np.dot(np.roll(xs, -1), ys)))
+
+
+def triangles_area(rings, triangles):
+    coords = np.concatenate([np.asarray(r, dtype=np.float64) for r in rings])
+    a, b, c = coords[triangles[:, 0]], coords[triangles[:, 1]], coords[triangles[:, 2]]
+    return 0.5 * float(np.sum(np.abs((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) -
+                                     (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0]))))
+
+
+def check_triangulation(rings):
+    """the triangles must be as many as expected and cover exactly the boundary minus the holes"""
+    triangles = triangulate(rings)
+    vertices_num = sum(len(r) for r in rings)
+    assert triangles.shape == (vertices_num + 2 * (len(rings) - 1) - 2, 3)
+    assert triangles.min() >= 0 and triangles.max() < vertices_num
+
+    expected = ring_area(rings[0]) - sum(ring_area(hole) for hole in rings[1:])
+    assert triangles_area(rings, triangles) == pytest.approx(expected, rel=1e-9)
+    return triangles
+
+
+def square(x, y, side):
+    return [(x, y), (x + side, y), (x + side, y + side), (x, y + side)]
+
+
+def star(n, seed):
+    rng = np.random.RandomState(seed)
+    angles = np.linspace(0, 2 * math.pi, n, endpoint=False)
+    radii = rng.uniform(50, 100, n)
+    return np.column_stack((radii * np.cos(angles), radii * np.sin(angles)))
+
+
+def test_convex():
+    check_triangulation([np.array(square(0, 0, 1))])
+
+
+def test_concave():
+    comb = [(0, 0), (10, 0), (10, 10), (8, 10), (8, 2), (6, 2), (6, 10), (4, 10), (4, 2), (2, 2), (2, 10), (0, 10)]
+    check_triangulation([np.array(comb)])
+
+
+def test_concave_with_holes():
+    comb = [(0, 0), (10, 0), (10, 10), (8, 10), (8, 2), (6, 2), (6, 10), (4, 10), (4, 2), (2, 2), (2, 10), (0, 10)]
+    holes = [square(0.5, 0.5, 1), square(3, 0.5, 1), square(8.5, 5, 1)]
+    check_triangulation([np.array(r, dtype=np.float64) for r in [comb] + holes])
+
+
+def test_holes_in_either_orientation():
+    boundary = square(0, 0, 10)[::-1]  # CW
+    holes = [square(1, 1, 2), square(5, 5, 2)[::-1]]
+    check_triangulation([np.array(r, dtype=np.float64) for r in [boundary] + holes])
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_star_with_holes(seed):
+    holes = [square(x, y, 5) for x in range(-25, 25, 10) for y in range(-25, 25, 10)]
+    check_triangulation([star(200, seed)] + [np.array(h, dtype=np.float64) for h in holes])
+
+
+def test_diagonal_almost_collinear_with_an_edge():
+    # the top edges of the middle row of holes lie on y = 0, and the diagonal from the rightmost of them to the vertex
+    # (0.8, 0) of the boundary is collinear with it up to a rounding error
+    angles = np.linspace(0, 2 * math.pi, 964, endpoint=False)
+    radii = np.random.RandomState(0).uniform(0.8, 1.0, len(angles))
+    radii[0] = 0.8
+    boundary = np.column_stack((radii * np.cos(angles), radii * np.sin(angles)))
+    cell = 0.7 / 3
+    holes = [np.array(square(-0.35 + cell * (i % 3), -0.35 + cell * (i // 3), cell / 2)) for i in range(9)]
+    check_triangulation([boundary] + holes)
+
+
+def test_3d_rings():
+    # a concave polygon with a hole on the plane x = 1, which is projected on the yz plane
+    boundary = [(1, 0, 0), (1, 4, 0), (1, 4, 4), (1, 2, 1), (1, 0, 4)]
+    hole = [(1, 0.5, 0.5), (1, 1, 0.5), (1, 1, 1)]
+    triangles = triangulate([np.array(boundary, dtype=np.float64), np.array(hole, dtype=np.float64)])
+    assert triangles.shape == (5 + 3 + 2 - 2, 3)
+
+    yz = [np.array(boundary)[:, 1:], np.array(hole)[:, 1:]]
+    assert triangles_area(yz, triangles) == pytest.approx(ring_area(yz[0]) - ring_area(yz[1]))
+
+
+def test_closing_vertex_is_ignored():
+    # the last vertex repeats the first one (which used to make the tracing of the pieces loop forever)
+    ring = np.array([(0, 0), (4, 0), (4, 4), (2, 1), (0, 4), (0, 0)], dtype=np.float64)
+    triangles = triangulate([ring])
+    assert len(triangles) == 3
+    assert 5 not in triangles
+    assert triangles_area([ring], triangles) == pytest.approx(ring_area(ring[:5]))
+
+
+def test_consecutive_repeated_vertices_are_ignored():
+    ring = np.array([(0, 0), (4, 0), (4, 0), (4, 4), (2, 1), (0, 4)], dtype=np.float64)
+    triangles = triangulate([ring])
+    assert len(triangles) == 3
+    assert 1 not in triangles or 2 not in triangles
+    assert triangles_area([ring], triangles) == pytest.approx(ring_area(np.delete(ring, 2, axis=0)))
+
+
+def test_degenerate_hole_is_ignored():
+    rings = [np.array(square(0, 0, 4), dtype=np.float64), np.array([(1, 1), (2, 2), (2, 2)], dtype=np.float64)]
+    assert len(triangulate(rings)) == 2
+
+
+def test_less_than_three_distinct_vertices():
+    assert triangulate([np.array([(0, 0), (1, 1), (0, 0)], dtype=np.float64)]).shape == (0, 3)
+
+
+def test_self_intersecting_ring_falls_back_to_a_fan():
+    bowtie = np.array([(0, 0), (4, 4), (4, 0), (0, 4)], dtype=np.float64)
+    assert triangulate([bowtie]).tolist() == [[0, 1, 2], [0, 2, 3]]
+
+
+def test_hole_outside_the_boundary_falls_back_to_a_fan():
+    rings = [np.array(square(0, 0, 4), dtype=np.float64), np.array(square(10, 10, 1), dtype=np.float64)]
+    assert triangulate(rings).tolist() == [[0, 1, 2], [0, 2, 3]]
+
+
+def test_polygon_with_closing_vertex():
+    pytest.importorskip('OpenGL')
+    pytest.importorskip('PyQt4')
+    from app.geoms.point import Point3
+    from app.geoms.polygon import Polygon
+
+    polygon = Polygon()
+    for x, y in [(0, 0), (4, 0), (4, 4), (2, 1), (0, 4), (0, 0)]:
+        polygon.add_vertex(Point3(x, y, 0))
+        polygon.update_renderable_arrays()
+    assert len(polygon.renderable_element_array) == 2 * 3 * 3  # 3 triangles on each side
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from app.utils.vector import Vector3, Vector3Array
+
+
+def random_array(seed, n=20):
+    coords = np.random.RandomState(seed).uniform(-10, 10, (n, 3)).astype(np.float32)
+    coords[::5] = 0  # zero vectors
+    return Vector3Array(coords)
+
+
+def test_construction():
+    assert Vector3Array().shape == (0, 3)
+    assert Vector3Array([Vector3(1, 2, 3), Vector3(4, 5, 6)]).tolist() == [[1, 2, 3], [4, 5, 6]]
+    assert Vector3Array([(1, 2), (3, 4)]).tolist() == [[1, 2, 0], [3, 4, 0]]
+    assert Vector3Array((1, 2, 3)).shape == (1, 3)
+    assert Vector3Array(np.zeros((2, 3))).dtype == np.float32
+    with pytest.raises(TypeError):
+        Vector3Array(np.zeros((2, 4)))
+
+
+def test_magnitude_and_normalize():
+    vectors = random_array(0)
+    magnitudes = vectors.magnitude()
+    assert type(magnitudes) is np.ndarray and magnitudes.shape == (len(vectors),)
+    assert magnitudes.tolist() == pytest.approx([Vector3(*v).magnitude() for v in vectors.tolist()], rel=1e-6)
+
+    versors = vectors.normalize()
+    assert isinstance(versors, Vector3Array)
+    zero = magnitudes == 0
+    assert zero.any()
+    assert versors[zero].tolist() == [[0, 0, 0]] * int(zero.sum())
+    assert versors.magnitude()[~zero] == pytest.approx(1, rel=1e-6)
+    assert np.allclose(versors[~zero] * magnitudes[~zero, np.newaxis], vectors[~zero], rtol=1e-5)
+
+
+def test_dot_and_cross_with_a_vector():
+    vectors, v = random_array(1), Vector3(1, -2, 0.5)
+    plain = vectors.view(np.ndarray)
+    dots = vectors.dot(v)
+    assert type(dots) is np.ndarray
+    assert dots == pytest.approx([np.dot(row, v.view(np.ndarray)) for row in plain], rel=1e-5, abs=1e-5)
+
+    crosses = vectors.cross(v)
+    assert isinstance(crosses, Vector3Array) and crosses.dtype == np.float32
+    assert crosses.tolist() == [Vector3(*row).cross(v).tolist() for row in plain.tolist()]
+
+
+def test_dot_and_cross_row_by_row():
+    a, b = random_array(2), random_array(3)
+    assert a.dot(b) == pytest.approx(np.sum(a.view(np.ndarray) * b.view(np.ndarray), axis=1), rel=1e-5, abs=1e-5)
+    assert a.dot(b.view(np.ndarray).tolist()) == pytest.approx(a.dot(b))
+    assert a.cross(b).tolist() == [Vector3(*p).cross(Vector3(*q)).tolist() for p, q in zip(a.tolist(), b.tolist())]
+
+
+def test_transform():
+    vectors = random_array(4)
+    matrix = np.array([[0, -1, 0, 1],
+                       [1, 0, 0, 2],
+                       [0, 0, 2, 3],
+                       [0, 0, 0, 1]], dtype=np.float64)
+    transformed = vectors.transform(matrix)
+    assert isinstance(transformed, Vector3Array)
+    assert transformed.tolist() == [(Vector3(*row) * matrix).tolist() for row in vectors.tolist()]
+    with pytest.raises(TypeError):
+        vectors.transform(np.eye(3))
+
+
+def test_columns_are_views():
+    vectors = Vector3Array([(1, 2, 3), (4, 5, 6)])
+    for column, setter, k in ((vectors.x, vectors.set_x, 0), (vectors.y, vectors.set_y, 1), (vectors.z, vectors.set_z, 2)):
+        values = column()
+        assert type(values) is np.ndarray and np.shares_memory(values, vectors)
+        values[0] = -1
+        assert vectors[0, k] == -1
+        setter([7, 8])
+        assert vectors[:, k].tolist() == [7, 8]
+
+    row = vectors.vector(1)
+    assert isinstance(row, Vector3) and np.shares_memory(row, vectors)
+    row.set_x(0)
+    assert vectors[1, 0] == 0
+    assert all(np.shares_memory(v, vectors) for v in vectors.vectors())
+
+
+def test_array_wrap_and_getitem():
+    vectors = random_array(5)
+
+    # (N, 3) results stay Vector3Array
+    for result in (vectors + 1, vectors * 2, -vectors, np.abs(vectors), vectors[1:4], vectors[[0, 2]],
+                   vectors[vectors.magnitude() > 0], np.maximum(vectors, 0)):
+        assert isinstance(result, Vector3Array) and result.shape[1] == 3
+
+    # reductions, columns, and single elements become ndarray (or scalars)
+    for result in (vectors[:, 0], vectors[0], vectors.sum(axis=0), vectors.sum(axis=1), np.sqrt(vectors[:, 1] ** 2),
+                   vectors.max(axis=0), vectors[:, :2]):
+        assert type(result) is np.ndarray
+    for result in (vectors.sum(), vectors[0, 0], np.max(vectors)):
+        assert not isinstance(result, np.ndarray)
+
+    assert str(vectors[:1]).startswith('Vector3Array') and repr(vectors[:1]).startswith('Vector3Array(')